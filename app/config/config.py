@@ -18,6 +18,27 @@ class Settings(BaseSettings):
     app_session_lifetime: int = Field(..., env="app_session_lifetime")
     app_disable_auth: bool = Field(..., env="app_disable_auth")
     app_pipelines_sync_interval: int = Field(..., env="app_pipelines_sync_interval")
+    app_pipelines_sync_concurrency: int = Field(10, env="app_pipelines_sync_concurrency")
+    app_pipelines_sync_app_timeout: int = Field(120, env="app_pipelines_sync_app_timeout")
+    app_pipelines_full_sync_interval: int = Field(3600, env="app_pipelines_full_sync_interval")
+    app_pipelines_sync_mode: str = Field("leader", env="app_pipelines_sync_mode")
+    app_pipelines_sync_min_interval: int = Field(60, env="app_pipelines_sync_min_interval")
+    app_pipelines_sync_max_backoff: int = Field(3600, env="app_pipelines_sync_max_backoff")
+    app_pipelines_sync_jitter: float = Field(0.1, env="app_pipelines_sync_jitter")
+    app_sync_runs_retention_days: int = Field(7, env="app_sync_runs_retention_days")
+    app_upstream_concurrency: int = Field(8, env="app_upstream_concurrency")
+    app_upstream_rate_limit_reserve: float = Field(0.2, env="app_upstream_rate_limit_reserve")
+    app_upstream_max_retry_after: int = Field(60, env="app_upstream_max_retry_after")
+    app_upstream_cache_max_bytes: int = Field(64 * 1024 * 1024, env="app_upstream_cache_max_bytes")
+    app_upstream_cache_stale_ttl: int = Field(30, env="app_upstream_cache_stale_ttl")
+    app_log_archive_path: str = Field("log_archive", env="app_log_archive_path")
+    app_log_archive_max_bytes: int = Field(1024 * 1024 * 1024, env="app_log_archive_max_bytes")
+    app_gitlab_projects_membership: bool = Field(False, env="app_gitlab_projects_membership")
+    app_github_graphql: bool = Field(False, env="app_github_graphql")
+    app_http_max_connections: int = Field(20, env="app_http_max_connections")
+    app_http_max_keepalive_connections: int = Field(10, env="app_http_max_keepalive_connections")
+    app_http_keepalive_expiry: int = Field(30, env="app_http_keepalive_expiry")
+    app_http2: bool = Field(False, env="app_http2")
     app_env: str = Field(..., env="app_env")
     app_ssl_key: str = Field(..., env="app_ssl_key")
     app_ssl_cert: str = Field(..., env="app_ssl_cert")
@@ -45,6 +66,27 @@ class Settings(BaseSettings):
             "session_lifetime": self.app_session_lifetime,
             "disable_auth": self.app_disable_auth,
             "pipelines_sync_interval": int(self.app_pipelines_sync_interval),
+            "pipelines_sync_concurrency": int(self.app_pipelines_sync_concurrency),
+            "pipelines_sync_app_timeout": int(self.app_pipelines_sync_app_timeout),
+            "pipelines_full_sync_interval": int(self.app_pipelines_full_sync_interval),
+            "pipelines_sync_mode": self.app_pipelines_sync_mode,
+            "pipelines_sync_min_interval": int(self.app_pipelines_sync_min_interval),
+            "pipelines_sync_max_backoff": int(self.app_pipelines_sync_max_backoff),
+            "pipelines_sync_jitter": float(self.app_pipelines_sync_jitter),
+            "sync_runs_retention_days": int(self.app_sync_runs_retention_days),
+            "upstream_concurrency": int(self.app_upstream_concurrency),
+            "upstream_rate_limit_reserve": float(self.app_upstream_rate_limit_reserve),
+            "upstream_max_retry_after": int(self.app_upstream_max_retry_after),
+            "upstream_cache_max_bytes": int(self.app_upstream_cache_max_bytes),
+            "upstream_cache_stale_ttl": int(self.app_upstream_cache_stale_ttl),
+            "log_archive_path": self.app_log_archive_path,
+            "log_archive_max_bytes": int(self.app_log_archive_max_bytes),
+            "gitlab_projects_membership": self.app_gitlab_projects_membership,
+            "github_graphql": self.app_github_graphql,
+            "http_max_connections": int(self.app_http_max_connections),
+            "http_max_keepalive_connections": int(self.app_http_max_keepalive_connections),
+            "http_keepalive_expiry": int(self.app_http_keepalive_expiry),
+            "http2": self.app_http2,
             "env": self.app_env,
             "ssl_cert": self.app_ssl_cert,
             "ssl_key": self.app_ssl_key,
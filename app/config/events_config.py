@@ -3,10 +3,11 @@ import hashlib
 
 from sqlalchemy import create_engine, select
 
+from app.utils.clients.client_registry import ClientRegistry
 from app.utils.cron import Cron
 from app.config.config import Settings
 from app.models.db_models import Base
-from app.utils.database import SQLALCHEMY_DATABASE_URL, SessionLocal
+from app.utils.database import SQLALCHEMY_DATABASE_URL, SessionLocal, add_missing_columns
 from app.models import db_models as model
 from app.utils.enums import AccessLevel
 
@@ -41,6 +42,8 @@ async def startup_event():
     # Database setup
     engine = create_engine(SQLALCHEMY_DATABASE_URL)
     Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        add_missing_columns(connection)
 
     # Create admin user
     await create_admin_user()
@@ -52,6 +55,7 @@ async def shutdown_event():
     tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
     [task.cancel() for task in tasks]
     await asyncio.gather(*tasks, return_exceptions=True)
+    await ClientRegistry.close_all()
 
 
 def configure(app):
@@ -2,7 +2,7 @@ from fastapi import FastAPI
 from app.config.config import Settings
 
 from app.routers import jenkins_pipelines_rt, pipelines_rt, applications_rt, auth_rt, status_rt, gitlab_pipelines_rt, \
-    access_roles_rt, users_requests_rt, users_rt, github_pipelines_rt
+    access_roles_rt, users_requests_rt, users_rt, github_pipelines_rt, sync_rt
 
 config = Settings().app
 
@@ -18,3 +18,4 @@ def configure(app: FastAPI):
     app.include_router(github_pipelines_rt.router, prefix=config['root_path'])
     app.include_router(jenkins_pipelines_rt.router, prefix=config['root_path'])
     app.include_router(pipelines_rt.router, prefix=config['root_path'])
+    app.include_router(sync_rt.router, prefix=config['root_path'])
@@ -52,6 +52,13 @@ class ApplicationDAO:
 
         return await self.get_by_id(application_id)
 
+    async def update_sync_state(self, application_id: int, sync_state: dict):
+        """Store the pipelines sync state of an application."""
+        async with self.db:
+            await self.db.execute(update(model.Applications).where(model.Applications.id == application_id)
+                                  .values(**sync_state))
+            await self.db.commit()
+
     async def delete(self, application_id: int):
         """Delete an application."""
         async with self.db:
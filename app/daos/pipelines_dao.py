@@ -1,6 +1,10 @@
-from typing import List
+import json
+import tempfile
+from itertools import islice
+from typing import List, Dict, Tuple, AsyncIterable, Callable, Optional, IO
 
-from sqlalchemy import select, delete, update
+from sqlalchemy import select, delete, update, text, table, column, literal, exists, or_, Integer, String
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import IntegrityError
 
 from app.exceptions.database_exception import DatabaseIntegrityException
@@ -9,6 +13,15 @@ from app.models import db_models as model
 from app.utils import database
 from app.utils.enums import AppStatus
 
+SYNC_CHUNK_SIZE = 1000
+# Bytes of fetched pipelines kept in memory before the spool of a sync moves to disk
+SYNC_SPOOL_MEMORY = 8 * 1024 * 1024
+
+# Provider native identifiers of a pipeline, refreshed by every sync
+SYNC_COLUMNS = ("project_id", "workflow_id", "workflow_path", "job_url", "default_branch")
+
+sync_staging = table("pipelines_sync_staging", column("name", String), *(column(name, String) for name in SYNC_COLUMNS))
+
 
 class PipelineDAO:
     def __init__(self):
@@ -117,3 +130,77 @@ class PipelineDAO:
         async with self.db:
             await self.db.execute(delete(model.Pipelines).where(model.Pipelines.id.in_(pipeline_ids)))
             await self.db.commit()
+
+    async def sync_application_pipelines(self, application_id: int, pipelines_pages: AsyncIterable[List[Dict]],
+                                         delete_stale: bool = True,
+                                         skip_if: Callable[[], bool] = None) -> Optional[Tuple[int, int]]:
+        """
+        Reconcile the pipelines of an application with the fetched catalog inside the database.
+
+        Fetched pages are spooled to a temporary file while the catalog is discovered, so memory stays
+        bounded and no database connection is held during the upstream requests. The spooled pipelines
+        are then staged in chunks into a temporary table within a single short transaction, upserted on
+        the (name, application_id) constraint, and stored pipelines missing from the staged set are
+        deleted with an anti-join, without reading the stored rows back.
+
+        :param application_id: Application ID.
+        :param pipelines_pages: Pages of fetched pipelines as dictionaries with `name` and all `SYNC_COLUMNS`
+                               keys.
+        :param delete_stale: Whether pipelines missing from the staged set are deleted. Must be disabled
+                             when the pages only contain part of the catalog.
+        :param skip_if: Optional check evaluated once all pages are fetched; reconciliation is skipped
+                        when it returns True.
+        :return: Tuple with the number of upserted and deleted pipelines, or None if skipped.
+        """
+        with tempfile.SpooledTemporaryFile(max_size=SYNC_SPOOL_MEMORY) as spool:
+            async for pipelines_data in pipelines_pages:
+                spool.writelines(json.dumps(pipeline).encode() + b"\n" for pipeline in pipelines_data)
+
+            if skip_if and skip_if():
+                return None
+            spool.seek(0)
+
+            async with self.db:
+                await self.db.execute(text(
+                    f"CREATE TEMPORARY TABLE {sync_staging.name} "
+                    f"(name VARCHAR NOT NULL, {', '.join(f'{name} VARCHAR' for name in SYNC_COLUMNS)}) "
+                    f"ON COMMIT DROP"
+                ))
+                while chunk := self._read_spooled_chunk(spool):
+                    await self.db.execute(sync_staging.insert(), chunk)
+
+                upserted, deleted = await self._reconcile_staged_pipelines(application_id, delete_stale)
+                await self.db.commit()
+
+        return upserted, deleted
+
+    @staticmethod
+    def _read_spooled_chunk(spool: IO[bytes]) -> List[Dict]:
+        return [json.loads(line) for line in islice(spool, SYNC_CHUNK_SIZE)]
+
+    async def _reconcile_staged_pipelines(self, application_id: int, delete_stale: bool) -> Tuple[int, int]:
+        staged = (
+            select(sync_staging.c.name, literal(application_id, Integer),
+                   *(sync_staging.c[name] for name in SYNC_COLUMNS))
+            .distinct(sync_staging.c.name)
+            .order_by(sync_staging.c.name)
+        )
+        upsert = pg_insert(model.Pipelines).from_select(["name", "application_id", *SYNC_COLUMNS], staged)
+        upsert = upsert.on_conflict_do_update(
+            constraint="unique_name_application_id",
+            set_={name: upsert.excluded[name] for name in SYNC_COLUMNS},
+            where=or_(*(getattr(model.Pipelines, name).is_distinct_from(upsert.excluded[name])
+                        for name in SYNC_COLUMNS))
+        )
+        upserted = (await self.db.execute(upsert)).rowcount
+        if not delete_stale:
+            return upserted, 0
+
+        stale = (
+            delete(model.Pipelines)
+            .where(model.Pipelines.application_id == application_id)
+            .where(~exists().where(sync_staging.c.name == model.Pipelines.name))
+        )
+        deleted = (await self.db.execute(stale)).rowcount
+
+        return upserted, deleted
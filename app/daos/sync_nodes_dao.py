@@ -0,0 +1,46 @@
+from datetime import timedelta
+from typing import List
+
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.models import db_models as model
+from app.utils import database
+
+
+class SyncNodesDAO:
+    def __init__(self):
+        self.db = database.SessionLocal()
+
+    async def heartbeat(self, node_id: str):
+        """Register a sync node or refresh its heartbeat."""
+        async with self.db:
+            statement = pg_insert(model.SyncNodes).values(node_id=node_id, heartbeat_ts=func.now())
+            await self.db.execute(statement.on_conflict_do_update(index_elements=[model.SyncNodes.node_id],
+                                                                  set_={"heartbeat_ts": func.now()}))
+            await self.db.commit()
+
+    async def get_live_node_ids(self, ttl: int) -> List[str]:
+        """Fetch IDs of all sync nodes with a heartbeat within the last `ttl` seconds."""
+        async with self.db:
+            result = await self.db.execute(
+                select(model.SyncNodes.node_id)
+                .where(model.SyncNodes.heartbeat_ts > func.now() - timedelta(seconds=ttl))
+                .order_by(model.SyncNodes.node_id)
+            )
+            return result.scalars().all()
+
+    async def delete_expired(self, ttl: int):
+        """Delete sync nodes without a heartbeat within the last `ttl` seconds."""
+        async with self.db:
+            await self.db.execute(
+                delete(model.SyncNodes)
+                .where(model.SyncNodes.heartbeat_ts <= func.now() - timedelta(seconds=ttl))
+            )
+            await self.db.commit()
+
+    async def delete(self, node_id: str):
+        """Delete a sync node."""
+        async with self.db:
+            await self.db.execute(delete(model.SyncNodes).where(model.SyncNodes.node_id == node_id))
+            await self.db.commit()
@@ -0,0 +1,61 @@
+from datetime import datetime
+from typing import List, Dict
+
+from sqlalchemy import select, delete, func
+
+from app.models import db_models as model
+from app.utils import database
+from app.utils.enums import SyncStatus
+
+
+class SyncRunsDAO:
+    def __init__(self):
+        self.db = database.SessionLocal()
+
+    async def create(self, sync_run_data: dict, applications_data: List[dict]) -> model.SyncRuns:
+        """Record a sync run together with the results of its applications."""
+        sync_run = model.SyncRuns(**sync_run_data)
+        sync_run.applications = [model.SyncRunApplications(**data) for data in applications_data]
+        async with self.db:
+            self.db.add(sync_run)
+            await self.db.commit()
+            return sync_run
+
+    async def get_recent(self, limit: int) -> List[model.SyncRuns]:
+        """Fetch the most recent sync runs with the results of their applications."""
+        async with self.db:
+            result = await self.db.execute(select(model.SyncRuns)
+                                           .order_by(model.SyncRuns.started_ts.desc())
+                                           .limit(limit))
+            return result.scalars().all()
+
+    async def get_application_stats(self, since: datetime) -> List[Dict]:
+        """Aggregate the sync results of every application since the given time, slowest first."""
+        run = model.SyncRunApplications
+        p95_duration = func.percentile_cont(0.95).within_group(run.duration_ms)
+        async with self.db:
+            result = await self.db.execute(
+                select(run.application_id,
+                       model.Applications.name.label("application_name"),
+                       func.count().label("runs"),
+                       func.count().filter(run.status.in_([SyncStatus.FAILED.value, SyncStatus.TIMEOUT.value]))
+                       .label("failures"),
+                       func.percentile_cont(0.5).within_group(run.duration_ms).label("p50_duration_ms"),
+                       p95_duration.label("p95_duration_ms"),
+                       func.avg(run.requests).label("avg_requests"),
+                       func.avg(run.pages).label("avg_pages"),
+                       func.sum(run.upserted).label("upserted"),
+                       func.sum(run.deleted).label("deleted"),
+                       func.max(run.started_ts).label("last_run_ts"))
+                .join(model.Applications, model.Applications.id == run.application_id)
+                .where(run.started_ts >= since)
+                .group_by(run.application_id, model.Applications.name)
+                .order_by(p95_duration.desc())
+            )
+            return [dict(row) for row in result.mappings().all()]
+
+    async def delete_older_than(self, before: datetime):
+        """Delete sync runs started before the given time."""
+        async with self.db:
+            await self.db.execute(delete(model.SyncRuns).where(model.SyncRuns.started_ts < before))
+            await self.db.commit()
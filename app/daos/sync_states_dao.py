@@ -0,0 +1,30 @@
+from typing import Optional
+
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.models import db_models as model
+from app.utils import database
+from app.utils.sync_telemetry import ApplicationSyncStats
+
+
+class SyncStatesDAO:
+    def __init__(self):
+        self.db = database.SessionLocal()
+
+    async def save(self, stats: ApplicationSyncStats, full: bool):
+        """Record the running or finished sync of an application, replacing the previous one."""
+        values = {**stats.as_dict(), "full": full, "updated_ts": func.now()}
+        async with self.db:
+            statement = pg_insert(model.ApplicationSyncStates).values(**values)
+            await self.db.execute(statement.on_conflict_do_update(
+                index_elements=[model.ApplicationSyncStates.application_id],
+                set_={name: value for name, value in values.items() if name != "application_id"}))
+            await self.db.commit()
+
+    async def get_by_application_id(self, application_id: int) -> Optional[model.ApplicationSyncStates]:
+        """Fetch the state of the running or last sync of an application."""
+        async with self.db:
+            result = await self.db.execute(select(model.ApplicationSyncStates)
+                                           .where(model.ApplicationSyncStates.application_id == application_id))
+            return result.scalars().first()
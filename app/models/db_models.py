@@ -3,7 +3,7 @@ from sqlalchemy.orm import relationship
 
 from app.utils.database import Base
 
-from sqlalchemy import Column, Integer, String, TIMESTAMP, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, String, TIMESTAMP, ForeignKey, UniqueConstraint, Boolean
 from sqlalchemy.sql import func
 
 
@@ -120,6 +120,12 @@ class Pipelines(Base):
     name = Column(String)
     application_id = Column(Integer, ForeignKey('applications.id', ondelete='CASCADE'   ))
     project_id = Column(String)
+    # GitHub workflow ID, or workflow file name when discovered through GraphQL
+    workflow_id = Column(String)
+    workflow_path = Column(String)
+    # Jenkins job URL, which nests a `/job/` segment per folder
+    job_url = Column(String)
+    default_branch = Column(String)
     created_ts = Column(TIMESTAMP, default=func.now())
 
     application = relationship("Applications", back_populates="pipelines", lazy="joined")
@@ -133,6 +139,10 @@ class Pipelines(Base):
             'name': self.name,
             'application': self.application.as_dict() if self.application else None,
             'project_id': self.project_id,
+            'workflow_id': self.workflow_id,
+            'workflow_path': self.workflow_path,
+            'job_url': self.job_url,
+            'default_branch': self.default_branch,
             'created_ts': self.created_ts.isoformat() if self.created_ts else None
         }
 
@@ -167,6 +177,10 @@ class Applications(Base):
     regex_pattern = Column(String)
     status = Column(String)
     created_ts = Column(TIMESTAMP, default=func.now())
+    sync_interval = Column(Integer)
+    catalog_fingerprint = Column(String)
+    last_synced_ts = Column(TIMESTAMP)
+    last_full_sync_ts = Column(TIMESTAMP)
 
     pipelines = relationship("Pipelines", back_populates="application")
 
@@ -180,6 +194,7 @@ class Applications(Base):
             'type': self.type,
             'regex_pattern': self.regex_pattern if self.regex_pattern else "",
             'status': self.status,
+            'sync_interval': self.sync_interval,
             'created_ts': self.created_ts.isoformat() if self.created_ts else None
         }
 
@@ -203,3 +218,110 @@ class Auth(Base):
         }
 
 
+class SyncNodes(Base):
+    __tablename__ = "sync_nodes"
+
+    node_id = Column(String, primary_key=True)
+    heartbeat_ts = Column(TIMESTAMP, default=func.now())
+    created_ts = Column(TIMESTAMP, default=func.now())
+
+    def as_dict(self):
+        return {
+            'node_id': self.node_id,
+            'heartbeat_ts': self.heartbeat_ts.isoformat() if self.heartbeat_ts else None,
+            'created_ts': self.created_ts.isoformat() if self.created_ts else None
+        }
+
+
+class SyncRuns(Base):
+    __tablename__ = "sync_runs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    node_id = Column(String)
+    started_ts = Column(TIMESTAMP, index=True)
+    finished_ts = Column(TIMESTAMP)
+    duration_ms = Column(Integer)
+    applications_count = Column(Integer)
+    failed_count = Column(Integer)
+
+    applications = relationship("SyncRunApplications", back_populates="sync_run", lazy="selectin",
+                                cascade="all, delete-orphan", passive_deletes=True)
+
+    def as_dict(self):
+        return {
+            'id': self.id,
+            'node_id': self.node_id,
+            'started_ts': self.started_ts.isoformat() if self.started_ts else None,
+            'finished_ts': self.finished_ts.isoformat() if self.finished_ts else None,
+            'duration_ms': self.duration_ms,
+            'applications_count': self.applications_count,
+            'failed_count': self.failed_count,
+            'applications': [application.as_dict() for application in self.applications]
+        }
+
+
+class SyncRunApplications(Base):
+    __tablename__ = "sync_run_applications"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    sync_run_id = Column(Integer, ForeignKey('sync_runs.id', ondelete='CASCADE'), index=True)
+    application_id = Column(Integer, ForeignKey('applications.id', ondelete='CASCADE'), index=True)
+    started_ts = Column(TIMESTAMP)
+    duration_ms = Column(Integer)
+    status = Column(String)
+    mode = Column(String)
+    pages = Column(Integer)
+    requests = Column(Integer)
+    upserted = Column(Integer)
+    deleted = Column(Integer)
+    error = Column(String)
+
+    sync_run = relationship("SyncRuns", back_populates="applications")
+
+    def as_dict(self):
+        return {
+            'application_id': self.application_id,
+            'started_ts': self.started_ts.isoformat() if self.started_ts else None,
+            'duration_ms': self.duration_ms,
+            'status': self.status,
+            'mode': self.mode,
+            'pages': self.pages,
+            'requests': self.requests,
+            'upserted': self.upserted,
+            'deleted': self.deleted,
+            'error': self.error
+        }
+
+
+class ApplicationSyncStates(Base):
+    """State of the running or last pipelines sync of an application, shared by all processes."""
+    __tablename__ = "application_sync_states"
+
+    application_id = Column(Integer, ForeignKey('applications.id', ondelete='CASCADE'), primary_key=True)
+    full = Column(Boolean)
+    started_ts = Column(TIMESTAMP)
+    duration_ms = Column(Integer)
+    status = Column(String)
+    mode = Column(String)
+    pages = Column(Integer)
+    requests = Column(Integer)
+    upserted = Column(Integer)
+    deleted = Column(Integer)
+    error = Column(String)
+    updated_ts = Column(TIMESTAMP, default=func.now(), onupdate=func.now())
+
+    def as_dict(self):
+        return {
+            'application_id': self.application_id,
+            'full': self.full,
+            'started_ts': self.started_ts.isoformat() if self.started_ts else None,
+            'duration_ms': self.duration_ms,
+            'status': self.status,
+            'mode': self.mode,
+            'pages': self.pages,
+            'requests': self.requests,
+            'upserted': self.upserted,
+            'deleted': self.deleted,
+            'error': self.error,
+            'updated_ts': self.updated_ts.isoformat() if self.updated_ts else None
+        }
@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, Request, Query
+from fastapi.responses import StreamingResponse
 
-from app.schemas.pipelines_sch import PipelinesResponse, GithubStartPipelineParams
+from app.schemas.pipelines_sch import PipelinesResponse, GithubStartPipelineParams, LogTailResponse, LogWindowResponse, \
+    LogSearchResponse, LogSectionsResponse
 from app.schemas.response_sch import Response
 from app.services.pipelines_srv import PipelinesService
+from app.utils.clients.github import RUNS_PER_PAGE
 from app.utils.check_session import auth_required
+from app.utils.log_stream import TAIL_MAX_BYTES, TAIL_MAX_BYTES_LIMIT, WINDOW_MAX_LINES, SEARCH_MAX_CONTEXT, \
+    SEARCH_MAX_MATCHES, SEARCH_MAX_PATTERN_LENGTH
 
 router = APIRouter()
 
@@ -20,11 +25,20 @@ async def get_all_github_pipeline(request: Request,
     return await pipeline_service.get_all_github_pipelines(request)
 
 
+@router.get("/pipelines/github/latest", tags=["github_pipelines"])
+@auth_required
+async def get_github_pipelines_latest_status(request: Request,
+                                             pipeline_service: PipelinesService = Depends(
+                                                 create_pipeline_service)) -> Response:
+    return await pipeline_service.get_github_pipelines_latest_status(request)
+
+
 @router.get("/pipelines/github/{pipeline_id}/builds", tags=["github_pipelines"])
 @auth_required
-async def get_github_pipeline_builds(request: Request, pipeline_id: int,
+async def get_github_pipeline_builds(request: Request, pipeline_id: int, page: int = Query(1, ge=1),
+                                     per_page: int = Query(RUNS_PER_PAGE, ge=1, le=100),
                                      pipeline_service: PipelinesService = Depends(create_pipeline_service)) -> Response:
-    return await pipeline_service.get_github_pipeline_builds(request, pipeline_id)
+    return await pipeline_service.get_github_pipeline_builds(request, pipeline_id, page, per_page)
 
 
 @router.get("/pipelines/github/{pipeline_id}/builds/{build_id}", tags=["github_pipelines"])
@@ -78,4 +92,62 @@ async def get_github_pipeline_build_jobs(request: Request, pipeline_id: int, bui
 async def get_github_pipeline_build_job_trace(request: Request, pipeline_id: int, build_id: int, job_id: int,
                                               pipeline_service: PipelinesService = Depends(
                                                   create_pipeline_service)) -> Response:
-    return await pipeline_service.get_github_pipeline_build_job_trace(request, pipeline_id, build_id, job_id)
\ No newline at end of file
+    return await pipeline_service.get_github_pipeline_build_job_trace(request, pipeline_id, build_id, job_id)
+
+
+@router.get("/pipelines/github/{pipeline_id}/builds/{build_id}/jobs/{job_id}/log", tags=["github_pipelines"])
+@auth_required
+async def stream_github_pipeline_build_job_log(request: Request, pipeline_id: int, build_id: int, job_id: int,
+                                               pipeline_service: PipelinesService = Depends(
+                                                   create_pipeline_service)) -> StreamingResponse:
+    return await pipeline_service.stream_github_pipeline_build_job_log(request, pipeline_id, build_id, job_id)
+
+
+@router.get("/pipelines/github/{pipeline_id}/builds/{build_id}/jobs/{job_id}/log/tail", tags=["github_pipelines"])
+@auth_required
+async def get_github_pipeline_build_job_log_tail(request: Request, pipeline_id: int, build_id: int, job_id: int,
+                                                 offset: int = Query(0, ge=0),
+                                                 max_bytes: int = Query(TAIL_MAX_BYTES, ge=1, le=TAIL_MAX_BYTES_LIMIT),
+                                                 pipeline_service: PipelinesService = Depends(
+                                                     create_pipeline_service)) -> LogTailResponse:
+    return await pipeline_service.get_github_pipeline_build_job_log_tail(request, pipeline_id, build_id, job_id,
+                                                                         offset, max_bytes)
+
+
+@router.get("/pipelines/github/{pipeline_id}/builds/{build_id}/jobs/{job_id}/log/lines", tags=["github_pipelines"])
+@auth_required
+async def get_github_pipeline_build_job_log_lines(request: Request, pipeline_id: int, build_id: int, job_id: int,
+                                                  head: int = Query(None, ge=1, le=WINDOW_MAX_LINES),
+                                                  tail: int = Query(None, ge=1, le=WINDOW_MAX_LINES),
+                                                  start: int = Query(None, ge=1),
+                                                  end: int = Query(None, ge=1),
+                                                  pipeline_service: PipelinesService = Depends(
+                                                      create_pipeline_service)) -> LogWindowResponse:
+    if start is not None and end is not None:
+        end = min(end, start + WINDOW_MAX_LINES - 1)
+    return await pipeline_service.get_github_pipeline_build_job_log_lines(request, pipeline_id, build_id, job_id,
+                                                                          head, tail, start, end)
+
+
+@router.get("/pipelines/github/{pipeline_id}/builds/{build_id}/jobs/{job_id}/log/search", tags=["github_pipelines"])
+@auth_required
+async def search_github_pipeline_build_job_log(request: Request, pipeline_id: int, build_id: int, job_id: int,
+                                               pattern: str = Query(..., min_length=1,
+                                                                    max_length=SEARCH_MAX_PATTERN_LENGTH),
+                                               ignore_case: bool = False,
+                                               regex: bool = False,
+                                               context: int = Query(0, ge=0, le=SEARCH_MAX_CONTEXT),
+                                               max_matches: int = Query(100, ge=1, le=SEARCH_MAX_MATCHES),
+                                               pipeline_service: PipelinesService = Depends(
+                                                   create_pipeline_service)) -> LogSearchResponse:
+    return await pipeline_service.search_github_pipeline_build_job_log(request, pipeline_id, build_id, job_id,
+                                                                       pattern, ignore_case, regex, context,
+                                                                       max_matches)
+
+
+@router.get("/pipelines/github/{pipeline_id}/builds/{build_id}/jobs/{job_id}/log/sections", tags=["github_pipelines"])
+@auth_required
+async def get_github_pipeline_build_job_log_sections(request: Request, pipeline_id: int, build_id: int, job_id: int,
+                                                     pipeline_service: PipelinesService = Depends(
+                                                         create_pipeline_service)) -> LogSectionsResponse:
+    return await pipeline_service.get_github_pipeline_build_job_log_sections(request, pipeline_id, build_id, job_id)
@@ -1,9 +1,13 @@
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, Request, Query
+from fastapi.responses import StreamingResponse
 
-from app.schemas.pipelines_sch import GitlabStartPipelineParams, PipelinesResponse
+from app.schemas.pipelines_sch import GitlabStartPipelineParams, PipelinesResponse, LogTailResponse, LogWindowResponse, \
+    LogSearchResponse, LogSectionsResponse
 from app.schemas.response_sch import Response
 from app.services.pipelines_srv import PipelinesService
 from app.utils.check_session import auth_required
+from app.utils.log_stream import TAIL_MAX_BYTES, TAIL_MAX_BYTES_LIMIT, WINDOW_MAX_LINES, SEARCH_MAX_CONTEXT, \
+    SEARCH_MAX_MATCHES, SEARCH_MAX_PATTERN_LENGTH
 
 router = APIRouter()
 
@@ -22,9 +26,9 @@ async def get_all_gitlab_pipeline(request: Request,
 
 @router.get("/pipelines/gitlab/{pipeline_id}/builds", tags=["gitlab_pipelines"])
 @auth_required
-async def get_gitlab_pipeline_builds(request: Request, pipeline_id: int,
+async def get_gitlab_pipeline_builds(request: Request, pipeline_id: int, pipeline_jobs: bool = False,
                                      pipeline_service: PipelinesService = Depends(create_pipeline_service)) -> Response:
-    return await pipeline_service.get_gitlab_pipeline_builds(request, pipeline_id)
+    return await pipeline_service.get_gitlab_pipeline_builds(request, pipeline_id, pipeline_jobs)
 
 
 @router.get("/pipelines/gitlab/{pipeline_id}/builds/{build_id}", tags=["gitlab_pipelines"])
@@ -79,3 +83,61 @@ async def get_gitlab_pipeline_build_job_trace(request: Request, pipeline_id: int
                                               pipeline_service: PipelinesService = Depends(
                                                   create_pipeline_service)) -> Response:
     return await pipeline_service.get_gitlab_pipeline_build_job_trace(request, pipeline_id, build_id, job_id)
+
+
+@router.get("/pipelines/gitlab/{pipeline_id}/builds/{build_id}/jobs/{job_id}/log", tags=["gitlab_pipelines"])
+@auth_required
+async def stream_gitlab_pipeline_build_job_log(request: Request, pipeline_id: int, build_id: int, job_id: int,
+                                               pipeline_service: PipelinesService = Depends(
+                                                   create_pipeline_service)) -> StreamingResponse:
+    return await pipeline_service.stream_gitlab_pipeline_build_job_log(request, pipeline_id, build_id, job_id)
+
+
+@router.get("/pipelines/gitlab/{pipeline_id}/builds/{build_id}/jobs/{job_id}/log/tail", tags=["gitlab_pipelines"])
+@auth_required
+async def get_gitlab_pipeline_build_job_log_tail(request: Request, pipeline_id: int, build_id: int, job_id: int,
+                                                 offset: int = Query(0, ge=0),
+                                                 max_bytes: int = Query(TAIL_MAX_BYTES, ge=1, le=TAIL_MAX_BYTES_LIMIT),
+                                                 pipeline_service: PipelinesService = Depends(
+                                                     create_pipeline_service)) -> LogTailResponse:
+    return await pipeline_service.get_gitlab_pipeline_build_job_log_tail(request, pipeline_id, build_id, job_id,
+                                                                         offset, max_bytes)
+
+
+@router.get("/pipelines/gitlab/{pipeline_id}/builds/{build_id}/jobs/{job_id}/log/lines", tags=["gitlab_pipelines"])
+@auth_required
+async def get_gitlab_pipeline_build_job_log_lines(request: Request, pipeline_id: int, build_id: int, job_id: int,
+                                                  head: int = Query(None, ge=1, le=WINDOW_MAX_LINES),
+                                                  tail: int = Query(None, ge=1, le=WINDOW_MAX_LINES),
+                                                  start: int = Query(None, ge=1),
+                                                  end: int = Query(None, ge=1),
+                                                  pipeline_service: PipelinesService = Depends(
+                                                      create_pipeline_service)) -> LogWindowResponse:
+    if start is not None and end is not None:
+        end = min(end, start + WINDOW_MAX_LINES - 1)
+    return await pipeline_service.get_gitlab_pipeline_build_job_log_lines(request, pipeline_id, build_id, job_id,
+                                                                          head, tail, start, end)
+
+
+@router.get("/pipelines/gitlab/{pipeline_id}/builds/{build_id}/jobs/{job_id}/log/search", tags=["gitlab_pipelines"])
+@auth_required
+async def search_gitlab_pipeline_build_job_log(request: Request, pipeline_id: int, build_id: int, job_id: int,
+                                               pattern: str = Query(..., min_length=1,
+                                                                    max_length=SEARCH_MAX_PATTERN_LENGTH),
+                                               ignore_case: bool = False,
+                                               regex: bool = False,
+                                               context: int = Query(0, ge=0, le=SEARCH_MAX_CONTEXT),
+                                               max_matches: int = Query(100, ge=1, le=SEARCH_MAX_MATCHES),
+                                               pipeline_service: PipelinesService = Depends(
+                                                   create_pipeline_service)) -> LogSearchResponse:
+    return await pipeline_service.search_gitlab_pipeline_build_job_log(request, pipeline_id, build_id, job_id,
+                                                                       pattern, ignore_case, regex, context,
+                                                                       max_matches)
+
+
+@router.get("/pipelines/gitlab/{pipeline_id}/builds/{build_id}/jobs/{job_id}/log/sections", tags=["gitlab_pipelines"])
+@auth_required
+async def get_gitlab_pipeline_build_job_log_sections(request: Request, pipeline_id: int, build_id: int, job_id: int,
+                                                     pipeline_service: PipelinesService = Depends(
+                                                         create_pipeline_service)) -> LogSectionsResponse:
+    return await pipeline_service.get_gitlab_pipeline_build_job_log_sections(request, pipeline_id, build_id, job_id)
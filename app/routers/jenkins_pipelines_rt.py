@@ -1,9 +1,13 @@
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, Request, Query
+from fastapi.responses import StreamingResponse
 
-from app.schemas.pipelines_sch import PipelinesResponse, JenkinsStartPipelineParams
+from app.schemas.pipelines_sch import PipelinesResponse, JenkinsStartPipelineParams, LogTailResponse, \
+    LogWindowResponse, LogSearchResponse, LogSectionsResponse
 from app.schemas.response_sch import Response
 from app.services.pipelines_srv import PipelinesService
 from app.utils.check_session import auth_required
+from app.utils.log_stream import TAIL_MAX_BYTES, TAIL_MAX_BYTES_LIMIT, WINDOW_MAX_LINES, SEARCH_MAX_CONTEXT, \
+    SEARCH_MAX_MATCHES, SEARCH_MAX_PATTERN_LENGTH
 
 router = APIRouter()
 
@@ -51,6 +55,63 @@ async def get_jenkins_pipeline_build(request: Request, pipeline_id: int, build_i
     return await pipeline_service.get_jenkins_pipeline_build(request, pipeline_id, build_id)
 
 
+@router.get("/pipelines/jenkins/{pipeline_id}/builds/{build_id}/log", tags=["jenkins_pipelines"])
+@auth_required
+async def stream_jenkins_pipeline_build_log(request: Request, pipeline_id: int, build_id: int,
+                                            pipeline_service: PipelinesService = Depends(
+                                                create_pipeline_service)) -> StreamingResponse:
+    return await pipeline_service.stream_jenkins_pipeline_build_log(request, pipeline_id, build_id)
+
+
+@router.get("/pipelines/jenkins/{pipeline_id}/builds/{build_id}/log/tail", tags=["jenkins_pipelines"])
+@auth_required
+async def get_jenkins_pipeline_build_log_tail(request: Request, pipeline_id: int, build_id: int,
+                                              offset: int = Query(0, ge=0),
+                                              max_bytes: int = Query(TAIL_MAX_BYTES, ge=1, le=TAIL_MAX_BYTES_LIMIT),
+                                              pipeline_service: PipelinesService = Depends(
+                                                  create_pipeline_service)) -> LogTailResponse:
+    return await pipeline_service.get_jenkins_pipeline_build_log_tail(request, pipeline_id, build_id, offset,
+                                                                      max_bytes)
+
+
+@router.get("/pipelines/jenkins/{pipeline_id}/builds/{build_id}/log/lines", tags=["jenkins_pipelines"])
+@auth_required
+async def get_jenkins_pipeline_build_log_lines(request: Request, pipeline_id: int, build_id: int,
+                                               head: int = Query(None, ge=1, le=WINDOW_MAX_LINES),
+                                               tail: int = Query(None, ge=1, le=WINDOW_MAX_LINES),
+                                               start: int = Query(None, ge=1),
+                                               end: int = Query(None, ge=1),
+                                               pipeline_service: PipelinesService = Depends(
+                                                   create_pipeline_service)) -> LogWindowResponse:
+    if start is not None and end is not None:
+        end = min(end, start + WINDOW_MAX_LINES - 1)
+    return await pipeline_service.get_jenkins_pipeline_build_log_lines(request, pipeline_id, build_id,
+                                                                       head, tail, start, end)
+
+
+@router.get("/pipelines/jenkins/{pipeline_id}/builds/{build_id}/log/search", tags=["jenkins_pipelines"])
+@auth_required
+async def search_jenkins_pipeline_build_log(request: Request, pipeline_id: int, build_id: int,
+                                            pattern: str = Query(..., min_length=1,
+                                                                 max_length=SEARCH_MAX_PATTERN_LENGTH),
+                                            ignore_case: bool = False,
+                                            regex: bool = False,
+                                            context: int = Query(0, ge=0, le=SEARCH_MAX_CONTEXT),
+                                            max_matches: int = Query(100, ge=1, le=SEARCH_MAX_MATCHES),
+                                            pipeline_service: PipelinesService = Depends(
+                                                create_pipeline_service)) -> LogSearchResponse:
+    return await pipeline_service.search_jenkins_pipeline_build_log(request, pipeline_id, build_id, pattern,
+                                                                    ignore_case, regex, context, max_matches)
+
+
+@router.get("/pipelines/jenkins/{pipeline_id}/builds/{build_id}/log/sections", tags=["jenkins_pipelines"])
+@auth_required
+async def get_jenkins_pipeline_build_log_sections(request: Request, pipeline_id: int, build_id: int,
+                                                  pipeline_service: PipelinesService = Depends(
+                                                      create_pipeline_service)) -> LogSectionsResponse:
+    return await pipeline_service.get_jenkins_pipeline_build_log_sections(request, pipeline_id, build_id)
+
+
 @router.post("/pipelines/jenkins/{pipeline_id}/builds/{build_id}/retry", tags=["jenkins_pipelines"])
 @auth_required
 async def retry_jenkins_pipeline_build(request: Request, pipeline_id: int, build_id: int,
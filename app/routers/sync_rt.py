@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Depends, Request, Query
+
+from app.schemas.sync_sch import SyncRunsResponse, SyncStatsResponse, SyncApplicationResponse, \
+    SyncApplicationsResponse
+from app.services.sync_srv import SyncService
+from app.utils.check_session import auth_required, admin_access_required
+
+router = APIRouter()
+
+
+def create_sync_service():
+    return SyncService()
+
+
+@router.get("/sync/runs", tags=["sync"])
+@auth_required
+@admin_access_required
+async def get_sync_runs(request: Request, limit: int = Query(20, ge=1, le=500),
+                        sync_service: SyncService = Depends(create_sync_service)) -> SyncRunsResponse:
+    return await sync_service.get_sync_runs(limit)
+
+
+@router.get("/sync/stats", tags=["sync"])
+@auth_required
+@admin_access_required
+async def get_sync_stats(request: Request, hours: int = Query(24, ge=1, le=24 * 90),
+                         sync_service: SyncService = Depends(create_sync_service)) -> SyncStatsResponse:
+    return await sync_service.get_sync_stats(hours)
+
+
+@router.post("/sync/applications", tags=["sync"])
+@auth_required
+@admin_access_required
+async def trigger_applications_sync(request: Request, wait: bool = False,
+                                    sync_service: SyncService = Depends(
+                                        create_sync_service)) -> SyncApplicationsResponse:
+    return await sync_service.trigger_applications_sync(wait)
+
+
+@router.post("/sync/applications/{application_id}", tags=["sync"])
+@auth_required
+@admin_access_required
+async def trigger_application_sync(request: Request, application_id: int, wait: bool = False,
+                                   sync_service: SyncService = Depends(
+                                       create_sync_service)) -> SyncApplicationResponse:
+    return await sync_service.trigger_application_sync(application_id, wait)
+
+
+@router.get("/sync/applications/{application_id}", tags=["sync"])
+@auth_required
+@admin_access_required
+async def get_application_sync_status(request: Request, application_id: int,
+                                      sync_service: SyncService = Depends(
+                                          create_sync_service)) -> SyncApplicationResponse:
+    return await sync_service.get_application_sync_status(application_id)
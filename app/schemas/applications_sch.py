@@ -15,6 +15,7 @@ class CreateApplication(BaseModel):
     type: str
     status: str
     regex_pattern: Optional[str] = None
+    sync_interval: Optional[int] = None
 
     @field_validator("type", check_fields=True)
     def validate_type(cls, value):
@@ -31,6 +32,12 @@ class CreateApplication(BaseModel):
         except re.error:
             raise ValueError(f"'{value}' is not a valid regular expression pattern.")
 
+    @field_validator("sync_interval", check_fields=True)
+    def validate_sync_interval(cls, value):
+        if value is not None and value <= 0:
+            raise ValueError("Sync interval must be a positive number of seconds.")
+        return value
+
     class Config:
         json_schema_extra = {
             "example": {
@@ -51,6 +58,7 @@ class UpdateApplication(BaseModel):
     base_url: Optional[str] = None
     status: Optional[str] = None
     regex_pattern: Optional[str] = None
+    sync_interval: Optional[int] = None
 
     @field_validator("regex_pattern", check_fields=True)
     def validate_regex_pattern(cls, value):
@@ -60,6 +68,12 @@ class UpdateApplication(BaseModel):
         except re.error:
             raise ValueError(f"'{value}' is not a valid regular expression pattern.")
 
+    @field_validator("sync_interval", check_fields=True)
+    def validate_sync_interval(cls, value):
+        if value is not None and value <= 0:
+            raise ValueError("Sync interval must be a positive number of seconds.")
+        return value
+
     class Config:
         json_schema_extra = {
             "example": {
@@ -81,6 +95,7 @@ class ApplicationOut(BaseModel):
     status: str
     created_ts: str
     regex_pattern: str
+    sync_interval: Optional[int] = None
 
 
 # Response models
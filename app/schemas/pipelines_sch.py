@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Tuple, Optional
 
 from pydantic import BaseModel
 
@@ -20,6 +20,52 @@ class PipelineOut(BaseModel):
     application: PipelineApplicationOut
 
 
+class LogTailOut(BaseModel):
+    lines: List[str]
+    offset: int
+    more: bool
+
+
+class LogLineOut(BaseModel):
+    number: int
+    offset: int
+    text: str
+
+
+class LogWindowOut(BaseModel):
+    lines: List[LogLineOut]
+    total_lines: Optional[int]
+
+
+class LogMatchOut(BaseModel):
+    line: LogLineOut
+    spans: List[Tuple[int, int]]
+    before: List[LogLineOut]
+    after: List[LogLineOut]
+
+
+class LogSearchOut(BaseModel):
+    matches: List[LogMatchOut]
+    truncated: bool
+    scanned_lines: int
+
+
+class LogSectionOut(BaseModel):
+    name: str
+    title: str
+    start_line: int
+    end_line: Optional[int]
+    started_at: Optional[float]
+    duration: Optional[float]
+    collapsed: bool
+    children: List["LogSectionOut"]
+
+
+class LogSectionsOut(BaseModel):
+    sections: List[LogSectionOut]
+    total_lines: int
+
+
 # Response models
 class PipelineResponse(Response):
     data: PipelineOut
@@ -29,6 +75,22 @@ class PipelinesResponse(Response):
     data: List[PipelineOut]
 
 
+class LogTailResponse(Response):
+    data: LogTailOut
+
+
+class LogWindowResponse(Response):
+    data: LogWindowOut
+
+
+class LogSearchResponse(Response):
+    data: LogSearchOut
+
+
+class LogSectionsResponse(Response):
+    data: LogSectionsOut
+
+
 class GitlabStartPipelineParams(BaseModel):
     class Config:
         json_schema_extra = {
@@ -0,0 +1,60 @@
+from typing import Optional, List
+
+from pydantic import BaseModel
+
+from app.schemas.response_sch import Response
+
+
+class SyncRunApplicationOut(BaseModel):
+    application_id: int
+    started_ts: Optional[str] = None
+    duration_ms: int
+    status: str
+    mode: Optional[str] = None
+    pages: int
+    requests: int
+    upserted: int
+    deleted: int
+    error: Optional[str] = None
+
+
+class SyncRunOut(BaseModel):
+    id: int
+    node_id: Optional[str] = None
+    started_ts: str
+    finished_ts: str
+    duration_ms: int
+    applications_count: int
+    failed_count: int
+    applications: List[SyncRunApplicationOut]
+
+
+class SyncApplicationStatsOut(BaseModel):
+    application_id: int
+    application_name: str
+    runs: int
+    failures: int
+    p50_duration_ms: float
+    p95_duration_ms: float
+    avg_requests: Optional[float] = None
+    avg_pages: Optional[float] = None
+    upserted: Optional[int] = None
+    deleted: Optional[int] = None
+    last_run_ts: str
+
+
+# Response models
+class SyncRunsResponse(Response):
+    data: List[SyncRunOut]
+
+
+class SyncStatsResponse(Response):
+    data: List[SyncApplicationStatsOut]
+
+
+class SyncApplicationResponse(Response):
+    data: Optional[SyncRunApplicationOut] = None
+
+
+class SyncApplicationsResponse(Response):
+    data: Optional[List[SyncRunApplicationOut]] = None
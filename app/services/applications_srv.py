@@ -1,19 +1,21 @@
-import re
-
 from app.daos.applications_dao import ApplicationDAO
+from app.config.config import Settings
 from app.daos.pipelines_dao import PipelineDAO
 from app.exceptions.application_exception import ApplicationNotFoundException
+from app.exceptions.custom_http_expeption import CustomHTTPException
 from app.schemas.applications_sch import ApplicationOut, CreateApplication, UpdateApplication
+from app.utils.clients.client_registry import ClientRegistry
 from app.utils.clients.github import GithubClient
 from app.utils.clients.gitlab import GitlabClient
 from app.utils.clients.jenkins import JenkinsClient
-from app.utils.enums import AppType, AppStatus
+from app.utils.enums import AppType, AppStatus, SyncStatus
 from app.utils.logger import Logger
 from app.utils.pipeline_identifier import PipelineIdentifier
 from app.utils.response import ok, error
 from fastapi import status as Status
 
 LOGGER = Logger().start_logger()
+config = Settings().app
 
 
 class ApplicationService:
@@ -30,20 +32,27 @@ class ApplicationService:
             client = GitlabClient(base_url=app_data.base_url, token=app_data.auth_pass)
         if app_data.type == AppType.GITHUB.value:
             LOGGER.info("Initializing GitHub client.")
-            client = GithubClient(base_url=app_data.base_url, token=app_data.auth_pass)
+            client = GithubClient(base_url=app_data.base_url, token=app_data.auth_pass, user=app_data.auth_user)
         elif app_data.type == AppType.JENKINS.value:
             LOGGER.info("Initializing Jenkins client.")
             client = JenkinsClient(base_url=app_data.base_url, user=app_data.auth_user, token=app_data.auth_pass)
 
         return client
 
+    @classmethod
+    async def _check_connection(cls, client) -> bool:
+        try:
+            return await client.check_connection()
+        finally:
+            await client.close()
+
     async def verify_application(self, app_data: CreateApplication):
         client = await self._get_client(app_data)
         if client is None:
             LOGGER.warning("No client initialized for the provided app type.")
             return error(message="Invalid application type provided.", status_code=Status.HTTP_400_BAD_REQUEST)
 
-        if not await client.check_connection():
+        if not await self._check_connection(client):
             LOGGER.warning(f"Application verification failed for {app_data.type}.")
             return error(message="Application is NOT accessible.", status_code=Status.HTTP_400_BAD_REQUEST)
 
@@ -75,7 +84,7 @@ class ApplicationService:
             LOGGER.warning("No client initialized for the provided app type.")
             return error(message="Invalid application type provided.", status_code=Status.HTTP_400_BAD_REQUEST)
 
-        if not await client.check_connection():
+        if not await self._check_connection(client):
             LOGGER.warning("Application connection check failed.")
             return error(message="Application is NOT accessible.", status_code=Status.HTTP_400_BAD_REQUEST)
 
@@ -90,6 +99,7 @@ class ApplicationService:
             raise ApplicationNotFoundException(f"Application with ID {application_id} does not exist.")
 
         await self.app_dao.delete(application_id)
+        await ClientRegistry.invalidate(application_id)
         LOGGER.info(f"Application with ID {application_id} has been successfully deleted.")
 
         return ok(message="Application has been successfully deleted.")
@@ -102,6 +112,7 @@ class ApplicationService:
 
         data_to_update = {k: v for k, v in app_data.model_dump().items() if v is not None}
         application = await self.app_dao.update(application_id, data_to_update)
+        await ClientRegistry.invalidate(application_id)
 
         if application.status != AppStatus.ACTIVE.value:
             return ok(message="Successfully updated application.",
@@ -109,31 +120,12 @@ class ApplicationService:
 
         LOGGER.debug(f"Updating application `{application.name}` pipelines.")
 
-        existing_pipelines_in_db = await self.pipelines_dao.get_by_application_id(application_id)
-        fetched_app_pipelines = await PipelineIdentifier.fetch_pipelines_from_application(application)
-
-        pipelines_to_delete = await PipelineIdentifier.identify_old_pipelines(existing_pipelines_in_db,
-                                                                              fetched_app_pipelines)
-        LOGGER.debug(f"Identified {len(pipelines_to_delete)} pipelines to delete.")
-
-        existing_pipeline_names = {f"{pipeline.name}-{pipeline.application_id}" for pipeline in
-                                   existing_pipelines_in_db}
-        new_pipelines = await PipelineIdentifier.identify_new_pipelines(fetched_app_pipelines, existing_pipeline_names)
-        LOGGER.debug(f"Identified {len(new_pipelines)} new pipelines.")
-
-        pipeline_ids_to_delete = [p.id for p in pipelines_to_delete]
-        pipeline_ids_to_delete_by_pattern = [pipeline.id for pipeline in existing_pipelines_in_db
-                                             if not re.search(app_data.regex_pattern, pipeline.name)]
-        ids_to_delete = list(set(pipeline_ids_to_delete + pipeline_ids_to_delete_by_pattern))
-
-        LOGGER.debug(f"Deleting {len(ids_to_delete)} pipelines.")
-        await self.pipelines_dao.delete_multiple(ids_to_delete)
-
-        if new_pipelines:
-            LOGGER.debug(f"Creating {len(new_pipelines)} new pipelines.")
-            await self.pipelines_dao.create_bulk(new_pipelines)
-        else:
-            LOGGER.debug("No new pipelines to be added.")
+        stats = await PipelineIdentifier.trigger_sync(application, config['pipelines_sync_app_timeout'], full=True)
+        if stats.status in (SyncStatus.FAILED.value, SyncStatus.TIMEOUT.value):
+            raise CustomHTTPException(
+                detail=f"Application has been updated, but synchronizing its pipelines failed: {stats.error}",
+                status_code=Status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
 
         return ok(message="Successfully updated application.",
                   data=ApplicationOut.model_validate(application.as_dict()))
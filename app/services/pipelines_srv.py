@@ -1,14 +1,28 @@
+import asyncio
+import re
+from collections import defaultdict
+from functools import partial
+from typing import Optional, Callable, Awaitable
+
+import httpx
 from fastapi import Request
+from fastapi import status as Status
 
 from app.daos.pipelines_dao import PipelineDAO
+from app.exceptions.custom_http_expeption import CustomHTTPException
 from app.exceptions.pipeline_exceptions import PipelineNotFoundException
 from app.schemas.applications_sch import ApplicationOut
 from app.schemas.pipelines_sch import PipelineOut, GitlabStartPipelineParams, JenkinsStartPipelineParams, \
     GithubStartPipelineParams
 from app.utils.clients.client_manager import ClientManager
+from app.utils.clients.github import RUNS_PER_PAGE
 from app.utils.enums import AppType, SessionAttributes, AccessLevel, AppStatus
+from app.utils.log_archive import LogArchive, iter_archived_lines
 from app.utils.logger import Logger
-from app.utils.response import ok
+from app.utils.log_sections import LogSections
+from app.utils.log_stream import iter_response_lines, iter_log_lines, read_log_window, search_log, LogWindow, \
+    LogSearch, LogMatcher, parse_log_sections
+from app.utils.response import ok, stream_lines
 
 LOGGER = Logger().start_logger()
 
@@ -44,6 +58,79 @@ class PipelinesService:
 
         LOGGER.info(f"User access validated for pipeline ID {pipeline_id}.")
 
+    @staticmethod
+    def _validate_log_window(head: int = None, tail: int = None, start: int = None, end: int = None):
+        ranged = start is not None or end is not None
+        if sum((head is not None, tail is not None, ranged)) != 1 or ranged and (start is None or end is None):
+            raise CustomHTTPException(detail="Exactly one of head, tail or start and end must be provided.",
+                                      status_code=Status.HTTP_400_BAD_REQUEST)
+        if ranged and end < start:
+            raise CustomHTTPException(detail="The end line must not precede the start line.",
+                                      status_code=Status.HTTP_400_BAD_REQUEST)
+
+    @staticmethod
+    def _compile_log_pattern(pattern: str, ignore_case: bool, regex: bool) -> LogMatcher:
+        try:
+            return LogMatcher(pattern, ignore_case, regex)
+        except re.error as e:
+            raise CustomHTTPException(detail=f"Invalid search pattern: {e}.",
+                                      status_code=Status.HTTP_400_BAD_REQUEST)
+
+    @staticmethod
+    async def _stream_log(archive: Optional[LogArchive], open_log: Callable[[], Awaitable[httpx.Response]]):
+        """Stream the lines of an archived log, or of the upstream log while the job is running."""
+        if archive is not None:
+            return stream_lines(iter_archived_lines(archive))
+        return stream_lines(iter_response_lines(await open_log()))
+
+    @staticmethod
+    async def _read_log_window(archive: Optional[LogArchive], open_log: Callable[[], Awaitable[httpx.Response]],
+                               head: int = None, tail: int = None, start: int = None, end: int = None) -> LogWindow:
+        """Read a window of lines of an archived log, or of the upstream log closed once the window is complete."""
+        if archive is not None:
+            with archive:
+                return archive.read_window(head, tail, start, end)
+
+        response = await open_log()
+        try:
+            return await read_log_window(iter_log_lines(response.aiter_bytes()), head, tail, start, end)
+        finally:
+            await response.aclose()
+
+    @staticmethod
+    async def _search_log(archive: Optional[LogArchive], open_log: Callable[[], Awaitable[httpx.Response]],
+                          matcher: LogMatcher, context: int, max_matches: int) -> LogSearch:
+        """Search an archived log, or the upstream log closed once the match limit is reached."""
+        try:
+            with matcher:
+                if archive is not None:
+                    with archive:
+                        return await archive.search(matcher, context, max_matches)
+
+                response = await open_log()
+                try:
+                    return await search_log(iter_log_lines(response.aiter_bytes()), matcher, context, max_matches)
+                finally:
+                    await response.aclose()
+        except TimeoutError as e:
+            raise CustomHTTPException(detail=f"Search pattern is too expensive: {e}",
+                                      status_code=Status.HTTP_400_BAD_REQUEST)
+
+    @staticmethod
+    async def _read_log_sections(archive: Optional[LogArchive],
+                                 open_log: Callable[[], Awaitable[httpx.Response]]) -> LogSections:
+        """Read the sections parsed when a log was archived, or parse them from the upstream log."""
+        if archive is not None:
+            with archive:
+                return archive.read_sections()
+
+        response = await open_log()
+        try:
+            # Without an archive the job is still running, and so are its last sections
+            return await parse_log_sections(response.aiter_bytes(), complete=False)
+        finally:
+            await response.aclose()
+
     async def get_all_pipelines(self, request: Request):
         user_access_level = request.session.get(SessionAttributes.USER_ACCESS_LEVEL.value)
         user_pipelines = request.session.get(SessionAttributes.USER_PIPELINES.value)
@@ -87,11 +174,11 @@ class PipelinesService:
             data=[PipelineOut.model_validate(pipeline.as_dict()) for pipeline in pipelines]
         )
 
-    async def get_gitlab_pipeline_builds(self, request: Request, pipeline_id: int):
+    async def get_gitlab_pipeline_builds(self, request: Request, pipeline_id: int, pipeline_jobs: bool = False):
         await self._validate_user_access(request, pipeline_id)
 
         pipeline, client = await self._get_pipeline_and_client(pipeline_id)
-        data = await client.get_project_pipelines_list(pipeline.project_id)
+        data = await client.get_project_pipelines_list(pipeline.project_id, pipeline_jobs)
         LOGGER.info(f"Retrieved {len(data)} GitLab pipeline builds for pipeline ID {pipeline_id}.")
         return ok(message="Successfully provided gitlab pipeline builds.", data=data)
 
@@ -124,12 +211,75 @@ class PipelinesService:
         LOGGER.info(f"Retrieved job trace for GitLab pipeline ID {pipeline_id}, build ID {build_id}, job ID {job_id}.")
         return ok(message="Successfully provided pipeline build stage.", data=data)
 
+    async def stream_gitlab_pipeline_build_job_log(self, request: Request,
+                                                   pipeline_id: int, build_id: int, job_id: int):
+        await self._validate_user_access(request, pipeline_id)
+
+        pipeline, client = await self._get_pipeline_and_client(pipeline_id)
+        archive = await client.get_archived_job_log(pipeline.project_id, job_id)
+
+        LOGGER.info(f"Streaming job log for GitLab pipeline ID {pipeline_id}, build ID {build_id}, job ID {job_id}.")
+        return await self._stream_log(archive, partial(client.open_job_log, pipeline.project_id, job_id))
+
+    async def get_gitlab_pipeline_build_job_log_tail(self, request: Request, pipeline_id: int, build_id: int,
+                                                     job_id: int, offset: int, max_bytes: int):
+        await self._validate_user_access(request, pipeline_id)
+
+        pipeline, client = await self._get_pipeline_and_client(pipeline_id)
+        data = await client.get_job_log_tail(pipeline.project_id, job_id, offset, max_bytes)
+
+        LOGGER.info(f"Retrieved {len(data.lines)} new log lines for GitLab pipeline ID {pipeline_id}, "
+                    f"build ID {build_id}, job ID {job_id}.")
+        return ok(message="Successfully provided gitlab job log tail.", data=data)
+
+    async def get_gitlab_pipeline_build_job_log_lines(self, request: Request, pipeline_id: int, build_id: int,
+                                                      job_id: int, head: int = None, tail: int = None,
+                                                      start: int = None, end: int = None):
+        await self._validate_user_access(request, pipeline_id)
+        self._validate_log_window(head, tail, start, end)
+
+        pipeline, client = await self._get_pipeline_and_client(pipeline_id)
+        archive = await client.get_archived_job_log(pipeline.project_id, job_id)
+        data = await self._read_log_window(archive, partial(client.open_job_log, pipeline.project_id, job_id),
+                                           head, tail, start, end)
+
+        LOGGER.info(f"Retrieved {len(data.lines)} log lines for GitLab pipeline ID {pipeline_id}, "
+                    f"build ID {build_id}, job ID {job_id}.")
+        return ok(message="Successfully provided gitlab job log lines.", data=data)
+
+    async def search_gitlab_pipeline_build_job_log(self, request: Request, pipeline_id: int, build_id: int,
+                                                  job_id: int, pattern: str, ignore_case: bool = False,
+                                                  regex: bool = False, context: int = 0, max_matches: int = 100):
+        await self._validate_user_access(request, pipeline_id)
+        compiled = self._compile_log_pattern(pattern, ignore_case, regex)
+
+        pipeline, client = await self._get_pipeline_and_client(pipeline_id)
+        archive = await client.get_archived_job_log(pipeline.project_id, job_id)
+        data = await self._search_log(archive, partial(client.open_job_log, pipeline.project_id, job_id),
+                                      compiled, context, max_matches)
+
+        LOGGER.info(f"Found {len(data.matches)} log matches for GitLab pipeline ID {pipeline_id}, "
+                    f"build ID {build_id}, job ID {job_id}.")
+        return ok(message="Successfully searched gitlab job log.", data=data)
+
+    async def get_gitlab_pipeline_build_job_log_sections(self, request: Request, pipeline_id: int, build_id: int,
+                                                         job_id: int):
+        await self._validate_user_access(request, pipeline_id)
+
+        pipeline, client = await self._get_pipeline_and_client(pipeline_id)
+        archive = await client.get_archived_job_log(pipeline.project_id, job_id)
+        data = await self._read_log_sections(archive, partial(client.open_job_log, pipeline.project_id, job_id))
+
+        LOGGER.info(f"Retrieved {len(data.sections)} log sections for GitLab pipeline ID {pipeline_id}, "
+                    f"build ID {build_id}, job ID {job_id}.")
+        return ok(message="Successfully provided gitlab job log sections.", data=data)
+
     async def run_new_gitlab_pipeline_build(self, request: Request,
                                             pipeline_id: int, params: GitlabStartPipelineParams):
         await self._validate_user_access(request, pipeline_id)
 
         pipeline, client = await self._get_pipeline_and_client(pipeline_id)
-        data = await client.start_new_pipeline(pipeline.project_id, params.model_dump())
+        data = await client.start_new_pipeline(pipeline.project_id, params.model_dump(), pipeline.default_branch)
 
         LOGGER.info(
             f"Started new GitLab pipeline build for pipeline ID {pipeline_id} with parameters {params.model_dump()}.")
@@ -157,7 +307,7 @@ class PipelinesService:
         await self._validate_user_access(request, pipeline_id)
 
         pipeline, client = await self._get_pipeline_and_client(pipeline_id)
-        params = await client.get_pipeline_params(pipeline.project_id)
+        params = await client.get_pipeline_params(pipeline.project_id, pipeline.default_branch)
 
         LOGGER.info(f"Retrieved parameters for GitLab pipeline ID {pipeline_id}.")
         return ok(message="Successfully provided gitlab pipeline params.", data=params)
@@ -179,11 +329,53 @@ class PipelinesService:
             data=[PipelineOut.model_validate(pipeline.as_dict()) for pipeline in pipelines]
         )
 
-    async def get_github_pipeline_builds(self, request: Request, pipeline_id: int):
+    async def get_github_pipelines_latest_status(self, request: Request):
+        user_access_level = request.session.get(SessionAttributes.USER_ACCESS_LEVEL.value)
+        user_pipelines = request.session.get(SessionAttributes.USER_PIPELINES.value)
+
+        if user_access_level != AccessLevel.ADMIN.value:
+            pipelines = await self.pipelines_dao.get_by_application_type_and_ids(AppType.GITHUB.value, user_pipelines)
+        else:
+            pipelines = await self.pipelines_dao.get_by_application_type(AppType.GITHUB.value)
+
+        pipelines_by_application = defaultdict(list)
+        for pipeline in pipelines:
+            pipelines_by_application[pipeline.application_id].append(pipeline)
+
+        async def get_application_latest_runs(application_pipelines: list) -> list:
+            application = application_pipelines[0].application
+            client = await self.client_manager.create_client(application)
+            latest_runs = await client.get_latest_runs({int(pipeline.project_id) for pipeline in application_pipelines})
+            runs_by_name = {run['name']: run for run in latest_runs}
+            return [{'pipeline_id': pipeline.id, 'name': pipeline.name, **(runs_by_name.get(pipeline.name) or {})}
+                    for pipeline in application_pipelines]
+
+        # One failing application only marks its own pipelines instead of failing the whole response
+        results = await asyncio.gather(*(get_application_latest_runs(application_pipelines)
+                                         for application_pipelines in pipelines_by_application.values()),
+                                       return_exceptions=True)
+        data = []
+        for application_pipelines, statuses in zip(pipelines_by_application.values(), results):
+            if isinstance(statuses, BaseException):
+                if not isinstance(statuses, Exception):
+                    raise statuses
+                LOGGER.warning(f"Failed to get the latest runs of GitHub application with ID "
+                               f"{application_pipelines[0].application_id}: {getattr(statuses, 'detail', statuses)}")
+                statuses = [{'pipeline_id': pipeline.id, 'name': pipeline.name,
+                             'error': "Failed to fetch the latest status from GitHub."}
+                            for pipeline in application_pipelines]
+            data.extend(statuses)
+
+        LOGGER.info(f"Retrieved the latest status of {len(data)} GitHub pipelines.")
+        return ok(message="Successfully provided the latest status of github pipelines.", data=data)
+
+    async def get_github_pipeline_builds(self, request: Request, pipeline_id: int, page: int = 1,
+                                         per_page: int = RUNS_PER_PAGE):
         await self._validate_user_access(request, pipeline_id)
 
         pipeline, client = await self._get_pipeline_and_client(pipeline_id)
-        data = await client.get_project_pipelines_list(pipeline.project_id, pipeline.name)
+        data = await client.get_project_pipelines_list(pipeline.project_id, pipeline.name, pipeline.workflow_id,
+                                                       page, per_page)
 
         LOGGER.info(f"Retrieved {len(data)} GitHub pipeline builds for pipeline ID {pipeline_id}.")
         return ok(message="Successfully provided github pipeline builds.", data=data)
@@ -212,7 +404,8 @@ class PipelinesService:
         await self._validate_user_access(request, pipeline_id)
 
         pipeline, client = await self._get_pipeline_and_client(pipeline_id)
-        await client.start_new_pipeline(pipeline.name, pipeline.project_id, params.model_dump())
+        await client.start_new_pipeline(pipeline.name, pipeline.project_id, params.model_dump(), pipeline.workflow_id,
+                                        pipeline.default_branch)
 
         LOGGER.info(
             f"Started new GitHub pipeline build for pipeline ID {pipeline_id} with parameters {params.model_dump()}.")
@@ -256,6 +449,69 @@ class PipelinesService:
         LOGGER.info(f"Retrieved job trace for GitHub pipeline ID {pipeline_id}, build ID {build_id}, job ID {job_id}.")
         return ok(message="Successfully provided github pipeline job traces.", data=data)
 
+    async def stream_github_pipeline_build_job_log(self, request: Request,
+                                                   pipeline_id: int, build_id: int, job_id: int):
+        await self._validate_user_access(request, pipeline_id)
+
+        pipeline, client = await self._get_pipeline_and_client(pipeline_id)
+        archive = await client.get_archived_job_log(pipeline.project_id, job_id)
+
+        LOGGER.info(f"Streaming job log for GitHub pipeline ID {pipeline_id}, build ID {build_id}, job ID {job_id}.")
+        return await self._stream_log(archive, partial(client.open_job_log, pipeline.project_id, job_id))
+
+    async def get_github_pipeline_build_job_log_tail(self, request: Request, pipeline_id: int, build_id: int,
+                                                     job_id: int, offset: int, max_bytes: int):
+        await self._validate_user_access(request, pipeline_id)
+
+        pipeline, client = await self._get_pipeline_and_client(pipeline_id)
+        data = await client.get_job_log_tail(pipeline.project_id, job_id, offset, max_bytes)
+
+        LOGGER.info(f"Retrieved {len(data.lines)} new log lines for GitHub pipeline ID {pipeline_id}, "
+                    f"build ID {build_id}, job ID {job_id}.")
+        return ok(message="Successfully provided github job log tail.", data=data)
+
+    async def get_github_pipeline_build_job_log_lines(self, request: Request, pipeline_id: int, build_id: int,
+                                                      job_id: int, head: int = None, tail: int = None,
+                                                      start: int = None, end: int = None):
+        await self._validate_user_access(request, pipeline_id)
+        self._validate_log_window(head, tail, start, end)
+
+        pipeline, client = await self._get_pipeline_and_client(pipeline_id)
+        archive = await client.get_archived_job_log(pipeline.project_id, job_id)
+        data = await self._read_log_window(archive, partial(client.open_job_log, pipeline.project_id, job_id),
+                                           head, tail, start, end)
+
+        LOGGER.info(f"Retrieved {len(data.lines)} log lines for GitHub pipeline ID {pipeline_id}, "
+                    f"build ID {build_id}, job ID {job_id}.")
+        return ok(message="Successfully provided github job log lines.", data=data)
+
+    async def search_github_pipeline_build_job_log(self, request: Request, pipeline_id: int, build_id: int,
+                                                  job_id: int, pattern: str, ignore_case: bool = False,
+                                                  regex: bool = False, context: int = 0, max_matches: int = 100):
+        await self._validate_user_access(request, pipeline_id)
+        compiled = self._compile_log_pattern(pattern, ignore_case, regex)
+
+        pipeline, client = await self._get_pipeline_and_client(pipeline_id)
+        archive = await client.get_archived_job_log(pipeline.project_id, job_id)
+        data = await self._search_log(archive, partial(client.open_job_log, pipeline.project_id, job_id),
+                                      compiled, context, max_matches)
+
+        LOGGER.info(f"Found {len(data.matches)} log matches for GitHub pipeline ID {pipeline_id}, "
+                    f"build ID {build_id}, job ID {job_id}.")
+        return ok(message="Successfully searched github job log.", data=data)
+
+    async def get_github_pipeline_build_job_log_sections(self, request: Request, pipeline_id: int, build_id: int,
+                                                         job_id: int):
+        await self._validate_user_access(request, pipeline_id)
+
+        pipeline, client = await self._get_pipeline_and_client(pipeline_id)
+        archive = await client.get_archived_job_log(pipeline.project_id, job_id)
+        data = await self._read_log_sections(archive, partial(client.open_job_log, pipeline.project_id, job_id))
+
+        LOGGER.info(f"Retrieved {len(data.sections)} log sections for GitHub pipeline ID {pipeline_id}, "
+                    f"build ID {build_id}, job ID {job_id}.")
+        return ok(message="Successfully provided github job log sections.", data=data)
+
     async def get_all_jenkins_pipelines(self, request: Request):
         user_access_level = request.session.get(SessionAttributes.USER_ACCESS_LEVEL.value)
         user_pipelines = request.session.get(SessionAttributes.USER_PIPELINES.value)
@@ -275,7 +531,7 @@ class PipelinesService:
         await self._validate_user_access(request, pipeline_id)
 
         pipeline, client = await self._get_pipeline_and_client(pipeline_id)
-        data = await client.get_pipeline_builds(pipeline.name)
+        data = await client.get_pipeline_builds(pipeline.name, pipeline.job_url)
 
         LOGGER.info(f"Retrieved {len(data)} Jenkins pipeline builds for pipeline ID {pipeline_id}.")
         return ok(message="Successfully provided jenkins pipeline builds.", data=data)
@@ -284,17 +540,80 @@ class PipelinesService:
         await self._validate_user_access(request, pipeline_id)
 
         pipeline, client = await self._get_pipeline_and_client(pipeline_id)
-        data = await client.get_pipeline_build(pipeline.name, build_id)
+        data = await client.get_pipeline_build(pipeline.name, build_id, pipeline.job_url)
 
         LOGGER.info(f"Retrieved Jenkins pipeline build for pipeline ID {pipeline_id}, build ID {build_id}.")
         return ok(message="Successfully provided jenkins pipeline build.", data=data)
 
+    async def stream_jenkins_pipeline_build_log(self, request: Request, pipeline_id: int, build_id: int):
+        await self._validate_user_access(request, pipeline_id)
+
+        pipeline, client = await self._get_pipeline_and_client(pipeline_id)
+        archive = await client.get_archived_build_log(pipeline.name, build_id, pipeline.job_url)
+
+        LOGGER.info(f"Streaming build log for Jenkins pipeline ID {pipeline_id}, build ID {build_id}.")
+        return await self._stream_log(archive, partial(client.open_build_log, pipeline.name, build_id,
+                                                       pipeline.job_url))
+
+    async def get_jenkins_pipeline_build_log_tail(self, request: Request, pipeline_id: int, build_id: int,
+                                                  offset: int, max_bytes: int):
+        await self._validate_user_access(request, pipeline_id)
+
+        pipeline, client = await self._get_pipeline_and_client(pipeline_id)
+        data = await client.get_build_log_tail(pipeline.name, build_id, offset, max_bytes, pipeline.job_url)
+
+        LOGGER.info(f"Retrieved {len(data.lines)} new log lines for Jenkins pipeline ID {pipeline_id}, "
+                    f"build ID {build_id}.")
+        return ok(message="Successfully provided jenkins build log tail.", data=data)
+
+    async def get_jenkins_pipeline_build_log_lines(self, request: Request, pipeline_id: int, build_id: int,
+                                                   head: int = None, tail: int = None,
+                                                   start: int = None, end: int = None):
+        await self._validate_user_access(request, pipeline_id)
+        self._validate_log_window(head, tail, start, end)
+
+        pipeline, client = await self._get_pipeline_and_client(pipeline_id)
+        archive = await client.get_archived_build_log(pipeline.name, build_id, pipeline.job_url)
+        data = await self._read_log_window(archive, partial(client.open_build_log, pipeline.name, build_id,
+                                                            pipeline.job_url), head, tail, start, end)
+
+        LOGGER.info(f"Retrieved {len(data.lines)} log lines for Jenkins pipeline ID {pipeline_id}, "
+                    f"build ID {build_id}.")
+        return ok(message="Successfully provided jenkins build log lines.", data=data)
+
+    async def search_jenkins_pipeline_build_log(self, request: Request, pipeline_id: int, build_id: int,
+                                                pattern: str, ignore_case: bool = False, regex: bool = False,
+                                                context: int = 0, max_matches: int = 100):
+        await self._validate_user_access(request, pipeline_id)
+        compiled = self._compile_log_pattern(pattern, ignore_case, regex)
+
+        pipeline, client = await self._get_pipeline_and_client(pipeline_id)
+        archive = await client.get_archived_build_log(pipeline.name, build_id, pipeline.job_url)
+        data = await self._search_log(archive, partial(client.open_build_log, pipeline.name, build_id,
+                                                       pipeline.job_url), compiled, context, max_matches)
+
+        LOGGER.info(f"Found {len(data.matches)} log matches for Jenkins pipeline ID {pipeline_id}, "
+                    f"build ID {build_id}.")
+        return ok(message="Successfully searched jenkins build log.", data=data)
+
+    async def get_jenkins_pipeline_build_log_sections(self, request: Request, pipeline_id: int, build_id: int):
+        await self._validate_user_access(request, pipeline_id)
+
+        pipeline, client = await self._get_pipeline_and_client(pipeline_id)
+        archive = await client.get_archived_build_log(pipeline.name, build_id, pipeline.job_url)
+        data = await self._read_log_sections(archive, partial(client.open_build_log, pipeline.name, build_id,
+                                                              pipeline.job_url))
+
+        LOGGER.info(f"Retrieved {len(data.sections)} log sections for Jenkins pipeline ID {pipeline_id}, "
+                    f"build ID {build_id}.")
+        return ok(message="Successfully provided jenkins build log sections.", data=data)
+
     async def run_new_jenkins_pipeline_build(self, request: Request,
                                              pipeline_id: int, params: JenkinsStartPipelineParams):
         await self._validate_user_access(request, pipeline_id)
 
         pipeline, client = await self._get_pipeline_and_client(pipeline_id)
-        await client.start_pipeline(pipeline.name, params.model_dump())
+        await client.start_pipeline(pipeline.name, params.model_dump(), pipeline.job_url)
 
         LOGGER.info(f"Retrieved Jenkins pipeline build for pipeline ID {pipeline_id}.")
         return ok(message="Successfully started jenkins pipeline build.")
@@ -303,7 +622,7 @@ class PipelinesService:
         await self._validate_user_access(request, pipeline_id)
 
         pipeline, client = await self._get_pipeline_and_client(pipeline_id)
-        await client.cancel_pipeline(pipeline.name, build_id)
+        await client.cancel_pipeline(pipeline.name, build_id, pipeline.job_url)
 
         LOGGER.info(f"Canceled Jenkins pipeline build for pipeline ID {pipeline_id}, build ID {build_id}.")
         return ok(message="Successfully canceled jenkins pipeline build.")
@@ -312,7 +631,7 @@ class PipelinesService:
         await self._validate_user_access(request, pipeline_id)
 
         pipeline, client = await self._get_pipeline_and_client(pipeline_id)
-        params = await client.get_pipeline_params(pipeline.name)
+        params = await client.get_pipeline_params(pipeline.name, pipeline.job_url)
 
         LOGGER.info(f"Retrieved parameters for Jenkins pipeline ID {pipeline_id}.")
         return ok(message="Successfully provided jenkins pipeline params.", data=params)
@@ -321,7 +640,7 @@ class PipelinesService:
         await self._validate_user_access(request, pipeline_id)
 
         pipeline, client = await self._get_pipeline_and_client(pipeline_id)
-        await client.retry_pipeline(pipeline.name, build_id)
+        await client.retry_pipeline(pipeline.name, build_id, pipeline.job_url)
 
         LOGGER.info(f"Retried Jenkins pipeline build for pipeline ID {pipeline_id}, build ID {build_id}.")
         return ok(message="Successfully retried jenkins pipeline build.")
@@ -0,0 +1,84 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from fastapi import status as Status
+
+from app.config.config import Settings
+from app.daos.applications_dao import ApplicationDAO
+from app.daos.sync_runs_dao import SyncRunsDAO
+from app.exceptions.application_exception import ApplicationNotFoundException
+from app.schemas.sync_sch import SyncRunOut, SyncApplicationStatsOut, SyncRunApplicationOut
+from app.utils.enums import AppStatus
+from app.utils.logger import Logger
+from app.utils.pipeline_identifier import PipelineIdentifier
+from app.utils.response import ok, error
+from app.utils.sync_telemetry import ApplicationSyncStats
+
+LOGGER = Logger().start_logger()
+config = Settings().app
+
+
+class SyncService:
+    def __init__(self):
+        self.sync_runs_dao = SyncRunsDAO()
+        self.app_dao = ApplicationDAO()
+
+    @classmethod
+    def _sync_stats_out(cls, stats: ApplicationSyncStats) -> SyncRunApplicationOut:
+        return SyncRunApplicationOut.model_validate({**stats.as_dict(), "started_ts": stats.started_ts.isoformat()})
+
+    async def trigger_application_sync(self, application_id: int, wait: bool):
+        application = await self.app_dao.get_by_id(application_id)
+        if not application:
+            LOGGER.warning(f"Application with ID {application_id} not found.")
+            raise ApplicationNotFoundException(f"Application with ID {application_id} does not exist.")
+
+        if application.status != AppStatus.ACTIVE.value:
+            return error(message="Only active applications can be synchronized.",
+                         status_code=Status.HTTP_400_BAD_REQUEST)
+
+        task = PipelineIdentifier.trigger_sync(application, config['pipelines_sync_app_timeout'])
+        if not wait:
+            LOGGER.info(f"Pipelines sync of application with ID {application_id} has been triggered.")
+            return ok(message="Pipelines sync has been triggered.",
+                      data=self._sync_stats_out(PipelineIdentifier.get_sync_stats(application_id)))
+
+        # Shielded, so a client giving up does not cancel the sync other callers may be waiting for
+        stats = await asyncio.shield(task)
+        return ok(message="Pipelines sync has finished.", data=self._sync_stats_out(stats))
+
+    async def trigger_applications_sync(self, wait: bool):
+        applications = await self.app_dao.get_all_by_status(AppStatus.ACTIVE.value)
+        task = PipelineIdentifier.trigger_sync_applications(applications,
+                                                            concurrency=config['pipelines_sync_concurrency'],
+                                                            timeout=config['pipelines_sync_app_timeout'])
+        if not wait:
+            LOGGER.info(f"Pipelines sync of {len(applications)} applications has been triggered.")
+            return ok(message=f"Pipelines sync of {len(applications)} applications has been triggered.")
+
+        results = await asyncio.shield(task)
+        return ok(message="Pipelines sync has finished.",
+                  data=[self._sync_stats_out(stats) for stats in results.values()])
+
+    async def get_application_sync_status(self, application_id: int):
+        stats = await PipelineIdentifier.get_sync_state(application_id)
+        if stats is None:
+            return ok(message="Application has not been synchronized yet.")
+
+        return ok(message="Successfully provided the pipelines sync status.", data=self._sync_stats_out(stats))
+
+    async def get_sync_runs(self, limit: int):
+        sync_runs = await self.sync_runs_dao.get_recent(limit)
+        LOGGER.info(f"Retrieved {len(sync_runs)} pipelines sync runs.")
+        return ok(message="Successfully provided recent pipelines sync runs.",
+                  data=[SyncRunOut.model_validate(sync_run.as_dict()) for sync_run in sync_runs])
+
+    async def get_sync_stats(self, hours: int):
+        since = datetime.utcnow() - timedelta(hours=hours)
+        stats = await self.sync_runs_dao.get_application_stats(since)
+        LOGGER.info(f"Retrieved pipelines sync stats of {len(stats)} applications for the last {hours} hours.")
+        for application_stats in stats:
+            application_stats["last_run_ts"] = application_stats["last_run_ts"].isoformat()
+
+        return ok(message="Successfully provided pipelines sync stats.",
+                  data=[SyncApplicationStatsOut.model_validate(application_stats) for application_stats in stats])
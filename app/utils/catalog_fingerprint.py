@@ -0,0 +1,31 @@
+import hashlib
+from typing import List, Dict
+
+MODULUS = 2 ** 256
+
+
+class CatalogFingerprint:
+    """
+    Order independent fingerprint of a pipelines catalog.
+
+    Pages of a catalog may arrive in any order, so the fingerprint sums the hashes of the individual
+    pipelines instead of hashing the catalog as a whole.
+    """
+
+    def __init__(self):
+        self._digest = 0
+        self._count = 0
+
+    def update(self, pipelines_data: List[Dict]):
+        """
+        Add a page of pipelines to the fingerprint.
+
+        :param pipelines_data: Pipelines as dictionaries of stored columns, with the same keys in the same order.
+        """
+        for pipeline in pipelines_data:
+            key = "\0".join("" if value is None else str(value) for value in pipeline.values()).encode()
+            self._digest = (self._digest + int.from_bytes(hashlib.sha256(key).digest(), "big")) % MODULUS
+            self._count += 1
+
+    def hexdigest(self) -> str:
+        return f"{self._count}:{self._digest:064x}"
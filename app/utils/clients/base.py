@@ -1,8 +1,166 @@
+import hashlib
 from abc import ABC, abstractmethod
-from typing import List
+from datetime import datetime
+from typing import List, Dict, AsyncIterator, Optional, Tuple
+
+import httpx
+
+from app.config.config import Settings
+from app.utils.clients.rate_limiter import RateLimitedTransport
+from app.utils.clients.response_cache import CachingTransport, is_terminal
+from app.utils.clients.single_flight import SingleFlightTransport, STREAM_EXTENSION
+from app.utils import log_archive
+from app.utils.log_archive import LogArchive
+from app.utils.log_stream import LogTail, skip_bytes, read_log_tail
+from app.utils.sync_telemetry import count_upstream_request
+
+config = Settings().app
 
 
 class BaseClient(ABC):
+    _client: httpx.AsyncClient
+    _app_id: Optional[int] = None
+    # Whether iter_pipeline_pages can restrict discovery to pipelines changed since a point in time
+    supports_changed_since = False
+
+    @staticmethod
+    def create_http_client(headers: dict = None, timeout: float = 3, credential_key: str = None,
+                           auth: httpx.Auth = None, application_id: int = None) -> httpx.AsyncClient:
+        """
+        Create a pooled HTTP client that keeps connections to the CI server alive between requests.
+
+        :param headers: Default headers sent with every request.
+        :param timeout: Request timeout in seconds.
+        :param credential_key: Key of the rate limit budget the requests are paced by. Defaults to a
+                               digest of the headers, which carry the credentials of most clients.
+        :param auth: Authentication applied to every request.
+        :param application_id: ID of the application the client belongs to. Build responses are only
+                               cached for clients of stored applications.
+        :return: The HTTP client instance.
+        """
+        limits = httpx.Limits(
+            max_connections=config['http_max_connections'],
+            max_keepalive_connections=config['http_max_keepalive_connections'],
+            keepalive_expiry=config['http_keepalive_expiry']
+        )
+        if credential_key is None:
+            credential_key = hashlib.sha256(repr(sorted((headers or {}).items())).encode()).hexdigest()
+
+        transport = RateLimitedTransport(httpx.AsyncHTTPTransport(limits=limits, http2=config['http2']),
+                                         credential_key=credential_key)
+        transport = SingleFlightTransport(transport, credential_key=credential_key)
+        transport = CachingTransport(transport, application_id=application_id, credential_key=credential_key)
+        return httpx.AsyncClient(headers=headers, timeout=timeout, transport=transport, auth=auth,
+                                 event_hooks={'request': [count_upstream_request]})
+
+    async def close(self):
+        """Close the underlying HTTP client and release its connections."""
+        await self._client.aclose()
+
+    async def open_stream(self, url: str, headers: dict = None, follow_redirects: bool = False) -> httpx.Response:
+        """
+        Send a GET request whose response body is streamed instead of read into memory.
+
+        The request bypasses the response cache and request coalescing, which buffer responses.
+
+        :param url: Request URL.
+        :param headers: Additional request headers.
+        :param follow_redirects: Whether redirects are followed.
+        :return: The response, which has to be closed by the caller.
+        """
+        request = self._client.build_request("GET", url, headers=headers, extensions={STREAM_EXTENSION: True})
+        return await self._client.send(request, stream=True, follow_redirects=follow_redirects)
+
+    async def _get_archived_log(self, job_key: Tuple, status_url: str, log_url: str,
+                                follow_redirects: bool = False) -> Optional[LogArchive]:
+        """
+        Get the archived log of a job, archiving it on its first read once the job has finished.
+
+        :param job_key: Values identifying the job within the application.
+        :param status_url: URL of the job or build, whose payload tells whether it has finished.
+        :param log_url: Log URL.
+        :param follow_redirects: Whether redirects of the log request are followed.
+        :return: The archive, which has to be closed by the caller, or None while the job is running.
+        :raises httpx.HTTPStatusError: If the log could not be read.
+        """
+        archive = self._open_log_archive(job_key)
+        if archive is not None or self._app_id is None or not log_archive.is_enabled():
+            return archive
+
+        job = await self._client.get(status_url)
+        if job.status_code != 200 or not is_terminal(job.json()):
+            return None
+
+        response = await self.open_stream(log_url, follow_redirects=follow_redirects)
+        try:
+            response.raise_for_status()
+            return await self._archive_log(job_key, response)
+        finally:
+            await response.aclose()
+
+    def _open_log_archive(self, job_key: Tuple) -> Optional[LogArchive]:
+        """Open the archived log of a job of the application, if it has been archived."""
+        if self._app_id is None:
+            return None
+        return log_archive.open_archive(self._log_archive_key(job_key))
+
+    async def _archive_log(self, job_key: Tuple, response: httpx.Response) -> Optional[LogArchive]:
+        """Archive the complete log of a finished job from its upstream response."""
+        if self._app_id is None or not log_archive.is_enabled():
+            return None
+        return await log_archive.write_archive(self._log_archive_key(job_key), response.aiter_bytes())
+
+    def _log_archive_key(self, job_key: Tuple) -> str:
+        return ":".join(str(value) for value in (type(self).__name__, self._app_id, *job_key))
+
+    async def _read_ranged_log_tail(self, url: str, offset: int, max_bytes: int, complete: bool,
+                                    follow_redirects: bool = False) -> LogTail:
+        """
+        Read the lines a log gained since an offset with a `Range` request.
+
+        Servers ignoring the range answer with the whole log, whose bytes before the offset are skipped.
+
+        :param url: Log URL.
+        :param offset: Byte offset to read from.
+        :param max_bytes: Most bytes read.
+        :param complete: Whether the log has been fully written upstream.
+        :param follow_redirects: Whether redirects are followed.
+        :return: The new lines with the offset to continue from.
+        :raises httpx.HTTPStatusError: If the log could not be read.
+        """
+        # Ranges apply to the encoded body, so it is requested without compression
+        headers = {'Range': f"bytes={offset}-{offset + max_bytes - 1}", 'Accept-Encoding': 'identity'}
+        response = await self.open_stream(url, headers=headers, follow_redirects=follow_redirects)
+        try:
+            if response.status_code == 416:
+                # Nothing was written past the offset yet
+                return LogTail(lines=[], offset=offset, more=not complete)
+            response.raise_for_status()
+
+            chunks = response.aiter_bytes()
+            if response.status_code != 206:
+                chunks = skip_bytes(chunks, offset)
+            return await read_log_tail(chunks, offset, max_bytes, complete)
+        finally:
+            await response.aclose()
+
+    async def iter_pipeline_pages(self, regex_pattern: str = None,
+                                  changed_since: datetime = None) -> AsyncIterator[List[Dict]]:
+        """
+        Iterate over pages of discovered pipelines.
+
+        Clients without paginated discovery yield their whole catalog as a single page.
+
+        :param regex_pattern: Optional pattern the pipelines have to match.
+        :param changed_since: Only discover pipelines changed since this UTC time. Ignored unless
+                              supports_changed_since is set.
+        :return: Async iterator of pipeline dictionary lists.
+        """
+        if regex_pattern:
+            yield await self.get_pipelines_list_by_pattern(regex_pattern)
+        else:
+            yield await self.get_pipelines_list()
+
     @abstractmethod
     async def check_connection(self):
         pass
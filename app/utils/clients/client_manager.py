@@ -1,12 +1,24 @@
+from app.daos.applications_dao import ApplicationDAO
+from app.exceptions.application_exception import ApplicationNotFoundException
+from app.models import db_models as model
 from app.schemas.applications_sch import ApplicationOut
 from app.utils.clients.base import BaseClient
+from app.utils.clients.client_registry import ClientRegistry
 from app.utils.clients.factories.client_factory_provider import ClientFactoryProvider
 
 
 class ClientManager:
     @staticmethod
-    async def create_client(application: ApplicationOut) -> BaseClient:
+    async def create_client(application: ApplicationOut | model.Applications) -> BaseClient:
         factory = ClientFactoryProvider.get_factory(application.type)
         if not factory:
             raise ValueError(f"No factory found for application type {application.type}")
-        return await factory.create_client(application)
+
+        if not isinstance(application, model.Applications):
+            # Credentials are not exposed through the schema, so load the stored application.
+            application_id = application.id
+            application = await ApplicationDAO().get_by_id(application_id)
+            if not application:
+                raise ApplicationNotFoundException(f"Application with ID {application_id} does not exist.")
+
+        return await ClientRegistry.get_client(application, factory)
@@ -0,0 +1,103 @@
+import asyncio
+import hashlib
+from typing import Dict, Tuple
+
+from app.models import db_models as model
+from app.utils.clients.base import BaseClient
+from app.utils.clients.factories.base_factory import BaseClientFactory
+from app.utils.clients.response_cache import CachingTransport
+from app.utils.logger import Logger
+
+LOGGER = Logger().start_logger()
+
+# Seconds a replaced client stays open for the syncs and log streams still using it
+RETIRED_CLIENT_GRACE = 600
+
+
+class ClientRegistry:
+    """Process wide registry of long-lived clients keyed by application ID and credential fingerprint."""
+    _clients: Dict[Tuple[int, str], BaseClient] = {}
+    # Clients no longer handed out, with the tasks closing them once their grace period is over
+    _retired: Dict[BaseClient, asyncio.Task] = {}
+    _lock = asyncio.Lock()
+
+    @staticmethod
+    def fingerprint(application: model.Applications) -> str:
+        """
+        Build a fingerprint of everything a client is configured with.
+
+        :param application: The application details.
+        :return: Hex digest identifying the application credentials.
+        """
+        values = (application.type, application.base_url, application.auth_user, application.auth_pass)
+        return hashlib.sha256("\0".join(str(value or "") for value in values).encode()).hexdigest()
+
+    @classmethod
+    async def get_client(cls, application: model.Applications, factory: BaseClientFactory) -> BaseClient:
+        """
+        Return the pooled client of an application, creating it on first use.
+
+        A client registered for the same application with outdated credentials is replaced and closed
+        after a grace period.
+
+        :param application: The application details.
+        :param factory: The factory used to create a missing client.
+        :return: The client instance.
+        """
+        key = (application.id, cls.fingerprint(application))
+        client = cls._clients.get(key)
+        if client:
+            return client
+
+        async with cls._lock:
+            client = cls._clients.get(key)
+            if client:
+                return client
+
+            cls._retire_clients(application.id)
+            client = await factory.create_client(application)
+            cls._clients[key] = client
+            LOGGER.debug(f"Registered a new pooled client for application ID {application.id}.")
+
+        return client
+
+    @classmethod
+    async def invalidate(cls, application_id: int):
+        """
+        Forget all clients of an application and drop its cached responses.
+
+        The clients are closed after a grace period, so requests and log streams already using them
+        can complete.
+
+        :param application_id: The application ID.
+        """
+        async with cls._lock:
+            cls._retire_clients(application_id)
+        CachingTransport.invalidate(application_id)
+
+    @classmethod
+    async def close_all(cls):
+        """Close all registered clients."""
+        async with cls._lock:
+            for task in cls._retired.values():
+                task.cancel()
+            clients = [*cls._clients.values(), *cls._retired]
+            cls._clients.clear()
+            cls._retired.clear()
+            await asyncio.gather(*(client.close() for client in clients), return_exceptions=True)
+            LOGGER.debug(f"Closed {len(clients)} pooled clients.")
+
+    @classmethod
+    def _retire_clients(cls, application_id: int):
+        for key in [key for key in cls._clients if key[0] == application_id]:
+            client = cls._clients.pop(key)
+            cls._retired[client] = asyncio.create_task(cls._close_retired_client(client, application_id))
+
+    @classmethod
+    async def _close_retired_client(cls, client: BaseClient, application_id: int):
+        await asyncio.sleep(RETIRED_CLIENT_GRACE)
+        cls._retired.pop(client, None)
+        try:
+            await client.close()
+        except Exception as e:
+            LOGGER.warning(f"Failed to close client for application ID {application_id}: {e}")
@@ -1,11 +1,11 @@
 from abc import ABC, abstractmethod
-from app.schemas.applications_sch import ApplicationOut
+from app.models import db_models as model
 
 
 class BaseClientFactory(ABC):
     """Abstract base class to client factory"""
     @abstractmethod
-    async def create_client(self, application: ApplicationOut):
+    async def create_client(self, application: model.Applications):
         """
         Abstract method to create a client based on the application details.
         :param application: The application details.
@@ -1,14 +1,14 @@
-from app.schemas.applications_sch import ApplicationOut
+from app.models import db_models as model
 from app.utils.clients.factories.base_factory import BaseClientFactory
 from app.utils.clients.github import GithubClient
 
 
 class GithubClientFactory(BaseClientFactory):
     """Factory class to create Gitlab client instance."""
-    async def create_client(self, application: ApplicationOut) -> GithubClient:
+    async def create_client(self, application: model.Applications) -> GithubClient:
         """
         Create a Gitlab client based on the application details.
         :param application: The application details.
         :return: GitlabClient: The Gitlab client instance.
         """
-        return await GithubClient.from_application_id(application.id)
+        return GithubClient.from_application(application)
@@ -1,18 +1,79 @@
 import asyncio
 import base64
 import datetime
+import hashlib
 import json
 import re
-from typing import List, Dict
+from collections import OrderedDict
+from typing import List, Dict, AsyncIterator, Optional, Any, Callable, Tuple
 
 import httpx
+import yaml
 from fastapi import status
 
+from app.config.config import Settings
 from app.daos.applications_dao import ApplicationDAO
 from app.exceptions.custom_http_expeption import CustomHTTPException
 from app.exceptions.github_expeption import CustomGithubException
+from app.models import db_models as model
 from app.utils.clients.base import BaseClient
+from app.utils.clients.github_app_auth import GithubAppAuth, is_private_key
+from app.utils.clients.response_cache import is_terminal
 from app.utils.enums import AppType
+from app.utils.log_archive import LogArchive
+from app.utils.log_stream import LogTail, clean_log_text
+from app.utils.logger import Logger
+
+LOGGER = Logger().start_logger()
+config = Settings().app
+PER_PAGE = 100
+RUNS_PER_PAGE = 30
+# Serialized bytes of the data of list pages kept for revalidation, across all clients
+REVALIDATED_PAGES_MAX_BYTES = 32 * 1024 * 1024
+# Repositories resolved per GraphQL query, kept well below the node limit of a single query
+GRAPHQL_BATCH_SIZE = 50
+LATEST_CHECK_SUITES = 50
+WORKFLOW_FILES_QUERY = """
+query($ids: [ID!]!) {
+  nodes(ids: $ids) {
+    ... on Repository {
+      databaseId
+      object(expression: "HEAD:.github/workflows") {
+        ... on Tree {
+          entries { name path object { ... on Blob { text isTruncated } } }
+        }
+      }
+    }
+  }
+}
+"""
+
+LATEST_RUNS_QUERY = """
+query($ids: [ID!]!, $checkSuites: Int!) {
+  nodes(ids: $ids) {
+    ... on Repository {
+      databaseId
+      name
+      defaultBranchRef {
+        name
+        target {
+          ... on Commit {
+            checkSuites(last: $checkSuites) {
+              nodes {
+                status
+                conclusion
+                createdAt
+                updatedAt
+                workflowRun { databaseId runNumber url workflow { databaseId name } }
+              }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+"""
 
 
 class GitHubErrorMessages:
@@ -21,27 +82,67 @@ class GitHubErrorMessages:
 
 
 class GithubClient(BaseClient):
-    def __init__(self, base_url: str, token: str, application_id: int = None):
-        """Initialize the GitHub client."""
-        self._client = httpx.AsyncClient(
-            headers={'Authorization': f"token {token}", 'Accept': 'application/vnd.github.v3+json'},
-            timeout=3
-        )
+    # (credential key, url) -> (etag, extracted data, next page url, size) of list pages seen before
+    _revalidated_pages: "OrderedDict[Tuple[str, str], Tuple[str, Any, Optional[str], int]]" = OrderedDict()
+    _revalidated_pages_size = 0
+
+    def __init__(self, base_url: str, token: str, application_id: int = None, user: str = None):
+        """
+        Initialize the GitHub client.
+
+        A personal access token is sent as is. A GitHub App private key authenticates as an app
+        installation instead, with `user` holding `app_id` or `app_id:installation_id`.
+        """
+        headers = {'Accept': 'application/vnd.github.v3+json'}
+        self._app_auth_client = None
+        if is_private_key(token):
+            github_app_id, installation_id = GithubAppAuth.parse_app_user(user)
+            self._credential_key = f"github-app:{github_app_id}:{installation_id or ''}"
+            self._app_auth_client = self.create_http_client(headers=headers, timeout=10,
+                                                            credential_key=f"github-app:{github_app_id}")
+            self._client = self.create_http_client(
+                headers=headers, timeout=3, credential_key=self._credential_key,
+                auth=GithubAppAuth(self._app_auth_client, base_url, github_app_id, token, installation_id),
+                application_id=application_id)
+        else:
+            self._credential_key = hashlib.sha256(token.encode()).hexdigest()
+            self._client = self.create_http_client(headers={**headers, 'Authorization': f"token {token}"}, timeout=3,
+                                                   application_id=application_id)
         self._base_url = base_url
         self._app_id = application_id
 
     @classmethod
     async def from_application_id(cls, application_id: int):
         """Alternative constructor using application ID."""
-        app = await ApplicationDAO().get_by_id(application_id)
-        return cls(base_url=app.base_url, token=app.auth_pass, application_id=application_id)
+        return cls.from_application(await ApplicationDAO().get_by_id(application_id))
+
+    @classmethod
+    def from_application(cls, application: model.Applications):
+        """Alternative constructor using a stored application."""
+        return cls(base_url=application.base_url, token=application.auth_pass, application_id=application.id,
+                   user=application.auth_user)
+
+    @property
+    def is_app_installation(self) -> bool:
+        """Whether the client authenticates as a GitHub App installation."""
+        return self._app_auth_client is not None
+
+    async def close(self):
+        """Close the underlying HTTP clients and release their connections."""
+        await super().close()
+        if self._app_auth_client is not None:
+            await self._app_auth_client.aclose()
 
     async def check_connection(self):
-        """Check if the provided GitLab private token is valid."""
+        """Check if the provided GitHub token or GitHub App installation is valid."""
         try:
-            response = await self._client.get(url=f"{self._base_url}/user")
+            if self.is_app_installation:
+                response = await self._client.get(url=f"{self._base_url}/installation/repositories",
+                                                  params={'per_page': 1})
+            else:
+                response = await self._client.get(url=f"{self._base_url}/user")
             return response.status_code == status.HTTP_200_OK
-        except httpx.RequestError as e:
+        except (httpx.RequestError, CustomGithubException):
             return False
 
     async def check_connection_to_org_repos(self, org_name) -> bool:
@@ -54,23 +155,50 @@ class GithubClient(BaseClient):
             return False
 
     async def get_pipelines_list(self) -> List:
-        """Fetch all repositories the authenticated user has access to."""
+        """Fetch all workflows of the repositories the authenticated user has access to."""
+        pipelines = []
+        async for page in self.iter_pipeline_pages():
+            pipelines.extend(page)
+
+        return pipelines
+
+    async def get_pipelines_list_by_pattern(self, regex_pattern: str) -> List:
+        """Fetch all workflows whose "[repository] workflow" pipeline name matches regex_pattern."""
+        pipelines = []
+        async for page in self.iter_pipeline_pages(regex_pattern):
+            pipelines.extend(page)
+
+        return pipelines
+
+    async def iter_pipeline_pages(self, regex_pattern: Optional[str] = None,
+                                  changed_since: datetime.datetime = None) -> AsyncIterator[List[Dict]]:
+        """
+        Iterate over workflows of all accessible repositories, one page of repositories at a time.
+
+        The workflow requests of each repository page run concurrently with a bounded fan-out, and
+        regex_pattern is matched against the resulting "[repository] workflow" names. Pages seen
+        before are revalidated with their ETag, so an unchanged catalog costs only 304 responses.
+        With `github_graphql` enabled, the workflows of a whole page are read from the workflow files
+        in a few GraphQL queries instead, which leaves out the dynamic workflows GitHub runs without
+        a file in `.github/workflows`, like CodeQL default setup, Pages or Dependabot updates.
+        """
         try:
-            response = await self._client.get(f"{self._base_url}/user/repos")
-            response.raise_for_status()
-            pipelines = response.json()
-            updated_pipelines = []
-            for pipeline in pipelines:
-                url = f"{self._base_url}/repositories/{pipeline['id']}/actions/workflows"
-                response = await self._client.get(url)
-                response.raise_for_status()
-
-                workflows = response.json()["workflows"]
-                for workflow in workflows:
-                    updated_pipelines.append({'id': pipeline["id"], 'name': f"[{pipeline['name']}] {workflow['name']}",
-                                              'app': self._app_id, 'type': AppType.GITHUB.value})
-
-            return updated_pipelines
+            semaphore = asyncio.Semaphore(config['upstream_concurrency'])
+            async for repositories in self._iter_repositories():
+                if config['github_graphql']:
+                    workflows_list = await self._get_repositories_workflows_by_graphql(repositories, semaphore)
+                else:
+                    workflows_list = await asyncio.gather(
+                        *(self._get_repository_workflows(repository, semaphore) for repository in repositories))
+
+                pipelines = [{'id': repository["id"], 'name': f"[{repository['name']}] {workflow['name']}",
+                              'workflow_id': str(workflow['id']), 'workflow_path': workflow['path'],
+                              'default_branch': repository['default_branch'], 'app': self._app_id,
+                              'type': AppType.GITHUB.value}
+                             for repository, workflows in zip(repositories, workflows_list)
+                             for workflow in workflows]
+                yield [pipeline for pipeline in pipelines
+                       if not regex_pattern or re.search(regex_pattern, pipeline['name'])]
         except httpx.RequestError as e:
             raise CustomGithubException(
                 detail=str(e),
@@ -82,46 +210,277 @@ class GithubClient(BaseClient):
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-    async def get_pipelines_list_by_pattern(self, regex_pattern: str) -> List:
-        """Fetch all repositories by regex_pattern."""
-        pipelines = await self.get_pipelines_list()
-        if not pipelines:
-            return []
+    async def _iter_paginated(self, url: str, params: Dict = None,
+                              extract: Callable[[Any], Any] = None) -> AsyncIterator[Any]:
+        """Iterate over the pages of a list endpoint following the `Link: rel="next"` header."""
+        params = {'per_page': PER_PAGE, **(params or {})}
+        while url:
+            data, url = await self._get_revalidated_page(url, params, extract)
+            yield data
+
+            # The next link already carries all query parameters
+            params = None
+
+    async def _get_revalidated_page(self, url: str, params: Optional[Dict],
+                                    extract: Callable[[Any], Any] = None) -> Tuple[Any, Optional[str]]:
+        """
+        Fetch a list page, sending the ETag of the previous response as `If-None-Match`.
+
+        Conditional requests answered with 304 do not count against the GitHub rate limit, so the
+        data extracted from the previous response is reused. Pages are kept per credential in a
+        process wide LRU bounded by `REVALIDATED_PAGES_MAX_BYTES`.
+
+        :return: Tuple of the extracted page data and the next page URL.
+        """
+        key = (self._credential_key, str(httpx.URL(url).copy_merge_params(params or {})))
+        revalidated = self._revalidated_pages.get(key)
+        headers = {'If-None-Match': revalidated[0]} if revalidated else None
 
-        filtered_pipelines = []
+        response = await self._client.get(url, params=params, headers=headers)
+        if revalidated and response.status_code == status.HTTP_304_NOT_MODIFIED:
+            if key in self._revalidated_pages:
+                self._revalidated_pages.move_to_end(key)
+            return revalidated[1], revalidated[2]
 
-        for pipeline in pipelines:
-            if re.search(regex_pattern, pipeline["name"]):
-                filtered_pipelines.append(pipeline)
+        response.raise_for_status()
+        data = extract(response.json()) if extract else response.json()
+        next_url = response.links.get('next', {}).get('url')
+
+        etag = response.headers.get('ETag')
+        if etag:
+            self._store_revalidated_page(key, (etag, data, next_url, len(json.dumps(data))))
+
+        return data, next_url
+
+    @classmethod
+    def _store_revalidated_page(cls, key: Tuple[str, str], page: Tuple[str, Any, Optional[str], int]):
+        previous = cls._revalidated_pages.pop(key, None)
+        if previous is not None:
+            cls._revalidated_pages_size -= previous[3]
+        cls._revalidated_pages[key] = page
+        cls._revalidated_pages_size += page[3]
+
+        while cls._revalidated_pages_size > REVALIDATED_PAGES_MAX_BYTES:
+            _, evicted = cls._revalidated_pages.popitem(last=False)
+            cls._revalidated_pages_size -= evicted[3]
+
+    async def _iter_repositories(self) -> AsyncIterator[List[Dict]]:
+        """Iterate over the pages of repositories the authenticated user or app installation has access to."""
+        if self.is_app_installation:
+            url = f"{self._base_url}/installation/repositories"
+            extract = lambda page: [{'id': repository['id'], 'name': repository['name'],
+                                     'node_id': repository['node_id'],
+                                     'default_branch': repository.get('default_branch')}
+                                    for repository in page['repositories']]
+        else:
+            url = f"{self._base_url}/user/repos"
+            extract = lambda page: [{'id': repository['id'], 'name': repository['name'],
+                                     'node_id': repository['node_id'],
+                                     'default_branch': repository.get('default_branch')}
+                                    for repository in page]
+
+        async for repositories in self._iter_paginated(url, extract=extract):
+            yield repositories
+
+    async def _get_repository_workflows(self, repository: Dict, semaphore: asyncio.Semaphore) -> List[Dict]:
+        """Fetch all workflows of a repository."""
+        async with semaphore:
+            workflows = []
+            url = f"{self._base_url}/repositories/{repository['id']}/actions/workflows"
+            async for page in self._iter_paginated(
+                    url,
+                    extract=lambda page: [{'id': workflow['id'], 'name': workflow['name'], 'path': workflow['path']}
+                                          for workflow in page["workflows"]]):
+                workflows.extend(page)
+            return workflows
+
+    def _graphql_url(self) -> str:
+        """GitHub Enterprise Server serves GraphQL under /api/graphql next to the REST /api/v3 root."""
+        base_url = self._base_url.rstrip('/')
+        if base_url.endswith('/api/v3'):
+            return f"{base_url[:-len('/v3')]}/graphql"
+        return f"{base_url}/graphql"
+
+    async def _graphql(self, query: str, variables: Dict) -> Dict:
+        """Run a GraphQL query, tolerating errors of single nodes as long as data is returned."""
+        response = await self._client.post(self._graphql_url(), json={'query': query, 'variables': variables})
+        response.raise_for_status()
+
+        result = response.json()
+        if result.get('errors'):
+            if not result.get('data'):
+                raise CustomGithubException(detail=f"GitHub GraphQL query has failed: {result['errors']}",
+                                            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            LOGGER.warning(f"GitHub GraphQL query returned partial data: {result['errors']}")
+        return result['data']
+
+    async def _iter_repository_nodes(self, repositories: List[Dict], query: str,
+                                     variables: Dict = None) -> AsyncIterator[Dict]:
+        """Resolve repositories through a `nodes(ids:)` GraphQL query, a batch of repositories at a time."""
+        for index in range(0, len(repositories), GRAPHQL_BATCH_SIZE):
+            batch = repositories[index:index + GRAPHQL_BATCH_SIZE]
+            data = await self._graphql(query, {'ids': [repository['node_id'] for repository in batch],
+                                               **(variables or {})})
+            for node in data['nodes']:
+                if node:
+                    yield node
+
+    async def _get_repositories_workflows_by_graphql(self, repositories: List[Dict],
+                                                     semaphore: asyncio.Semaphore) -> List[List[Dict]]:
+        """
+        Read the workflows of multiple repositories from their workflow files on the default branch.
+
+        Only the files in `.github/workflows` are read, so dynamic workflows without a workflow file
+        are not listed.
+
+        Workflows are named like GitHub names them: after their top level `name` key, or after their
+        file path when it is missing. Repositories with a workflow whose name can not be read from
+        its file, or that GraphQL did not resolve, are listed through the REST API.
+
+        :return: Workflows of every repository, in the order of the repositories.
+        """
+        workflows = {}
+        async for node in self._iter_repository_nodes(repositories, WORKFLOW_FILES_QUERY):
+            entries = (node.get('object') or {}).get('entries') or []
+            parsed = [
+                # The REST API accepts the workflow file name wherever it expects a workflow ID
+                {'id': entry['name'], 'path': entry['path'],
+                 'name': self._parse_workflow_name(entry['path'], entry.get('object'))}
+                for entry in entries if entry['name'].endswith(('.yml', '.yaml'))
+            ]
+            if all(workflow['name'] is not None for workflow in parsed):
+                workflows[node['databaseId']] = parsed
+
+        unresolved = [repository for repository in repositories if repository['id'] not in workflows]
+        if unresolved:
+            LOGGER.debug(f"Listing the workflows of {len(unresolved)} repositories through the REST API.")
+            for repository, repository_workflows in zip(unresolved, await asyncio.gather(
+                    *(self._get_repository_workflows(repository, semaphore) for repository in unresolved))):
+                workflows[repository['id']] = repository_workflows
+
+        return [workflows[repository['id']] for repository in repositories]
+
+    @staticmethod
+    def _parse_workflow_name(path: str, blob: Optional[Dict]) -> Optional[str]:
+        """
+        Read the name of a workflow from its file.
+
+        Like GitHub, workflows without a `name` key or whose file is not valid YAML are named after
+        their file path.
+
+        :param path: Path of the workflow file.
+        :param blob: Git blob of the workflow file.
+        :return: Name of the workflow, or None if the file content is missing or its name is not a string.
+        """
+        content = (blob or {}).get('text')
+        if content is None or blob.get('isTruncated'):
+            return None
+
+        try:
+            workflow = yaml.safe_load(content)
+        except yaml.YAMLError:
+            return path
+        name = workflow.get('name') if isinstance(workflow, dict) else None
+        if name is None or name == "":
+            return path
+        # Scalars like `1.10` load as numbers, GitHub keeps their text
+        return name if isinstance(name, str) else None
+
+    async def get_latest_runs(self, repository_ids: Optional[set] = None) -> List[Dict]:
+        """
+        Get the latest run of every workflow on the head commit of the default branch of repositories.
 
-        return filtered_pipelines
+        Repositories are listed with the usual revalidated REST pages and their check suites are read
+        with batched GraphQL queries, instead of listing the runs of every workflow separately.
 
-    async def get_project_pipelines_list(self, project_id: str, workflow_name: str) -> List:
-        """Get information about a project's pipelines."""
+        :param repository_ids: IDs of the repositories to include, or None for all accessible ones.
+        :return: List of latest workflow runs.
+        """
         try:
-            workflows_url = f"{self._base_url}/repositories/{project_id}/actions/workflows"
-            workflow_response = await self.get_json(workflows_url)
-            workflows = workflow_response.get("workflows", [])
-            # Reformat workflow name since it is at pipeline creation
-            workflow_name = workflow_name.split("] ")[1]
-            workflow = next(
-                (workflow for workflow in workflows if workflow['name'] == workflow_name),
-                None
+            latest_runs = []
+            async for repositories in self._iter_repositories():
+                if repository_ids is not None:
+                    repositories = [repository for repository in repositories if repository['id'] in repository_ids]
+
+                async for node in self._iter_repository_nodes(repositories, LATEST_RUNS_QUERY,
+                                                              {'checkSuites': LATEST_CHECK_SUITES}):
+                    latest_runs.extend(self._latest_workflow_runs(node))
+
+            return latest_runs
+        except httpx.RequestError as e:
+            raise CustomGithubException(
+                detail=str(e),
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        except CustomGithubException:
+            raise
+        except Exception as e:
+            raise CustomHTTPException(
+                detail=str(e),
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-            runs_url = f"{self._base_url}/repositories/{project_id}/actions/runs?workflow_id={workflow['id']}"
-            runs_response = await self.get_json(runs_url)
-            runs = runs_response.get("workflow_runs", [])
+    @staticmethod
+    def _latest_workflow_runs(repository: Dict) -> List[Dict]:
+        branch = repository.get('defaultBranchRef') or {}
+        check_suites = (((branch.get('target') or {}).get('checkSuites') or {}).get('nodes')) or []
+
+        runs = {}
+        for check_suite in check_suites:
+            workflow_run = check_suite.get('workflowRun')
+            if not workflow_run or not workflow_run.get('workflow'):
+                continue
+
+            workflow_name = workflow_run['workflow']['name']
+            latest = runs.get(workflow_name)
+            if latest is None or workflow_run['runNumber'] > latest['run_number']:
+                runs[workflow_name] = {
+                    'repository_id': repository['databaseId'],
+                    'name': f"[{repository['name']}] {workflow_name}",
+                    'workflow_id': workflow_run['workflow']['databaseId'],
+                    'branch': branch.get('name'),
+                    'run_id': workflow_run['databaseId'],
+                    'run_number': workflow_run['runNumber'],
+                    'url': workflow_run['url'],
+                    'status': check_suite['status'].lower(),
+                    'conclusion': (check_suite['conclusion'] or "").lower() or None,
+                    'created_at': check_suite['createdAt'],
+                    'updated_at': check_suite['updatedAt']
+                }
+
+        return list(runs.values())
+
+    async def get_project_pipelines_list(self, project_id: str, workflow_name: str, workflow_id: str = None,
+                                         page: int = 1, per_page: int = RUNS_PER_PAGE) -> List:
+        """
+        Get a page of the runs of a workflow with their jobs.
+
+        :param project_id: Repository ID.
+        :param workflow_name: Stored pipeline name, used to look the workflow up when its ID is not known.
+        :param workflow_id: Workflow ID or file name stored at sync time.
+        :param page: Page number, starting at 1.
+        :param per_page: Number of runs per page.
+        :return: List of runs.
+        """
+        try:
+            if not workflow_id:
+                workflow_id = await self._find_workflow_id(project_id, workflow_name)
+
+            runs_url = f"{self._base_url}/repositories/{project_id}/actions/workflows/{workflow_id}/runs"
+            runs_response = await self._client.get(runs_url, params={'per_page': per_page, 'page': page})
+            runs_response.raise_for_status()
+            runs = runs_response.json().get("workflow_runs", [])
 
-            workflow_runs = []
-            job_tasks = []
-            for run in runs:
-                run_id = run["id"]
-                job_url = f"{self._base_url}/repositories/{project_id}/actions/runs/{run_id}/jobs"
-                job_tasks.append(self.get_json(job_url))
+            # Fetching the jobs of a whole page at once triggers the GitHub secondary rate limits
+            semaphore = asyncio.Semaphore(config['upstream_concurrency'])
 
-            job_data_list = await asyncio.gather(*job_tasks)
+            async def get_run_jobs(run_id: int) -> Dict:
+                async with semaphore:
+                    return await self.get_json(
+                        f"{self._base_url}/repositories/{project_id}/actions/runs/{run_id}/jobs")
 
+            job_data_list = await asyncio.gather(*(get_run_jobs(run["id"]) for run in runs))
+            workflow_runs = []
             for run, job_data in zip(runs, job_data_list):
                 run_id = run["id"]
                 run_status = run["conclusion"]
@@ -175,6 +534,20 @@ class GithubClient(BaseClient):
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    async def _find_workflow_id(self, project_id: str, workflow_name: str) -> str:
+        """Look the ID of a workflow up by the name of its pipeline, for pipelines stored before workflow IDs were."""
+        workflow_response = await self.get_json(f"{self._base_url}/repositories/{project_id}/actions/workflows")
+        # Reformat workflow name since it is at pipeline creation
+        workflow_name = workflow_name.split("] ")[1]
+        workflow = next(
+            (workflow for workflow in workflow_response.get("workflows", []) if workflow['name'] == workflow_name),
+            None
+        )
+        if workflow is None:
+            raise CustomGithubException(detail=f"Workflow `{workflow_name}` does not exist.",
+                                        status_code=status.HTTP_404_NOT_FOUND)
+        return workflow['id']
+
     async def get_project_pipeline_info(self, project_id: str, run_id: int) -> Dict:
         """Get information about a project's pipeline run."""
         try:
@@ -277,25 +650,28 @@ class GithubClient(BaseClient):
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-    async def start_new_pipeline(self, workflow_name: str, project_id: int, params: dict):
-        """Start GitHub pipeline."""
+    async def start_new_pipeline(self, workflow_name: str, project_id: int, params: dict, workflow_id: str = None,
+                                 default_branch: str = None):
+        """
+        Start GitHub pipeline.
+
+        :param workflow_name: Stored pipeline name, used to look the workflow up when its ID is not known.
+        :param project_id: Repository ID.
+        :param params: Workflow inputs and the `branch` to run the workflow on.
+        :param workflow_id: Workflow ID or file name stored at sync time.
+        :param default_branch: Default branch of the repository stored at sync time, used when no branch is given.
+        """
         try:
-            url = f"{self._base_url}/repositories/{project_id}/actions/workflows"
-            workflow_response = await self.get_json(url)
-            workflows = workflow_response.get("workflows", [])
-            # Reformat workflow name since it is at pipeline creation
-            workflow_name = workflow_name.split("] ")[1]
-
-            workflow_info = next(
-                (workflow for workflow in workflows if workflow["name"] == workflow_name),
-                None
-            )
+            if not workflow_id:
+                workflow_id = await self._find_workflow_id(str(project_id), workflow_name)
 
-            ref = str(params.get("branch", "main"))
+            ref = str(params.get("branch", default_branch or "main"))
             inputs = {key: value for key, value in params.items() if key != "branch"}
             variables = {"ref": ref, "inputs": inputs}
 
-            response = await self._client.post(f"{workflow_info['url']}/dispatches", json=variables)
+            response = await self._client.post(
+                f"{self._base_url}/repositories/{project_id}/actions/workflows/{workflow_id}/dispatches",
+                json=variables)
             response.raise_for_status()
 
             return response.text
@@ -370,10 +746,19 @@ class GithubClient(BaseClient):
             logs_url = f"{self._base_url}/repositories/{project_id}/actions/jobs/{job_id}/logs"
 
             job_info = await self.get_json(job_info_url)
-            logs_response = (await self._client.get(logs_url, follow_redirects=True))
-            logs_response.raise_for_status()
-
-            job_info['log'] = self.escape_ansi(logs_response.text).splitlines()
+            # Logs of completed jobs are read from the log archive once archived
+            archive = self._open_log_archive((project_id, job_id))
+            if archive is None:
+                logs_response = (await self._client.get(logs_url, follow_redirects=True))
+                logs_response.raise_for_status()
+                if is_terminal(job_info):
+                    archive = await self._archive_log((project_id, job_id), logs_response)
+                if archive is None:
+                    job_info['log'] = clean_log_text(logs_response.text)
+                    return job_info
+
+            with archive:
+                job_info['log'] = [line.text for line in archive.iter_lines()]
 
             return job_info
         except httpx.RequestError as e:
@@ -387,18 +772,75 @@ class GithubClient(BaseClient):
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    async def open_job_log(self, project_id: str, job_id: int) -> httpx.Response:
+        """
+        Open a streamed response of the log of a GitHub job.
+
+        :param project_id: Repository ID.
+        :param job_id: GitHub job ID.
+        :return: The streamed response, which has to be closed by the caller.
+        """
+        try:
+            # GitHub redirects to the log file in its blob storage
+            response = await self.open_stream(f"{self._base_url}/repositories/{project_id}/actions/jobs/{job_id}/logs",
+                                              follow_redirects=True)
+        except httpx.RequestError as e:
+            raise CustomGithubException(detail=str(e), status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        if response.status_code != 200:
+            await response.aclose()
+            raise CustomGithubException(detail=f"Failed to fetch the log of GitHub job {job_id}.",
+                                        status_code=response.status_code)
+        return response
+
+    async def get_archived_job_log(self, project_id: str, job_id: int) -> Optional[LogArchive]:
+        """
+        Get the archived log of a completed GitHub job, archiving it on its first read.
+
+        :param project_id: Repository ID.
+        :param job_id: GitHub job ID.
+        :return: The archive, which has to be closed by the caller, or None while the job is running.
+        """
+        try:
+            return await self._get_archived_log(
+                (project_id, job_id), f"{self._base_url}/repositories/{project_id}/actions/jobs/{job_id}",
+                f"{self._base_url}/repositories/{project_id}/actions/jobs/{job_id}/logs", follow_redirects=True)
+        except httpx.RequestError as e:
+            raise CustomGithubException(detail=str(e), status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        except httpx.HTTPStatusError as e:
+            raise CustomGithubException(detail=f"Failed to fetch the log of GitHub job {job_id}.",
+                                        status_code=e.response.status_code)
+        except ValueError:
+            raise CustomGithubException(detail=f"Failed to fetch the log of GitHub job {job_id}.",
+                                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    async def get_job_log_tail(self, project_id: str, job_id: int, offset: int, max_bytes: int) -> LogTail:
+        """
+        Read the lines the log of a GitHub job gained since an offset.
+
+        GitHub only publishes the log of a job once it has completed.
+
+        :param project_id: Repository ID.
+        :param job_id: GitHub job ID.
+        :param offset: Byte offset to read from.
+        :param max_bytes: Most bytes read.
+        :return: The new lines with the offset to continue from.
+        """
+        try:
+            job = await self.get_json(f"{self._base_url}/repositories/{project_id}/actions/jobs/{job_id}")
+            if not is_terminal(job):
+                return LogTail(lines=[], offset=offset, more=True)
+
+            return await self._read_ranged_log_tail(
+                f"{self._base_url}/repositories/{project_id}/actions/jobs/{job_id}/logs", offset, max_bytes,
+                complete=True, follow_redirects=True)
+        except httpx.RequestError as e:
+            raise CustomGithubException(detail=str(e), status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        except httpx.HTTPStatusError as e:
+            raise CustomGithubException(detail=f"Failed to fetch the log of GitHub job {job_id}.",
+                                        status_code=e.response.status_code)
+
     async def get_json(self, url: str):
         response = await self._client.get(url)
         response.raise_for_status()
         return response.json()
-
-    @staticmethod
-    def escape_ansi(line: str) -> str:
-        """Remove ANSI escape codes from a text line.
-        Args:
-            line (str): The input text line containing ANSI escape codes.
-        Returns:
-            str: The text line with ANSI escape codes removed.
-        """
-        ansi_escape = re.compile(r'(\x9B|\x1B\[)[0-?]*[ -\/]*[@-~]')
-        return ansi_escape.sub('', line)
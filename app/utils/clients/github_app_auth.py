@@ -0,0 +1,138 @@
+import asyncio
+import hashlib
+import time
+from datetime import datetime
+from typing import Dict, Tuple, Optional, AsyncGenerator
+
+import httpx
+import jwt
+from fastapi import status
+
+from app.exceptions.github_expeption import CustomGithubException
+from app.utils.logger import Logger
+
+LOGGER = Logger().start_logger()
+
+# GitHub rejects app JWTs valid for longer than 10 minutes
+JWT_LIFETIME = 540
+# Clock drift allowance of the JWT issue time
+JWT_CLOCK_SKEW = 60
+# Installation tokens live for an hour and are replaced this many seconds before they expire
+TOKEN_REFRESH_MARGIN = 300
+
+
+def is_private_key(secret: Optional[str]) -> bool:
+    """Check whether a stored secret is a GitHub App private key rather than a personal access token."""
+    return bool(secret) and secret.lstrip().startswith("-----BEGIN")
+
+
+class GithubAppAuth(httpx.Auth):
+    """
+    Authenticates requests as a GitHub App installation.
+
+    Installation tokens are exchanged for a JWT signed with the app private key and cached per
+    installation for all clients of the process, so only one request per installation and hour is
+    spent on authentication.
+    """
+    # (base url, app id, installation id, private key digest) -> (token, monotonic expiry). The key digest
+    # keeps a rotated or corrected private key from reusing tokens exchanged with the previous one.
+    _tokens: Dict[Tuple[str, str, str, str], Tuple[str, float]] = {}
+    _locks: Dict[Tuple[str, str, str, str], asyncio.Lock] = {}
+
+    def __init__(self, http_client: httpx.AsyncClient, base_url: str, app_id: str, private_key: str,
+                 installation_id: str = None):
+        """
+        :param http_client: Client used for the app authentication requests, without credentials.
+        :param base_url: GitHub API base URL.
+        :param app_id: GitHub App ID.
+        :param private_key: PEM encoded private key of the GitHub App.
+        :param installation_id: Installation ID, or None to use the first installation of the app.
+        """
+        self._http_client = http_client
+        self._base_url = base_url
+        self._app_id = app_id
+        self._private_key = private_key
+        self._private_key_digest = hashlib.sha256(private_key.encode()).hexdigest()
+        self._installation_id = installation_id
+
+    @classmethod
+    def parse_app_user(cls, app_user: str) -> Tuple[str, Optional[str]]:
+        """
+        Split the `app_id[:installation_id]` notation stored as the user of GitHub App applications.
+
+        :param app_user: Stored application user.
+        :return: Tuple of the app ID and the installation ID, if any.
+        """
+        app_id, _, installation_id = (app_user or "").strip().partition(":")
+        if not app_id:
+            raise CustomGithubException(detail="GitHub App ID is missing from the application user.",
+                                        status_code=status.HTTP_400_BAD_REQUEST)
+        return app_id, installation_id or None
+
+    async def async_auth_flow(self, request: httpx.Request) -> AsyncGenerator[httpx.Request, httpx.Response]:
+        request.headers['Authorization'] = f"token {await self.get_installation_token()}"
+        response = yield request
+
+        if response.status_code == 401:
+            # The token was revoked or has expired early, so exchange a new one once
+            self._tokens.pop(self._cache_key(), None)
+            request.headers['Authorization'] = f"token {await self.get_installation_token()}"
+            yield request
+
+    async def get_installation_token(self) -> str:
+        """
+        Return a cached installation token, exchanging a new one when it is about to expire.
+
+        :return: Installation access token.
+        """
+        key = self._cache_key()
+        cached = self._tokens.get(key)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            cached = self._tokens.get(key)
+            if cached and cached[1] > time.monotonic():
+                return cached[0]
+
+            if self._installation_id is None:
+                self._installation_id = await self._get_first_installation_id()
+                key = self._cache_key()
+
+            response = await self._http_client.post(
+                f"{self._base_url}/app/installations/{self._installation_id}/access_tokens",
+                headers=self._app_headers())
+            self._raise_for_status(response, "exchange an installation token")
+
+            data = response.json()
+            expires_in = datetime.fromisoformat(data['expires_at'].replace("Z", "+00:00")).timestamp() - time.time()
+            self._tokens[key] = (data['token'], time.monotonic() + expires_in - TOKEN_REFRESH_MARGIN)
+            LOGGER.debug(f"Exchanged an installation token of GitHub App {self._app_id} "
+                         f"valid for {int(expires_in)} seconds.")
+            return data['token']
+
+    async def _get_first_installation_id(self) -> str:
+        response = await self._http_client.get(f"{self._base_url}/app/installations", headers=self._app_headers())
+        self._raise_for_status(response, "list installations")
+
+        installations = response.json()
+        if not installations:
+            raise CustomGithubException(detail=f"GitHub App {self._app_id} is not installed anywhere.",
+                                        status_code=status.HTTP_400_BAD_REQUEST)
+        return str(installations[0]['id'])
+
+    def _app_headers(self) -> Dict[str, str]:
+        now = int(time.time())
+        token = jwt.encode({"iat": now - JWT_CLOCK_SKEW, "exp": now + JWT_LIFETIME, "iss": self._app_id},
+                           self._private_key, algorithm="RS256")
+        return {'Authorization': f"Bearer {token}"}
+
+    def _cache_key(self) -> Tuple[str, str, str, str]:
+        return self._base_url, self._app_id, self._installation_id or "", self._private_key_digest
+
+    def _raise_for_status(self, response: httpx.Response, action: str):
+        if response.is_success:
+            return
+        raise CustomGithubException(
+            detail=f"GitHub App {self._app_id} failed to {action}: {response.status_code} {response.text}",
+            status_code=response.status_code)
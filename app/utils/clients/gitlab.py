@@ -1,24 +1,38 @@
+import asyncio
 import json
 import re
-from datetime import datetime
-from typing import List, Dict
+from datetime import datetime, timedelta
+from typing import List, Dict, AsyncIterator, Optional
 
 import httpx
 from fastapi import status
 
+from app.config.config import Settings
 from app.daos.applications_dao import ApplicationDAO
 from app.exceptions.custom_http_expeption import CustomHTTPException
 from app.exceptions.gitlab_exception import GitLabConnectionException
+from app.models import db_models as model
 from app.utils.clients.base import BaseClient
+from app.utils.clients.response_cache import is_terminal
 from app.utils.enums import AppType
+from app.utils.log_archive import LogArchive
+from app.utils.log_stream import LogTail, clean_log_text
 from app.utils.logger import Logger
 
 INVALID_DATA_ERROR = "Invalid data received from GitLab."
+PROJECTS_PER_PAGE = 100
+JOBS_PER_PAGE = 100
+# Upper bound of the project job pages read to fill the stages of the latest pipelines
+JOBS_MAX_PAGES = 10
+# GitLab updates `last_activity_at` of a project at most once per hour
+LAST_ACTIVITY_GRANULARITY = timedelta(hours=1)
 
 LOGGER = Logger().start_logger()
+config = Settings().app
 
 
 class GitlabClient(BaseClient):
+    supports_changed_since = True
 
     async def check_connection(self):
         """Check if the provided GitLab private token is valid."""
@@ -30,50 +44,120 @@ class GitlabClient(BaseClient):
 
     def __init__(self, base_url: str, token: str, application_id: int = None):
         """Initialize the GitLab client."""
-        self._client = httpx.AsyncClient(headers={'PRIVATE-TOKEN': token}, timeout=3)
+        self._client = self.create_http_client(headers={'PRIVATE-TOKEN': token}, timeout=3,
+                                               application_id=application_id)
         self._base_url = base_url
         self._app_id = application_id
 
     @classmethod
     async def from_application_id(cls, application_id: int):
         """Alternative constructor using application ID."""
-        app = await ApplicationDAO().get_by_id(application_id)
-        return cls(base_url=app.base_url, token=app.auth_pass, application_id=application_id)
+        return cls.from_application(await ApplicationDAO().get_by_id(application_id))
 
-    @staticmethod
-    def escape_ansi(line):
-        ansi_escape = re.compile(r'(\x9B|\x1B\[)[0-?]*[ -\/]*[@-~]')
-        return ansi_escape.sub('', line)
+    @classmethod
+    def from_application(cls, application: model.Applications):
+        """Alternative constructor using a stored application."""
+        return cls(base_url=application.base_url, token=application.auth_pass, application_id=application.id)
 
     async def get_pipelines_list(self) -> List:
         """Get all pipelines from Gitlab."""
-        try:
-            result = await self._client.get(
-                f"{self._base_url}/projects?per_page=100&page=1&order_by=id&sort=asc")
-
-            projects = []
-            for i in range(1, int(result.headers['X-Total-Pages'])):
-                projects.append((await self._client.get(
-                    f"{self._base_url}/projects?per_page=100&page={i + 1}&order_by=id&sort=asc")).json())
+        pipelines = []
+        async for page in self.iter_pipeline_pages():
+            pipelines.extend(page)
 
-            all_projects = result.json()
-            pipelines = []
-            for pipeline in all_projects:
-                pipelines.append({'id': pipeline['id'], 'name': pipeline['name'], 'app': self._app_id,
-                                  'type': AppType.GITLAB.value})
+        return pipelines
 
-            return pipelines
+    async def iter_pipeline_pages(self, regex_pattern: str = None,
+                                  changed_since: datetime = None) -> AsyncIterator[List[Dict]]:
+        """Iterate over pages of GitLab pipelines, optionally filtered by regex pattern and last activity."""
+        try:
+            async for projects in self._iter_projects_pages(changed_since):
+                yield [{'id': project['id'], 'name': project['name'], 'default_branch': project.get('default_branch'),
+                        'app': self._app_id, 'type': AppType.GITLAB.value}
+                       for project in projects
+                       if not regex_pattern or re.search(regex_pattern, project['name'])]
         except httpx.RequestError:
             LOGGER.warn(f"Failed to connect to GitLab - {self._base_url}.")
             raise GitLabConnectionException(detail=f"Failed to connect to GitLab.")
+        except httpx.HTTPStatusError as e:
+            LOGGER.warn(f"GitLab - {self._base_url} responded with status {e.response.status_code}.")
+            raise GitLabConnectionException(detail=f"Failed to fetch projects from GitLab.")
         except ValueError:
             raise CustomHTTPException(
                 detail=INVALID_DATA_ERROR,
                 status_code=status.HTTP_400_BAD_REQUEST
             )
 
-    async def get_project_pipelines_list(self, project_id: str) -> List:
-        """Get all pipelines for specific project."""
+    def _projects_params(self, changed_since: datetime = None) -> Dict:
+        """Query parameters used to discover projects, requesting only the fields the sync needs."""
+        params = {'per_page': PROJECTS_PER_PAGE, 'order_by': 'id', 'sort': 'asc', 'simple': 'true'}
+        if config['gitlab_projects_membership']:
+            params['membership'] = 'true'
+        if changed_since:
+            params['last_activity_after'] = f"{(changed_since - LAST_ACTIVITY_GRANULARITY).isoformat()}Z"
+        return params
+
+    async def _get_projects_page(self, params: Dict) -> httpx.Response:
+        response = await self._client.get(f"{self._base_url}/projects", params=params)
+        response.raise_for_status()
+        return response
+
+    async def _iter_projects_pages(self, changed_since: datetime = None) -> AsyncIterator[List[Dict]]:
+        """
+        Iterate over all project pages.
+
+        When GitLab reports the total number of pages, the remaining pages are fetched concurrently with
+        a bounded fan-out and yielded as they arrive. GitLab omits `X-Total-Pages` above 10,000 results,
+        so large instances are paginated serially with keyset pagination, continuing after the first
+        page since both orders are by ascending ID.
+        """
+        params = self._projects_params(changed_since)
+        first_page = await self._get_projects_page({**params, 'page': 1})
+        total_pages = first_page.headers.get('X-Total-Pages')
+        projects = first_page.json()
+        yield projects
+
+        if not total_pages:
+            if len(projects) == PROJECTS_PER_PAGE:
+                async for projects in self._iter_projects_keyset_pages({**params, 'id_after': projects[-1]['id']}):
+                    yield projects
+            return
+
+        semaphore = asyncio.Semaphore(config['upstream_concurrency'])
+
+        async def get_page(page: int) -> List[Dict]:
+            async with semaphore:
+                return (await self._get_projects_page({**params, 'page': page})).json()
+
+        tasks = [asyncio.ensure_future(get_page(page)) for page in range(2, int(total_pages) + 1)]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _iter_projects_keyset_pages(self, params: Dict) -> AsyncIterator[List[Dict]]:
+        """Iterate over project pages following the keyset pagination `next` links."""
+        response = await self._get_projects_page({**params, 'pagination': 'keyset'})
+        while True:
+            yield response.json()
+
+            next_link = response.links.get('next', {}).get('url')
+            if not next_link:
+                return
+            response = await self._client.get(next_link)
+            response.raise_for_status()
+
+    async def get_project_pipelines_list(self, project_id: str, pipeline_jobs: bool = False) -> List:
+        """
+        Get the latest pipelines of a project with the latest job of each of their stages.
+
+        :param project_id: GitLab project ID.
+        :param pipeline_jobs: Fetch the jobs of each listed pipeline concurrently instead of streaming
+            the job pages of the project, which is cheaper for projects running many jobs per pipeline.
+        :return: List of pipelines.
+        """
         try:
             pipelines = \
                 (await self._client.get(f"{self._base_url}/projects/{project_id}/pipelines?simple=true"))
@@ -83,9 +167,9 @@ class GitlabClient(BaseClient):
                 raise GitLabConnectionException(detail=f"Failed to connect to GitLab - {self._base_url}. "
                                                        f"Message - {pipelines_json}.")
 
-            pipeline_result = []
+            pipeline_result = {}
             for pipeline in pipelines_json:
-                pipeline_json = {
+                pipeline_result[int(pipeline['id'])] = {
                     "id": pipeline['id'],
                     "status": pipeline['status'],
                     "commit_msg": None,
@@ -94,44 +178,16 @@ class GitlabClient(BaseClient):
                     "created_at": int(datetime.fromisoformat(pipeline['created_at']).timestamp())
                 }
 
-                pipeline_result.append(pipeline_json)
-
-            result = (await self._client.get(f"{self._base_url}/projects/{project_id}/jobs")).json()
-            for index, pipeline in enumerate(pipeline_result):
-                # store the latest job for each stage
-                stage_latest_jobs = {}
-                for job in result:
-                    if job['pipeline']['id'] == int(pipeline["id"]):
-                        stage_name = job['stage']
-                        # check if this job is more recent than the stored job for the same stage
-                        if stage_name not in stage_latest_jobs \
-                                or job['created_at'] > stage_latest_jobs[stage_name]['created_at']:
-                            stage_latest_jobs[stage_name] = job
-
-                for stage_name, job in stage_latest_jobs.items():
-                    job["duration"] = 0 if not job['duration'] else int(job["duration"])
-
-                    pipeline_result[index]["duration"] += job["duration"]
-                    pipeline_result[index]["commit_msg"] = job["commit"]["title"]
-                    pipeline_result[index]['stages'].append({
-                        "id": job['id'],
-                        "name": stage_name,
-                        "status": job['status'],
-                        "started_at": job['started_at'],
-                        "duration": int(job["duration"])
-                    })
-
-                stages = pipeline_result[index]['stages']
-                if stages:
-                    # Sort stages by 'started_at', treating None as a minimum value
-                    pipeline_result[index]['stages'] = sorted(
-                        stages,
-                        key=lambda x: (x.get('started_at') or '9999-12-31T23:59:59Z')  # Using a default value for None
-                    )
+            if not pipeline_result:
+                return []
 
-                pipeline_result[index]["duration"] = int(pipeline_result[index]["duration"])
+            if pipeline_jobs:
+                jobs = self._iter_pipelines_jobs(project_id, list(pipeline_result))
+            else:
+                jobs = self._iter_project_jobs(project_id, min(pipeline_result))
 
-            return pipeline_result
+            await self._aggregate_pipeline_stages(pipeline_result, jobs)
+            return list(pipeline_result.values())
         except httpx.RequestError:
             LOGGER.warn(f"Failed to connect to GitLab - {self._base_url}.")
             raise GitLabConnectionException(detail=f"Failed to connect to GitLab.")
@@ -141,19 +197,101 @@ class GitlabClient(BaseClient):
                 status_code=status.HTTP_400_BAD_REQUEST
             )
 
+    @classmethod
+    async def _aggregate_pipeline_stages(cls, pipelines: Dict[int, Dict], jobs: AsyncIterator[Dict]):
+        """
+        Fill the stages, duration and commit message of pipelines in a single pass over their jobs.
+
+        :param pipelines: Pipelines by ID, updated in place.
+        :param jobs: Jobs of the pipelines, in any order. Jobs of other pipelines are ignored.
+        """
+        # pipeline id -> stage name -> latest job of the stage
+        stage_latest_jobs: Dict[int, Dict[str, Dict]] = {}
+        async for job in jobs:
+            pipeline_id = job['pipeline']['id']
+            if pipeline_id not in pipelines:
+                continue
+
+            stages = stage_latest_jobs.setdefault(pipeline_id, {})
+            latest = stages.get(job['stage'])
+            if latest is None or job['created_at'] > latest['created_at']:
+                stages[job['stage']] = job
+
+        for pipeline_id, stages in stage_latest_jobs.items():
+            pipeline = pipelines[pipeline_id]
+            for stage_name, job in stages.items():
+                duration = int(job['duration'] or 0)
+                pipeline["duration"] += duration
+                pipeline["commit_msg"] = job["commit"]["title"]
+                pipeline['stages'].append({
+                    "id": job['id'],
+                    "name": stage_name,
+                    "status": job['status'],
+                    "started_at": job['started_at'],
+                    "duration": duration
+                })
+
+            # Stages that have not started yet are listed last
+            pipeline['stages'].sort(key=lambda stage: stage['started_at'] or '9999-12-31T23:59:59Z')
+
+    async def _iter_jobs_pages(self, url: str) -> AsyncIterator[List[Dict]]:
+        """Iterate over the pages of a jobs listing following the `X-Next-Page` header."""
+        page = 1
+        while page:
+            response = await self._client.get(url, params={'per_page': JOBS_PER_PAGE, 'page': page})
+            if response.status_code != 200:
+                raise GitLabConnectionException(detail=f"Failed to connect to GitLab - {self._base_url}. "
+                                                       f"Message - {response.text}.")
+            yield response.json()
+
+            next_page = response.headers.get('X-Next-Page')
+            page = int(next_page) if next_page else None
+
+    async def _iter_project_jobs(self, project_id: str, oldest_pipeline_id: int) -> AsyncIterator[Dict]:
+        """
+        Stream the jobs of a project, newest first, until the jobs of the given pipeline and all newer
+        ones have been seen.
+
+        A page only made of jobs of older pipelines ends the stream. Retried jobs of older pipelines can
+        still show up before it, so a single older job does not.
+        """
+        pages = 0
+        async for jobs in self._iter_jobs_pages(f"{self._base_url}/projects/{project_id}/jobs"):
+            for job in jobs:
+                yield job
+
+            pages += 1
+            if pages >= JOBS_MAX_PAGES or all(job['pipeline']['id'] < oldest_pipeline_id for job in jobs):
+                return
+
+    async def _iter_pipelines_jobs(self, project_id: str, pipeline_ids: List[int]) -> AsyncIterator[Dict]:
+        """Fetch the jobs of the given pipelines concurrently and stream them as each pipeline completes."""
+        semaphore = asyncio.Semaphore(config['upstream_concurrency'])
+
+        async def get_pipeline_jobs(pipeline_id: int) -> List[Dict]:
+            async with semaphore:
+                pipeline_jobs = []
+                async for jobs in self._iter_jobs_pages(
+                        f"{self._base_url}/projects/{project_id}/pipelines/{pipeline_id}/jobs"):
+                    pipeline_jobs.extend(jobs)
+                return pipeline_jobs
+
+        tasks = [asyncio.ensure_future(get_pipeline_jobs(pipeline_id)) for pipeline_id in pipeline_ids]
+        try:
+            for task in asyncio.as_completed(tasks):
+                for job in await task:
+                    yield job
+        finally:
+            for task in tasks:
+                task.cancel()
+
     async def get_pipelines_list_by_pattern(self, regex_pattern: str) -> List:
         """Get all pipelines for specific project by regex pattern."""
-        pipelines = await self.get_pipelines_list()
-
-        if not pipelines:
-            return []
+        pipelines = []
+        async for page in self.iter_pipeline_pages(regex_pattern):
+            pipelines.extend(page)
 
-        filtered_pipelines = []
-        for pipeline in pipelines:
-            if re.search(regex_pattern, pipeline["name"]):
-                filtered_pipelines.append(pipeline)
-
-        return filtered_pipelines
+        return pipelines
 
     async def get_project_pipeline_info(self, project_id: str, pipeline_id: int) -> Dict:
         """Get GitLab pipeline information"""
@@ -225,9 +363,18 @@ class GitlabClient(BaseClient):
         """Get GitLab pipeline job logs."""
         try:
             result = (await self._client.get(f"{self._base_url}/projects/{project_id}/jobs/{stage_id}")).json()
-            result['log'] = self.escape_ansi(
-                (await self._client.get(
-                    f"{self._base_url}/projects/{project_id}/jobs/{stage_id}/trace")).text).splitlines()
+            # Traces of finished jobs are read from the log archive once archived
+            archive = self._open_log_archive((project_id, stage_id))
+            if archive is None:
+                trace = await self._client.get(f"{self._base_url}/projects/{project_id}/jobs/{stage_id}/trace")
+                if trace.status_code == 200 and is_terminal(result):
+                    archive = await self._archive_log((project_id, stage_id), trace)
+                if archive is None:
+                    result['log'] = clean_log_text(trace.text)
+                    return result
+
+            with archive:
+                result['log'] = [line.text for line in archive.iter_lines()]
 
             return result
         except httpx.RequestError:
@@ -239,8 +386,75 @@ class GitlabClient(BaseClient):
                 status_code=status.HTTP_400_BAD_REQUEST
             )
 
-    async def start_new_pipeline(self, project_id: int, params: dict):
-        """Start GitLab pipeline."""
+    async def open_job_log(self, project_id: str, job_id: int) -> httpx.Response:
+        """
+        Open a streamed response of the trace of a GitLab job.
+
+        :param project_id: GitLab project ID.
+        :param job_id: GitLab job ID.
+        :return: The streamed response, which has to be closed by the caller.
+        """
+        try:
+            response = await self.open_stream(f"{self._base_url}/projects/{project_id}/jobs/{job_id}/trace")
+        except httpx.RequestError:
+            LOGGER.warn(f"Failed to connect to GitLab - {self._base_url}.")
+            raise GitLabConnectionException(detail=f"Failed to connect to GitLab.")
+
+        if response.status_code != 200:
+            await response.aclose()
+            raise GitLabConnectionException(detail=f"Failed to fetch the log of GitLab job {job_id}.")
+        return response
+
+    async def get_archived_job_log(self, project_id: str, job_id: int) -> Optional[LogArchive]:
+        """
+        Get the archived trace of a finished GitLab job, archiving it on its first read.
+
+        :param project_id: GitLab project ID.
+        :param job_id: GitLab job ID.
+        :return: The archive, which has to be closed by the caller, or None while the job is running.
+        """
+        try:
+            return await self._get_archived_log((project_id, job_id),
+                                                f"{self._base_url}/projects/{project_id}/jobs/{job_id}",
+                                                f"{self._base_url}/projects/{project_id}/jobs/{job_id}/trace")
+        except httpx.RequestError:
+            LOGGER.warn(f"Failed to connect to GitLab - {self._base_url}.")
+            raise GitLabConnectionException(detail=f"Failed to connect to GitLab.")
+        except (httpx.HTTPStatusError, ValueError):
+            raise GitLabConnectionException(detail=f"Failed to fetch the log of GitLab job {job_id}.")
+
+    async def get_job_log_tail(self, project_id: str, job_id: int, offset: int, max_bytes: int) -> LogTail:
+        """
+        Read the lines the trace of a GitLab job gained since an offset.
+
+        :param project_id: GitLab project ID.
+        :param job_id: GitLab job ID.
+        :param offset: Byte offset to read from.
+        :param max_bytes: Most bytes read.
+        :return: The new lines with the offset to continue from.
+        """
+        try:
+            # The job state is read first, so a finished job guarantees a complete trace
+            job = await self._client.get(f"{self._base_url}/projects/{project_id}/jobs/{job_id}")
+            if job.status_code != 200:
+                raise GitLabConnectionException(detail=f"Failed to fetch GitLab job {job_id}.")
+
+            return await self._read_ranged_log_tail(f"{self._base_url}/projects/{project_id}/jobs/{job_id}/trace",
+                                                    offset, max_bytes, complete=is_terminal(job.json()))
+        except httpx.RequestError:
+            LOGGER.warn(f"Failed to connect to GitLab - {self._base_url}.")
+            raise GitLabConnectionException(detail=f"Failed to connect to GitLab.")
+        except httpx.HTTPStatusError:
+            raise GitLabConnectionException(detail=f"Failed to fetch the log of GitLab job {job_id}.")
+
+    async def start_new_pipeline(self, project_id: int, params: dict, default_branch: str = None):
+        """
+        Start GitLab pipeline.
+
+        :param project_id: GitLab project ID.
+        :param params: Pipeline variables and the `branch` to run the pipeline on.
+        :param default_branch: Default branch of the project stored at sync time, used when no branch is given.
+        """
         try:
             variables = []
 
@@ -252,7 +466,8 @@ class GitlabClient(BaseClient):
                     })
 
             result = (await self._client.post(
-                f"{self._base_url}/projects/{project_id}/pipeline?ref={params['branch']}",
+                f"{self._base_url}/projects/{project_id}/pipeline",
+                params={'ref': params.get('branch') or default_branch},
                 json={'variables': variables})).json()
 
             return result
@@ -313,11 +528,12 @@ class GitlabClient(BaseClient):
                 status_code=status.HTTP_400_BAD_REQUEST
             )
 
-    async def get_pipeline_params(self, project_id: str):
+    async def get_pipeline_params(self, project_id: str, default_branch: str = None):
         """Get GitLab pipeline parameters."""
         try:
             test = (await self._client.get(
-                f"{self._base_url}/projects/{project_id}/repository/files/parameters.json/raw")).text
+                f"{self._base_url}/projects/{project_id}/repository/files/parameters.json/raw",
+                params={'ref': default_branch} if default_branch else None)).text
 
             result = (await self._client.get(f"{self._base_url}/projects/{project_id}/variables")).json()
             branches = (await self._client.get(f"{self._base_url}/projects/{project_id}/repository/branches")).json()
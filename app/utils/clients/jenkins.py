@@ -1,15 +1,19 @@
-import asyncio
 import base64
 import json
 import re
-from typing import List
+from typing import List, Optional
+from urllib.parse import quote
 
 import httpx
 from fastapi import status
 
 from app.daos.applications_dao import ApplicationDAO
 from app.exceptions.custom_http_expeption import CustomHTTPException
+from app.models import db_models as model
 from app.utils.clients.base import BaseClient
+from app.utils.clients.response_cache import is_terminal
+from app.utils.log_archive import LogArchive
+from app.utils.log_stream import LogTail, read_log_tail, clean_log_text, iter_chunks
 from app.utils.logger import Logger
 
 LOGGER = Logger().start_logger()
@@ -21,14 +25,20 @@ class JenkinsClient(BaseClient):
         self._user = user
         self._base_url = base_url
         self._token = token
-        self._client = httpx.AsyncClient(headers=self._generate_credentials(), timeout=3)
+        self._client = self.create_http_client(headers=self._generate_credentials(), timeout=3,
+                                               application_id=application_id)
         self._app_id = application_id
 
     @classmethod
     async def from_application_id(cls, application_id: int):
         """Alternative constructor using application ID."""
-        app = await ApplicationDAO().get_by_id(application_id)
-        return cls(base_url=app.base_url, user=app.auth_user, token=app.auth_pass, application_id=application_id)
+        return cls.from_application(await ApplicationDAO().get_by_id(application_id))
+
+    @classmethod
+    def from_application(cls, application: model.Applications):
+        """Alternative constructor using a stored application."""
+        return cls(base_url=application.base_url, user=application.auth_user, token=application.auth_pass,
+                   application_id=application.id)
 
     async def _get_jenkins_crumb(self) -> str:
         """Get the Jenkins crumb."""
@@ -56,20 +66,34 @@ class JenkinsClient(BaseClient):
         except httpx.RequestError:
             return False
 
+    def _job_url(self, pipeline_name: str, job_url: str = None) -> str:
+        """
+        URL of a job, preferring the one stored at sync time over rebuilding it from the job name.
+
+        A stored URL outside of the base URL of the application, like one reported by a Jenkins with a
+        different root URL configured or stored before the base URL changed, is never requested with
+        the credentials of the application.
+        """
+        base_url = self._base_url.rstrip('/')
+        if job_url and job_url.startswith(f"{base_url}/"):
+            return job_url.rstrip('/')
+        # Jobs in folders are addressed by a /job/ segment per folder
+        return base_url + "".join(f"/job/{quote(part, safe='')}" for part in str(pipeline_name).split('/'))
+
     async def get_pipelines_list(self):
         try:
             result = (await self._client.get(
-                f"{self._base_url}/api/json?tree=jobs[fullName,jobs[fullName,jobs[fullName,jobs[fullName,jobs[fullName]]]]]")).json()
+                f"{self._base_url}/api/json?tree=jobs[fullName,url,jobs[fullName,url,jobs[fullName,url,jobs[fullName,url,jobs[fullName,url]]]]]")).json()
 
             pipelines = []
             for pipeline in result['jobs']:
                 if pipeline['_class'] == 'com.cloudbees.hudson.plugins.folder.Folder':
                     for job in pipeline['jobs']:
-                        pipelines.append(
-                            {'id': job['fullName'], 'name': job['fullName'], 'app': self._app_id, 'type': 'jenkins'})
+                        pipelines.append({'id': job['fullName'], 'name': job['fullName'], 'job_url': job.get('url'),
+                                          'app': self._app_id, 'type': 'jenkins'})
                 else:
-                    pipelines.append({'id': pipeline['fullName'], 'name': pipeline['fullName'], 'app': self._app_id,
-                                      'type': 'jenkins'})
+                    pipelines.append({'id': pipeline['fullName'], 'name': pipeline['fullName'],
+                                      'job_url': pipeline.get('url'), 'app': self._app_id, 'type': 'jenkins'})
 
             return pipelines
 
@@ -91,15 +115,16 @@ class JenkinsClient(BaseClient):
 
         return filtered_pipelines
 
-    async def get_pipeline_builds(self, pipeline_name: str):
+    async def get_pipeline_builds(self, pipeline_name: str, job_url: str = None):
         """
         Fetch build information for specific pipeline/job.
 
         :param pipeline_name: Name of the Jenkins pipeline/job.
+        :param job_url: URL of the Jenkins pipeline/job stored at sync time.
         :return: Dictionary containing build related information for specific pipeline/job.
         """
         result = (await self._client.get(
-            f"{self._base_url}/job/{pipeline_name}/api/json?tree=name,buildable,builds[number,result,timestamp,duration]&pretty")
+            f"{self._job_url(pipeline_name, job_url)}/api/json?tree=name,buildable,builds[number,result,timestamp,duration]&pretty")
                   ).json()
 
         pipeline_result = []
@@ -116,47 +141,151 @@ class JenkinsClient(BaseClient):
 
         return pipeline_result
 
-    async def get_pipeline_build(self, pipeline_name: str, job_id: str):
+    async def get_pipeline_build(self, pipeline_name: str, job_id: str, job_url: str = None):
         """
         Fetch build details and console log for a specific Jenkins job build.
 
         :param pipeline_name: Name of the Jenkins pipeline/job.
         :param job_id: ID of the specific build of the Jenkins job.
+        :param job_url: URL of the Jenkins pipeline/job stored at sync time.
         :return: Dictionary containing build details and console log.
         """
-        build_url = f"{self._base_url}/job/{pipeline_name}/{job_id}/api/json?tree=duration,fullDisplayName,result,timestamp&pretty"
-        console_log_url = f"{self._base_url}/job/{pipeline_name}/{job_id}/consoleText"
-
-        build_response, console_log_response = await asyncio.gather(
-            self._client.get(build_url),
-            self._client.get(console_log_url)
-        )
-
-        build = build_response.json()
-        console_log = console_log_response.text.splitlines()
-
-        if not build_response or not console_log_response:
+        build_url = (f"{self._job_url(pipeline_name, job_url)}/{job_id}/api/json"
+                     f"?tree=building,duration,fullDisplayName,result,timestamp&pretty")
+        console_log_url = f"{self._job_url(pipeline_name, job_url)}/{job_id}/consoleText"
+
+        # Console logs of finished builds are read from the log archive once archived
+        archive = self._open_log_archive((pipeline_name, job_id))
+        build_response = await self._client.get(build_url)
+        if not build_response:
+            if archive is not None:
+                archive.close()
             raise CustomHTTPException(
                 detail="Failed to fetch data from Jenkins.",
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+        build = build_response.json()
+        if archive is None:
+            # Read after the build state, so a log archived for a finished build is complete
+            console_log_response = await self._client.get(console_log_url)
+            if not console_log_response:
+                raise CustomHTTPException(
+                    detail="Failed to fetch data from Jenkins.",
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+                )
+            if is_terminal(build):
+                archive = await self._archive_log((pipeline_name, job_id), console_log_response)
+
+        if archive is None:
+            console_log = clean_log_text(console_log_response.text)
+        else:
+            with archive:
+                console_log = [line.text for line in archive.iter_lines()]
+
         build_info = {
             "name": build['fullDisplayName'],
             "duration": int(build['duration'] / 1000),
             "created_at": int(build['timestamp'] / 1000),
-            "status": 'running' if build['result'] is None else str(build['result']).lower(),
+            "status": 'running' if build['building'] or build['result'] is None else str(build['result']).lower(),
             "log": console_log
         }
 
         return build_info
 
-    async def start_pipeline(self, pipeline_name: str, parameters: dict):
-        pipeline_variables = await self.get_pipeline_params(pipeline_name)
+    async def open_build_log(self, pipeline_name: str, job_id: str, job_url: str = None) -> httpx.Response:
+        """
+        Open a streamed response of the console log of a Jenkins job build.
+
+        :param pipeline_name: Name of the Jenkins pipeline/job.
+        :param job_id: ID of the specific build of the Jenkins job.
+        :param job_url: URL of the Jenkins pipeline/job stored at sync time.
+        :return: The streamed response, which has to be closed by the caller.
+        """
+        try:
+            response = await self.open_stream(f"{self._job_url(pipeline_name, job_url)}/{job_id}/consoleText")
+        except httpx.RequestError:
+            raise CustomHTTPException(detail="Failed to fetch data from Jenkins.",
+                                      status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        if response.status_code != status.HTTP_200_OK:
+            await response.aclose()
+            raise CustomHTTPException(detail=f"Jenkins build {job_id} of pipeline {pipeline_name} not found.",
+                                      status_code=status.HTTP_404_NOT_FOUND)
+        return response
+
+    async def get_archived_build_log(self, pipeline_name: str, job_id: str,
+                                     job_url: str = None) -> Optional[LogArchive]:
+        """
+        Get the archived console log of a finished Jenkins job build, archiving it on its first read.
+
+        :param pipeline_name: Name of the Jenkins pipeline/job.
+        :param job_id: ID of the specific build of the Jenkins job.
+        :param job_url: URL of the Jenkins pipeline/job stored at sync time.
+        :return: The archive, which has to be closed by the caller, or None while the build is running.
+        """
+        build_url = f"{self._job_url(pipeline_name, job_url)}/{job_id}"
+        try:
+            return await self._get_archived_log((pipeline_name, job_id),
+                                                f"{build_url}/api/json?tree=building,result",
+                                                f"{build_url}/consoleText")
+        except (httpx.RequestError, ValueError):
+            raise CustomHTTPException(detail="Failed to fetch data from Jenkins.",
+                                      status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        except httpx.HTTPStatusError:
+            raise CustomHTTPException(detail=f"Jenkins build {job_id} of pipeline {pipeline_name} not found.",
+                                      status_code=status.HTTP_404_NOT_FOUND)
+
+    async def get_build_log_tail(self, pipeline_name: str, job_id: str, offset: int, max_bytes: int,
+                                 job_url: str = None) -> LogTail:
+        """
+        Read the lines the console log of a Jenkins job build gained since an offset.
+
+        Offsets are positions in the raw log Jenkins reports as `X-Text-Size`, which counts the console
+        notes left out of the returned text. Jenkins only returns complete lines of a running build and
+        can not cut its response at a byte count, so the response is trimmed to `max_bytes` at its last
+        newline when it holds no console notes and text and raw positions are the same. Otherwise no
+        position inside the response is known and all of it is returned.
+
+        :param pipeline_name: Name of the Jenkins pipeline/job.
+        :param job_id: ID of the specific build of the Jenkins job.
+        :param offset: Raw log offset to read from.
+        :param max_bytes: Most bytes read, unless the response holds console notes.
+        :param job_url: URL of the Jenkins pipeline/job stored at sync time.
+        :return: The new lines with the offset to continue from.
+        """
+        try:
+            response = await self.open_stream(
+                f"{self._job_url(pipeline_name, job_url)}/{job_id}/logText/progressiveText?start={offset}")
+        except httpx.RequestError:
+            raise CustomHTTPException(detail="Failed to fetch data from Jenkins.",
+                                      status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        try:
+            if response.status_code != status.HTTP_200_OK:
+                raise CustomHTTPException(detail=f"Jenkins build {job_id} of pipeline {pipeline_name} not found.",
+                                          status_code=status.HTTP_404_NOT_FOUND)
+
+            # Jenkins sets X-More-Data while the build is still writing its log
+            complete = response.headers.get('X-More-Data', '').lower() != 'true'
+            text_size = response.headers.get('X-Text-Size', '')
+            data = await response.aread()
+        finally:
+            await response.aclose()
+
+        if text_size.isdigit() and int(text_size) - offset == len(data):
+            return await read_log_tail(iter_chunks(data), offset, max_bytes, complete)
+
+        tail = await read_log_tail(iter_chunks(data), offset, None, complete=True)
+        return LogTail(lines=tail.lines, offset=int(text_size) if text_size.isdigit() else tail.offset,
+                       more=not complete)
+
+    async def start_pipeline(self, pipeline_name: str, parameters: dict, job_url: str = None):
+        pipeline_variables = await self.get_pipeline_params(pipeline_name, job_url)
         build_url = "buildWithParameters" if len(pipeline_variables) > 0 else "build"
         headers = {"Jenkins-Crumb": await self._get_jenkins_crumb()}
 
-        response = (await self._client.post(f"{self._base_url}/job/{pipeline_name}/{build_url}",
+        response = (await self._client.post(f"{self._job_url(pipeline_name, job_url)}/{build_url}",
                                             headers=headers, data=parameters))
         if not response.is_success:
             LOGGER.error(f"Failed to start Jenkins job. Error: {response.text}")
@@ -165,8 +294,8 @@ class JenkinsClient(BaseClient):
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-    async def get_pipeline_params(self, pipeline_name: str):
-        result = (await self._client.get(f"{self._base_url}/job/{pipeline_name}/api/json?tree=property[*[*[*]]]"))\
+    async def get_pipeline_params(self, pipeline_name: str, job_url: str = None):
+        result = (await self._client.get(f"{self._job_url(pipeline_name, job_url)}/api/json?tree=property[*[*[*]]]"))
 
         if result.status_code != status.HTTP_200_OK:
             raise CustomHTTPException(
@@ -203,15 +332,16 @@ class JenkinsClient(BaseClient):
 
         return variables
 
-    async def cancel_pipeline(self, pipeline_name: str, job_id: str):
+    async def cancel_pipeline(self, pipeline_name: str, job_id: str, job_url: str = None):
         """
         Cancel a specific Jenkins pipeline job.
 
         :param pipeline_name: Name of the Jenkins pipeline.
         :param job_id: ID of the job to be canceled.
+        :param job_url: URL of the Jenkins pipeline stored at sync time.
         :raises CustomHTTPException: If the request to stop the Jenkins job fails.
         """
-        endpoint = f"{self._base_url}/job/{pipeline_name}/{job_id}/stop"
+        endpoint = f"{self._job_url(pipeline_name, job_url)}/{job_id}/stop"
         response = await self._client.post(endpoint)
 
         if response.status_code in [200, 302]:
@@ -227,15 +357,16 @@ class JenkinsClient(BaseClient):
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-    async def retry_pipeline(self, pipeline_name: int, job_id: int):
+    async def retry_pipeline(self, pipeline_name: int, job_id: int, job_url: str = None):
         """
         Retry a specific Jenkins pipeline job.
 
         :param pipeline_name: Name of the Jenkins pipeline.
         :param job_id: ID of the job to be canceled.
+        :param job_url: URL of the Jenkins pipeline stored at sync time.
         :return:
         """
-        endpoint = f"{self._base_url}/job/{pipeline_name}/{job_id}/replay"
+        endpoint = f"{self._job_url(pipeline_name, job_url)}/{job_id}/replay"
         job_groovy = (await self._client.get(endpoint, follow_redirects=True)).text
         groovy_text = re.search('checkScript">([\S\s]*?)</textarea>', job_groovy)
 
@@ -0,0 +1,168 @@
+import asyncio
+import time
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Dict, Tuple, Optional
+
+import httpx
+
+from app.config.config import Settings
+from app.utils.enums import RequestPriority
+from app.utils.logger import Logger
+
+LOGGER = Logger().start_logger()
+config = Settings().app
+
+# Background requests are paced once less than this fraction of the budget is left
+PACING_THRESHOLD = 0.5
+# Longest an interactive request waits for a rate limit window to reset before it is sent anyway
+INTERACTIVE_MAX_WAIT = 5
+MAX_RATE_LIMIT_RETRIES = 2
+RETRYABLE_METHODS = ("GET", "HEAD")
+
+# Priority of the upstream requests made by the current task. Requests are interactive unless the
+# task, like the pipelines sync, marks itself as background work.
+request_priority: ContextVar[RequestPriority] = ContextVar("request_priority", default=RequestPriority.INTERACTIVE)
+
+
+class RateLimitBucket:
+    """
+    Request budget of a single credential on a single CI server, as reported by its rate limit headers.
+
+    Interactive requests may spend the whole budget. Background requests leave a reserved share of it
+    to interactive ones, and once the budget runs low they are spread evenly over the rest of the
+    rate limit window instead of being sent in bursts.
+    """
+
+    def __init__(self):
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset_at = 0.0
+        # Rate limit window the background slots are spread over, as the reset epoch reported upstream
+        self._window: Optional[int] = None
+        self._next_background_slot = 0.0
+
+    async def acquire(self, priority: RequestPriority):
+        """
+        Wait until a request of the given priority may be sent and take it out of the budget.
+
+        :param priority: Priority of the request.
+        """
+        now = time.monotonic()
+        if self.remaining is None or now >= self.reset_at:
+            self._next_background_slot = 0.0
+            return
+
+        if priority == RequestPriority.BACKGROUND:
+            delay = self._reserve_background_slot(now)
+        else:
+            delay = self.reset_at - now if self.remaining <= 0 else 0
+            if delay > INTERACTIVE_MAX_WAIT:
+                delay = 0
+
+        if delay > 0:
+            LOGGER.debug(f"Pacing a {priority.value} upstream request for {delay:.1f} seconds, "
+                         f"{self.remaining} requests left in the rate limit window.")
+            await asyncio.sleep(delay)
+
+        self.remaining -= 1
+
+    def update(self, response: httpx.Response) -> Optional[float]:
+        """
+        Update the budget from the rate limit headers of a response.
+
+        :param response: Upstream response.
+        :return: Seconds to wait before retrying if the request was rate limited, otherwise None.
+        """
+        headers = response.headers
+        remaining = headers.get('X-RateLimit-Remaining', headers.get('RateLimit-Remaining'))
+        if remaining is not None and remaining.isdigit():
+            replenished = self.remaining is not None and int(remaining) > self.remaining
+            self.remaining = int(remaining)
+            limit = headers.get('X-RateLimit-Limit', headers.get('RateLimit-Limit'))
+            self.limit = int(limit) if limit and limit.isdigit() else self.limit
+            reset = headers.get('X-RateLimit-Reset', headers.get('RateLimit-Reset'))
+            if reset and reset.isdigit():
+                self.reset_at = time.monotonic() + max(int(reset) - time.time(), 0)
+                replenished = replenished or int(reset) != self._window
+                self._window = int(reset)
+            if replenished:
+                # Slots reserved in the previous window must not delay requests in the new one
+                self._next_background_slot = 0.0
+
+        rate_limited = response.status_code == 429 or (response.status_code == 403 and self.remaining == 0
+                                                        and remaining is not None)
+        if not rate_limited:
+            return None
+
+        retry_after = self._parse_retry_after(headers.get('Retry-After'))
+        if retry_after is None:
+            retry_after = max(self.reset_at - time.monotonic(), 1)
+        self.remaining = 0
+        self.reset_at = max(self.reset_at, time.monotonic() + retry_after)
+        return retry_after
+
+    def _reserve_background_slot(self, now: float) -> float:
+        reset_in = self.reset_at - now
+        spendable = self.remaining - int((self.limit or 0) * config['upstream_rate_limit_reserve'])
+        if spendable <= 0:
+            return reset_in
+
+        if self.limit and self.remaining > self.limit * PACING_THRESHOLD:
+            return 0
+
+        slot = max(now, self._next_background_slot)
+        self._next_background_slot = slot + reset_in / spendable
+        return slot - now
+
+    @staticmethod
+    def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+        if not value:
+            return None
+        if value.isdigit():
+            return float(value)
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+        except (TypeError, ValueError):
+            return None
+
+
+class RateLimitedTransport(httpx.AsyncBaseTransport):
+    """
+    Transport pacing requests by the rate limit budget of their credential.
+
+    Budgets are shared by all clients using the same credential against the same host. Idempotent
+    requests rejected with 429, or with 403 on an exhausted GitHub budget, are retried after the
+    advertised delay if it is short enough for the priority of the request.
+    """
+    _buckets: Dict[Tuple[str, str, str], RateLimitBucket] = {}
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, credential_key: str):
+        self._transport = transport
+        self._credential_key = credential_key
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        # GitHub accounts GraphQL queries in a budget of their own
+        resource = "graphql" if request.url.path.endswith("/graphql") else "rest"
+        bucket = self._buckets.setdefault((request.url.host, self._credential_key, resource), RateLimitBucket())
+        priority = request_priority.get()
+        max_wait = (config['upstream_max_retry_after'] if priority == RequestPriority.BACKGROUND
+                    else INTERACTIVE_MAX_WAIT)
+
+        attempt = 0
+        while True:
+            await bucket.acquire(priority)
+            response = await self._transport.handle_async_request(request)
+            retry_after = bucket.update(response)
+            if (retry_after is None or attempt >= MAX_RATE_LIMIT_RETRIES or retry_after > max_wait
+                    or request.method not in RETRYABLE_METHODS):
+                return response
+
+            attempt += 1
+            LOGGER.warning(f"Rate limited by {request.url.host}, retrying {request.method} {request.url.path} "
+                           f"in {retry_after:.0f} seconds.")
+            await response.aclose()
+            await asyncio.sleep(retry_after)
+
+    async def aclose(self):
+        await self._transport.aclose()
@@ -0,0 +1,234 @@
+import asyncio
+import json
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Tuple, Optional, List, Any, Pattern
+
+import httpx
+
+from app.config.config import Settings
+from app.utils.clients.single_flight import STREAM_EXTENSION
+from app.utils.logger import Logger
+
+LOGGER = Logger().start_logger()
+config = Settings().app
+
+# Largest share of the cache a single response may take
+MAX_ENTRY_SHARE = 8
+GITLAB_TERMINAL_STATUSES = {"success", "failed", "canceled", "skipped"}
+CONDITIONAL_HEADERS = ("If-None-Match", "If-Modified-Since", "Cache-Control")
+READ_ONLY_METHODS = ("GET", "HEAD", "OPTIONS")
+# GitHub GraphQL queries are sent as POST requests but only read
+GRAPHQL_PATH = re.compile(r"/graphql$")
+
+
+@dataclass(frozen=True)
+class CacheRule:
+    pattern: Pattern
+    # Seconds a response is served without asking the CI server
+    ttl: float
+    # Whether responses describing only finished builds or jobs are kept until evicted
+    pin_terminal: bool = False
+
+
+# Endpoints read when users browse builds, matched against the end of the request path. Anything else,
+# like the catalog discovery of the sync, is never cached.
+CACHE_RULES = (
+    # GitLab
+    CacheRule(re.compile(r"/projects/[^/]+/pipelines$"), ttl=5),
+    CacheRule(re.compile(r"/projects/[^/]+/jobs$"), ttl=5),
+    CacheRule(re.compile(r"/projects/[^/]+/pipelines/\d+/jobs$"), ttl=5, pin_terminal=True),
+    CacheRule(re.compile(r"/projects/[^/]+/jobs/\d+$"), ttl=5, pin_terminal=True),
+    CacheRule(re.compile(r"/projects/[^/]+/jobs/\d+/trace$"), ttl=5),
+    CacheRule(re.compile(r"/projects/[^/]+/(variables|repository/branches|repository/files/[^/]+/raw)$"), ttl=60),
+    # GitHub
+    CacheRule(re.compile(r"/repositories/\d+/actions/workflows/[^/]+/runs$"), ttl=5),
+    CacheRule(re.compile(r"/repositories/\d+/actions/runs/\d+(/jobs)?$"), ttl=5, pin_terminal=True),
+    CacheRule(re.compile(r"/repositories/\d+/actions/jobs/\d+$"), ttl=5, pin_terminal=True),
+    CacheRule(re.compile(r"/repositories/\d+/(actions/variables|branches|contents/parameters\.json)$"), ttl=60),
+    # Jenkins
+    CacheRule(re.compile(r"/job/.+/\d+/api/json$"), ttl=5, pin_terminal=True),
+    CacheRule(re.compile(r"/job/.+/\d+/consoleText$"), ttl=5),
+    CacheRule(re.compile(r"/job/[^/]+(/job/[^/]+)*/api/json$"), ttl=5),
+)
+
+
+@dataclass
+class CachedResponse:
+    status_code: int
+    headers: List[Tuple[bytes, bytes]]
+    content: bytes
+    # Monotonic time the response turns stale, or None when it is pinned
+    fresh_until: Optional[float]
+
+    @property
+    def size(self) -> int:
+        return len(self.content) + sum(len(name) + len(value) for name, value in self.headers)
+
+    def to_response(self) -> httpx.Response:
+        return httpx.Response(self.status_code, headers=self.headers, stream=httpx.ByteStream(self.content))
+
+
+def is_terminal(data: Any) -> bool:
+    """
+    Check whether an upstream payload only describes builds or jobs that have finished.
+
+    :param data: Decoded JSON payload of a GitLab, GitHub or Jenkins build or job endpoint.
+    :return: True if nothing in the payload can change anymore.
+    """
+    if isinstance(data, list):
+        return bool(data) and all(is_terminal(item) for item in data)
+    if not isinstance(data, dict):
+        return False
+    if '_class' in data:
+        # Jenkins builds have a result once they are over, but pipelines may set it while still running, so
+        # only payloads that also report the build as no longer building are terminal
+        return data.get('building') is False and data.get('result') is not None
+    if isinstance(data.get('jobs'), list):
+        return is_terminal(data['jobs'])
+
+    status = data.get('status')
+    return status == "completed" or status in GITLAB_TERMINAL_STATUSES
+
+
+class CachingTransport(httpx.AsyncBaseTransport):
+    """
+    Transport caching upstream GET responses of build pages in a process wide LRU bounded by bytes.
+
+    Responses are keyed by application, credential and URL and stay fresh for the TTL of their endpoint.
+    Stale responses are still served for `upstream_cache_stale_ttl` seconds while a single background
+    request refreshes them. Responses of finished builds and jobs never change and are kept until
+    evicted. Any request of an application that may change something upstream, like starting or
+    retrying a build, drops its cached responses.
+    """
+    _entries: "OrderedDict[Tuple[int, str, str], CachedResponse]" = OrderedDict()
+    _size = 0
+    _revalidations: Dict[Tuple[int, str, str], asyncio.Task] = {}
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, application_id: Optional[int], credential_key: str):
+        self._transport = transport
+        self._application_id = application_id
+        self._credential_key = credential_key
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method != "GET" or request.extensions.get(STREAM_EXTENSION):
+            response = await self._transport.handle_async_request(request)
+            if not self._is_read_only(request):
+                self.invalidate(self._application_id)
+            return response
+
+        rule = self._match_rule(request)
+        if rule is None:
+            return await self._transport.handle_async_request(request)
+
+        key = (self._application_id, self._credential_key, str(request.url))
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None:
+            if entry.fresh_until is None or now < entry.fresh_until:
+                self._entries.move_to_end(key)
+                return entry.to_response()
+            if now < entry.fresh_until + config['upstream_cache_stale_ttl']:
+                self._entries.move_to_end(key)
+                self._revalidate(key, request, rule)
+                return entry.to_response()
+
+        return await self._fetch(key, request, rule)
+
+    @staticmethod
+    def _is_read_only(request: httpx.Request) -> bool:
+        """Check whether a request can not change anything upstream, like a GraphQL query."""
+        if request.method in READ_ONLY_METHODS:
+            return True
+        if request.method != "POST" or not GRAPHQL_PATH.search(request.url.path):
+            return False
+        try:
+            query = json.loads(request.content).get('query') or ""
+        except (ValueError, AttributeError, httpx.RequestNotRead):
+            return False
+        return not query.lstrip().startswith("mutation")
+
+    def _match_rule(self, request: httpx.Request) -> Optional[CacheRule]:
+        if self._application_id is None or config['upstream_cache_max_bytes'] <= 0:
+            return None
+        if any(header in request.headers for header in CONDITIONAL_HEADERS):
+            return None
+        return next((rule for rule in CACHE_RULES if rule.pattern.search(request.url.path)), None)
+
+    async def _fetch(self, key: Tuple[int, str, str], request: httpx.Request, rule: CacheRule) -> httpx.Response:
+        """Send a request upstream and cache a successful response."""
+        response = await self._transport.handle_async_request(request)
+        if response.status_code != 200:
+            return response
+
+        try:
+            # Still encoded, the client decodes the cached bytes on every hit
+            content = b"".join([chunk async for chunk in response.stream])
+        finally:
+            await response.aclose()
+
+        entry = CachedResponse(status_code=response.status_code, headers=response.headers.raw, content=content,
+                               fresh_until=time.monotonic() + rule.ttl)
+        if rule.pin_terminal and self._is_terminal_response(entry):
+            entry.fresh_until = None
+
+        self._store(key, entry)
+        return entry.to_response()
+
+    @staticmethod
+    def _is_terminal_response(entry: CachedResponse) -> bool:
+        response = entry.to_response()
+        if "json" not in response.headers.get("Content-Type", ""):
+            return False
+        try:
+            # Decodes the content encoding of the raw cached bytes
+            response.read()
+            return is_terminal(response.json())
+        except (ValueError, httpx.DecodingError):
+            return False
+
+    def _store(self, key: Tuple[int, str, str], entry: CachedResponse):
+        max_bytes = config['upstream_cache_max_bytes']
+        if entry.size > max_bytes // MAX_ENTRY_SHARE:
+            return
+
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            CachingTransport._size -= previous.size
+        self._entries[key] = entry
+        CachingTransport._size += entry.size
+
+        while CachingTransport._size > max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            CachingTransport._size -= evicted.size
+
+    def _revalidate(self, key: Tuple[int, str, str], request: httpx.Request, rule: CacheRule):
+        if key in self._revalidations:
+            return
+
+        async def revalidate():
+            try:
+                await self._fetch(key, request, rule)
+            except Exception as e:
+                LOGGER.debug(f"Failed to refresh the cached response of {request.url.path}: {e}")
+            finally:
+                self._revalidations.pop(key, None)
+
+        self._revalidations[key] = asyncio.create_task(revalidate())
+
+    @classmethod
+    def invalidate(cls, application_id: Optional[int]):
+        """
+        Drop all cached responses of an application.
+
+        :param application_id: Application ID.
+        """
+        if application_id is None:
+            return
+        for key in [key for key in cls._entries if key[0] == application_id]:
+            cls._size -= cls._entries.pop(key).size
+
+    async def aclose(self):
+        await self._transport.aclose()
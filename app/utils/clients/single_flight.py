@@ -0,0 +1,102 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Dict, Tuple, List
+
+import httpx
+
+from app.utils.clients.rate_limiter import request_priority
+from app.utils.logger import Logger
+
+LOGGER = Logger().start_logger()
+
+# Request extension of streamed requests. Their responses are passed through as they arrive instead of
+# being buffered to be shared or cached.
+STREAM_EXTENSION = "stream"
+CREDENTIAL_HEADERS = ("authorization", "private-token")
+
+
+@dataclass
+class InFlightRequest:
+    task: asyncio.Task
+    waiters: int = 0
+
+
+@dataclass
+class SharedResponse:
+    status_code: int
+    headers: List[Tuple[bytes, bytes]]
+    content: bytes
+    extensions: Dict = field(default_factory=dict)
+
+    def to_response(self) -> httpx.Response:
+        return httpx.Response(self.status_code, headers=self.headers, stream=httpx.ByteStream(self.content),
+                              extensions=self.extensions)
+
+
+class SingleFlightTransport(httpx.AsyncBaseTransport):
+    """
+    Transport coalescing identical GET requests in flight into a single upstream request.
+
+    Requests are identical when they share the credential, priority, URL and headers. The first one is
+    sent upstream from a task of its own and every caller receives a copy of its buffered response, or
+    its exception. A caller giving up does not cancel the request for the others; it is only cancelled
+    once nobody waits for it anymore.
+    """
+    _in_flight: Dict[Tuple, InFlightRequest] = {}
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, credential_key: str):
+        self._transport = transport
+        self._credential_key = credential_key
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method != "GET" or request.extensions.get(STREAM_EXTENSION):
+            return await self._transport.handle_async_request(request)
+
+        key = self._request_key(request)
+        in_flight = self._in_flight.get(key)
+        if in_flight is None:
+            in_flight = InFlightRequest(task=asyncio.create_task(self._fetch(request)))
+            self._in_flight[key] = in_flight
+            in_flight.task.add_done_callback(lambda _: self._forget(key, in_flight))
+        else:
+            LOGGER.debug(f"Joined an identical in-flight request to {request.url.path}.")
+
+        in_flight.waiters += 1
+        try:
+            shared = await asyncio.shield(in_flight.task)
+        except asyncio.CancelledError:
+            if not in_flight.task.done() and in_flight.waiters == 1:
+                # Later identical requests must not join a request that is being cancelled
+                self._forget(key, in_flight)
+                in_flight.task.cancel()
+            raise
+        finally:
+            in_flight.waiters -= 1
+
+        return shared.to_response()
+
+    def _request_key(self, request: httpx.Request) -> Tuple:
+        # Credentials are covered by the credential key, and GitHub App tokens rotate
+        headers = tuple(sorted((name, value) for name, value in request.headers.items()
+                               if name not in CREDENTIAL_HEADERS))
+        return self._credential_key, request_priority.get(), str(request.url), headers
+
+    async def _fetch(self, request: httpx.Request) -> SharedResponse:
+        response = await self._transport.handle_async_request(request)
+        try:
+            # Still encoded, every caller decodes its own copy
+            content = b"".join([chunk async for chunk in response.stream])
+        finally:
+            await response.aclose()
+
+        extensions = {name: value for name, value in response.extensions.items()
+                      if name in ("http_version", "reason_phrase")}
+        return SharedResponse(status_code=response.status_code, headers=response.headers.raw, content=content,
+                              extensions=extensions)
+
+    def _forget(self, key: Tuple, in_flight: InFlightRequest):
+        if self._in_flight.get(key) is in_flight:
+            del self._in_flight[key]
+
+    async def aclose(self):
+        await self._transport.aclose()
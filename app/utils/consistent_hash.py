@@ -0,0 +1,33 @@
+import bisect
+import hashlib
+from typing import List, Optional
+
+
+class HashRing:
+    """
+    Consistent hash ring mapping keys to nodes.
+
+    Every node is placed on the ring several times (virtual nodes) so keys spread evenly, and adding
+    or removing a node only moves the keys of its neighbouring ring segments.
+    """
+
+    def __init__(self, nodes: List[str], replicas: int = 100):
+        self._ring = sorted((self._hash(f"{node}#{replica}"), node) for node in nodes for replica in range(replicas))
+        self._positions = [position for position, _ in self._ring]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+    def get_node(self, key: str) -> Optional[str]:
+        """
+        Get the node owning a key.
+
+        :param key: The key to look up.
+        :return: The owning node, or None if the ring is empty.
+        """
+        if not self._ring:
+            return None
+
+        index = bisect.bisect(self._positions, self._hash(key)) % len(self._ring)
+        return self._ring[index][1]
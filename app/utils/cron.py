@@ -1,49 +1,147 @@
+import asyncio
 import threading
 import traceback
 from asyncio import sleep
+from datetime import datetime, timedelta
+from typing import List, Optional, Dict
 
+from app.config.config import Settings
 from app.daos.applications_dao import ApplicationDAO
-from app.daos.pipelines_dao import PipelineDAO
-from app.utils.enums import AppStatus
+from app.daos.sync_runs_dao import SyncRunsDAO
+from app.models import db_models as model
+from app.utils.enums import AppStatus, SyncMode, SyncStatus
+from app.utils.leader_election import LeaderElection
 from app.utils.logger import Logger
 from app.utils.pipeline_identifier import PipelineIdentifier
+from app.utils.sync_cluster import SyncCluster
+from app.utils.sync_scheduler import SyncScheduler
+from app.utils.sync_telemetry import ApplicationSyncStats
 
 LOGGER = Logger().start_logger()
+config = Settings().app
+
+# How often a non-leader process checks whether it can take over the pipelines sync
+LEADER_ELECTION_RETRY_INTERVAL = 30
+# How often the scheduled applications are reloaded from the database
+APPLICATIONS_REFRESH_INTERVAL = 30
 
 
 class Cron:
-    def __init__(self, pipeline_dao=None, application_dao=None):
-        self.pipeline_dao = pipeline_dao or PipelineDAO()
+    def __init__(self, application_dao=None, leader_election=None, sync_cluster=None):
         self.application_dao = application_dao or ApplicationDAO()
+        self.leader_election = leader_election or LeaderElection()
+        self.sync_cluster = sync_cluster or SyncCluster()
+        self.sync_mode = SyncMode(config['pipelines_sync_mode'])
 
     async def sync_pipelines(self, interval: int):
-        while True:
-            LOGGER.debug(f"Pipelines sync has started in a `Thread` with ID - {threading.get_ident()}")
-            try:
-                pipeline_dao = PipelineDAO()
-                LOGGER.debug("Fetching all applications and pipelines from the database.")
-                applications = await self.application_dao.get_all_by_status(AppStatus.ACTIVE.value)
-                pipelines = await self.pipeline_dao.get_by_application_status(AppStatus.ACTIVE.value)
-                existing_pipeline_names = {f"{pipeline.name}-{pipeline.application_id}" for pipeline in pipelines}
-
-                fetched_pipelines = await PipelineIdentifier.fetch_pipelines_from_applications(applications)
-                new_pipelines = await PipelineIdentifier.identify_new_pipelines(fetched_pipelines,
-                                                                                existing_pipeline_names)
-
-                pipeline_ids_to_delete = [p.id for p in
-                                          await PipelineIdentifier.identify_old_pipelines(pipelines, fetched_pipelines)]
-
-                if pipeline_ids_to_delete:
-                    LOGGER.debug(f"Identified {len(pipeline_ids_to_delete)} pipelines to delete. Deleting..")
-                    await self.pipeline_dao.delete_multiple(pipeline_ids_to_delete)
-
-                if new_pipelines:
-                    await pipeline_dao.create_bulk(new_pipelines)
-                    LOGGER.debug(f"Added {len(new_pipelines)} new pipelines to the database.")
-
-                LOGGER.debug(f"Next synchronization will be executed after {interval} seconds.")
-            except Exception as e:
-                traceback.print_exc()
-                LOGGER.error(f"Pipelines sync has failed. Please, check what is going on: {e}")
-
-            await sleep(interval)
+        """
+        Keep synchronizing every application whenever its next sync is due.
+
+        :param interval: Default sync interval of applications without their own one.
+        """
+        scheduler = SyncScheduler(default_interval=interval,
+                                  min_interval=config['pipelines_sync_min_interval'],
+                                  max_backoff=config['pipelines_sync_max_backoff'],
+                                  jitter=config['pipelines_sync_jitter'])
+        heartbeat_task = None
+        if self.sync_mode == SyncMode.SHARDED:
+            LOGGER.info(f"Pipelines sync runs sharded as node `{self.sync_cluster.node_id}`.")
+            heartbeat_task = asyncio.create_task(self.sync_cluster.run_heartbeat())
+
+        try:
+            while True:
+                applications = await self._get_applications_to_sync()
+                if applications is None:
+                    scheduler.clear()
+                    await sleep(min(interval, LEADER_ELECTION_RETRY_INTERVAL))
+                    continue
+
+                scheduler.refresh(applications)
+                due = scheduler.pop_due()
+                if due:
+                    results = await self._sync_applications(due)
+                    for application_id, stats in results.items():
+                        scheduler.record_result(application_id, stats.result)
+
+                # Wake up regularly to pick up added, changed and removed applications
+                delay = scheduler.seconds_until_next()
+                delay = APPLICATIONS_REFRESH_INTERVAL if delay is None else min(delay, APPLICATIONS_REFRESH_INTERVAL)
+                LOGGER.debug(f"Next synchronization check will be executed after {delay:.0f} seconds.")
+                await sleep(delay)
+        finally:
+            if heartbeat_task:
+                heartbeat_task.cancel()
+                await self.sync_cluster.leave()
+            await self.leader_election.resign()
+
+    async def _get_applications_to_sync(self) -> Optional[List[model.Applications]]:
+        """
+        Fetch the active applications this process is responsible for.
+
+        :return: Applications to synchronize, or None if this process should not synchronize anything.
+        """
+        if self.sync_mode == SyncMode.LEADER and not await self._is_sync_leader():
+            return None
+
+        try:
+            LOGGER.debug("Fetching all active applications from the database.")
+            applications = await self.application_dao.get_all_by_status(AppStatus.ACTIVE.value)
+            if self.sync_mode == SyncMode.SHARDED:
+                applications = await self.sync_cluster.get_owned_applications(applications)
+                LOGGER.debug(f"Node `{self.sync_cluster.node_id}` owns {len(applications)} applications.")
+            return applications
+        except Exception as e:
+            LOGGER.error(f"Fetching applications to synchronize has failed: {e}")
+            return None
+
+    async def _is_sync_leader(self) -> bool:
+        try:
+            if await self.leader_election.is_leader():
+                return True
+        except Exception as e:
+            LOGGER.error(f"Pipelines sync leader election has failed: {e}")
+            return False
+
+        LOGGER.debug("Another process is the pipelines sync leader. Skipping synchronization.")
+        return False
+
+    async def _sync_applications(self, applications: List[model.Applications]) -> Dict[int, ApplicationSyncStats]:
+        LOGGER.debug(f"Pipelines sync of {len(applications)} applications has started "
+                     f"in a `Thread` with ID - {threading.get_ident()}")
+        started_ts = datetime.utcnow()
+        try:
+            results = await PipelineIdentifier.sync_applications(
+                applications,
+                concurrency=config['pipelines_sync_concurrency'],
+                timeout=config['pipelines_sync_app_timeout'])
+        except Exception as e:
+            traceback.print_exc()
+            LOGGER.error(f"Pipelines sync has failed. Please, check what is going on: {e}")
+            results = {application.id: ApplicationSyncStats(application.id, started_ts=started_ts,
+                                                            status=SyncStatus.FAILED.value, error=str(e))
+                       for application in applications}
+
+        failed = [application_id for application_id, stats in results.items() if stats.result is None]
+        if failed:
+            LOGGER.warning(f"Pipelines sync has failed for applications with IDs {failed}.")
+
+        await self._record_sync_run(started_ts, results, len(failed))
+        return results
+
+    async def _record_sync_run(self, started_ts: datetime, results: Dict[int, ApplicationSyncStats],
+                               failed_count: int):
+        finished_ts = datetime.utcnow()
+        sync_run_data = {
+            "node_id": self.sync_cluster.node_id,
+            "started_ts": started_ts,
+            "finished_ts": finished_ts,
+            "duration_ms": int((finished_ts - started_ts).total_seconds() * 1000),
+            "applications_count": len(results),
+            "failed_count": failed_count
+        }
+        try:
+            await SyncRunsDAO().create(sync_run_data, [stats.as_dict() for stats in results.values()])
+            await SyncRunsDAO().delete_older_than(
+                finished_ts - timedelta(days=config['sync_runs_retention_days']))
+        except Exception as e:
+            LOGGER.error(f"Recording the pipelines sync run has failed: {e}")
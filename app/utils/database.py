@@ -1,3 +1,4 @@
+from sqlalchemy import inspect, text
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
@@ -22,6 +23,27 @@ SessionLocal = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 Base = declarative_base()
 
 
+def add_missing_columns(connection):
+    """
+    Add columns declared on the models that are missing from already existing tables.
+
+    `create_all` only creates missing tables, so columns introduced later are added here as nullable columns.
+    """
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+
+            column_type = column.type.compile(dialect=connection.dialect)
+            LOGGER.info(f"Adding missing column `{column.name}` to table `{table.name}`.")
+            connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN IF NOT EXISTS {column.name} {column_type}'))
+
+
 def convert_params(params):
     new_params = {}
     for key, value in params.items():
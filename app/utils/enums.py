@@ -23,6 +23,25 @@ class AppStatus(Enum):
     INACTIVE = 'inactive'
 
 
+class SyncMode(Enum):
+    LEADER = 'leader'
+    SHARDED = 'sharded'
+    STANDALONE = 'standalone'
+
+
+class SyncStatus(Enum):
+    RUNNING = 'running'
+    SUCCESS = 'success'
+    SKIPPED = 'skipped'
+    FAILED = 'failed'
+    TIMEOUT = 'timeout'
+
+
+class RequestPriority(Enum):
+    INTERACTIVE = 'interactive'
+    BACKGROUND = 'background'
+
+
 class AuthMethods(Enum):
     CAS = 'CAS'
     AAD = 'Azure AD'
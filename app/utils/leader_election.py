@@ -0,0 +1,95 @@
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.utils import database
+from app.utils.logger import Logger
+
+LOGGER = Logger().start_logger()
+
+# Arbitrary application wide key of the PostgreSQL advisory lock guarding the pipelines sync
+PIPELINES_SYNC_LOCK_ID = 7_420_221_001
+
+
+class LeaderElection:
+    """
+    Elects a single process across all workers and replicas using a PostgreSQL advisory lock.
+
+    The lock is session level and held on a dedicated connection, so PostgreSQL releases it as soon as
+    the leader's connection goes away and another process can take over on its next attempt.
+    """
+
+    def __init__(self, lock_id: int = PIPELINES_SYNC_LOCK_ID):
+        self._lock_id = lock_id
+        self._connection: Optional[AsyncConnection] = None
+
+    async def is_leader(self) -> bool:
+        """
+        Check whether this process is the leader, trying to become one if it is not.
+
+        :return: True if this process holds the lock.
+        """
+        if self._connection is not None:
+            try:
+                await self._connection.execute(text("SELECT 1"))
+                return True
+            except Exception as e:
+                LOGGER.warning(f"Lost the connection holding the leader lock {self._lock_id}: {e}")
+                await self._close_connection()
+
+        connection = await database.engine.connect()
+        try:
+            # Autocommit keeps the connection from sitting idle in a transaction while holding the lock
+            await connection.execution_options(isolation_level="AUTOCOMMIT")
+            acquired = (await connection.execute(text("SELECT pg_try_advisory_lock(:lock_id)"),
+                                                 {"lock_id": self._lock_id})).scalar()
+        except Exception:
+            await connection.close()
+            raise
+
+        if not acquired:
+            await connection.close()
+            return False
+
+        LOGGER.info(f"This process has been elected leader for lock {self._lock_id}.")
+        self._connection = connection
+        return True
+
+    @property
+    def is_held_here(self) -> bool:
+        """Whether this process holds the lock, as of its last check."""
+        return self._connection is not None
+
+    async def is_held(self) -> bool:
+        """
+        Check whether any process holds the lock, without trying to take it.
+
+        :return: True if the lock is held.
+        """
+        async with database.engine.connect() as connection:
+            # Advisory locks on a bigint key are listed with its high half as classid and its low half as objid
+            return (await connection.execute(
+                text("SELECT EXISTS (SELECT 1 FROM pg_locks WHERE locktype = 'advisory' AND granted "
+                     "AND objsubid = 1 AND classid::bigint = :high AND objid::bigint = :low)"),
+                {"high": self._lock_id >> 32, "low": self._lock_id & 0xFFFFFFFF})).scalar()
+
+    async def resign(self):
+        """Release the lock if this process holds it."""
+        if self._connection is None:
+            return
+
+        try:
+            await self._connection.execute(text("SELECT pg_advisory_unlock(:lock_id)"), {"lock_id": self._lock_id})
+        except Exception as e:
+            LOGGER.warning(f"Failed to release the leader lock {self._lock_id}: {e}")
+        finally:
+            await self._close_connection()
+
+    async def _close_connection(self):
+        connection, self._connection = self._connection, None
+        try:
+            await connection.close()
+        except Exception:
+            # The connection is already broken, so there is nothing left to release
+            pass
@@ -0,0 +1,291 @@
+import asyncio
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import time
+import zlib
+from array import array
+from dataclasses import asdict
+from itertools import islice
+from typing import AsyncIterable, Iterator, AsyncIterator, List, Optional, BinaryIO
+
+from app.config.config import Settings
+from app.utils.log_sections import SectionParser, LogSection, LogSections
+from app.utils.log_stream import LogLine, LogWindow, LogSearch, LogMatcher, iter_log_lines, search_log
+from app.utils.logger import Logger
+
+LOGGER = Logger().start_logger()
+config = Settings().app
+
+# Lines per compressed block, the unit a read decompresses
+BLOCK_LINES = 1000
+ARCHIVE_SUFFIX = ".log"
+ARCHIVE_MAGIC = b"CILOGV02"
+# Magic, byte offsets of the block index and of the sections, and number of lines, at the end of every archive
+ARCHIVE_FOOTER = struct.Struct("<8sQQQ")
+# Seconds after which the size of the archive directory is counted again, to notice archives of other processes
+RETENTION_RESCAN_INTERVAL = 300
+
+# Bytes of the archive directory when it was last scanned, plus the archives written since
+_archive_bytes: Optional[int] = None
+_archive_bytes_ts = 0.0
+
+
+class LogArchive:
+    """
+    Read access to an archived log, memory-mapped so only the blocks of the requested lines are read.
+
+    An archive is a sequence of zlib compressed blocks of `BLOCK_LINES` lines, followed by the byte
+    offsets of the blocks, the section tree of the log as JSON and a footer. A block holds the upstream
+    byte offsets of its lines followed by their text, with ANSI escape sequences and section markers
+    already removed.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, index_offset, self._sections_offset, self.line_count = ARCHIVE_FOOTER.unpack_from(
+                self._mmap, len(self._mmap) - ARCHIVE_FOOTER.size)
+            if magic != ARCHIVE_MAGIC:
+                raise ValueError(f"{path} is not a log archive.")
+            self._index = array("Q")
+            self._index.frombytes(self._mmap[index_offset:self._sections_offset])
+            # The end of the last block
+            self._index.append(index_offset)
+        except (ValueError, struct.error):
+            self._mmap.close()
+            raise
+
+    def __enter__(self) -> "LogArchive":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._mmap.close()
+
+    def _read_block(self, block: int) -> List[LogLine]:
+        payload = zlib.decompress(self._mmap[self._index[block]:self._index[block + 1]])
+        count = min(BLOCK_LINES, self.line_count - block * BLOCK_LINES)
+        offsets = array("Q")
+        offsets.frombytes(payload[:count * offsets.itemsize])
+        texts = payload[count * offsets.itemsize:].decode("utf-8").split("\n")
+        first = block * BLOCK_LINES + 1
+        return [LogLine(number=first + i, offset=offsets[i], text=texts[i]) for i in range(count)]
+
+    def iter_lines(self, start: int = 1) -> Iterator[LogLine]:
+        """Iterate over the lines of the archive from a line number on."""
+        start = max(start, 1)
+        for block in range((start - 1) // BLOCK_LINES, len(self._index) - 1):
+            for line in self._read_block(block):
+                if line.number >= start:
+                    yield line
+
+    async def aiter_lines(self, start: int = 1) -> AsyncIterator[LogLine]:
+        """Iterate over the lines of the archive, letting other requests run between blocks."""
+        for line in self.iter_lines(start):
+            yield line
+            if line.number % BLOCK_LINES == 0:
+                await asyncio.sleep(0)
+
+    def read_window(self, head: int = None, tail: int = None, start: int = None, end: int = None) -> LogWindow:
+        """
+        Read a window of lines, decompressing only the blocks it spans.
+
+        :param head: Number of lines from the start of the log.
+        :param tail: Number of lines from the end of the log.
+        :param start: First line number of a range, inclusive.
+        :param end: Last line number of a range, inclusive.
+        :return: The lines of the window.
+        """
+        if tail is not None:
+            start, end = self.line_count - tail + 1, self.line_count
+        elif head is not None:
+            start, end = 1, head
+        start = max(start, 1)
+
+        lines = list(islice(self.iter_lines(start), max(end - start + 1, 0)))
+        return LogWindow(lines=lines, total_lines=self.line_count)
+
+    async def search(self, matcher: LogMatcher, context: int = 0, max_matches: int = 100) -> LogSearch:
+        """Search the lines of the archive for a pattern, see `log_stream.search_log`."""
+        return await search_log(self.aiter_lines(), matcher, context, max_matches)
+
+    def read_sections(self) -> LogSections:
+        """Read the section tree parsed when the log was archived."""
+        sections = json.loads(self._mmap[self._sections_offset:len(self._mmap) - ARCHIVE_FOOTER.size])
+        return LogSections(sections=[LogSection.from_dict(section) for section in sections],
+                           total_lines=self.line_count)
+
+
+async def iter_archived_lines(archive: LogArchive) -> AsyncIterator[str]:
+    """
+    Iterate over the text of the lines of an archive and close it afterwards.
+
+    :param archive: Opened archive.
+    :return: Async iterator of lines.
+    """
+    try:
+        async for line in archive.aiter_lines():
+            yield line.text
+    finally:
+        archive.close()
+
+
+def is_enabled() -> bool:
+    return config['log_archive_max_bytes'] > 0
+
+
+def _archive_path(key: str) -> str:
+    return os.path.join(config['log_archive_path'], hashlib.sha256(key.encode()).hexdigest() + ARCHIVE_SUFFIX)
+
+
+def open_archive(key: str) -> Optional[LogArchive]:
+    """
+    Open the archived log stored under a key.
+
+    :param key: Key identifying the job of the log.
+    :return: The archive, which has to be closed by the caller, or None if the log is not archived.
+    """
+    if not is_enabled():
+        return None
+
+    path = _archive_path(key)
+    try:
+        archive = LogArchive(path)
+    except FileNotFoundError:
+        return None
+    except (ValueError, struct.error, OSError) as e:
+        LOGGER.warning(f"Dropping unreadable log archive {path}: {e}")
+        _remove(path)
+        return None
+
+    # Retention evicts the archives read least recently
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return archive
+
+
+async def write_archive(key: str, chunks: AsyncIterable[bytes]) -> LogArchive:
+    """
+    Archive a complete log and enforce the retention of the archive directory.
+
+    The log is compressed block by block while it is streamed, so memory stays bounded by a block, and
+    its sections are parsed along the way.
+
+    :param key: Key identifying the job of the log.
+    :param chunks: Raw bytes of the complete log.
+    :return: The new archive, which has to be closed by the caller.
+    """
+    directory = config['log_archive_path']
+    os.makedirs(directory, exist_ok=True)
+    path = _archive_path(key)
+
+    # Written under a temporary name so readers never see a partial archive
+    fd, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            index = array("Q")
+            parser = SectionParser()
+            block: List[LogLine] = []
+            line_count = 0
+            async for line in iter_log_lines(chunks, parser):
+                block.append(line)
+                line_count += 1
+                if len(block) == BLOCK_LINES:
+                    # Compressed and written off the event loop, like the end of the archive
+                    await asyncio.to_thread(_write_block, file, index, block)
+                    block = []
+            if block:
+                await asyncio.to_thread(_write_block, file, index, block)
+            size = await asyncio.to_thread(_write_footer, file, index, parser.finish(), line_count)
+        os.replace(temporary_path, path)
+    except BaseException:
+        _remove(temporary_path)
+        raise
+
+    archive = LogArchive(path)
+    await _track_archive_size(size, keep=path)
+    LOGGER.debug(f"Archived a log of {line_count} lines as {path}.")
+    return archive
+
+
+def _write_block(file: BinaryIO, index: array, lines: List[LogLine]):
+    index.append(file.tell())
+    offsets = array("Q", (line.offset for line in lines))
+    file.write(zlib.compress(offsets.tobytes() + "\n".join(line.text for line in lines).encode("utf-8")))
+
+
+def _write_footer(file: BinaryIO, index: array, sections: LogSections, line_count: int) -> int:
+    """Write the block index, the sections and the footer of an archive, and return its size."""
+    index_offset = file.tell()
+    file.write(index.tobytes())
+    sections_offset = file.tell()
+    file.write(json.dumps([asdict(section) for section in sections.sections]).encode())
+    file.write(ARCHIVE_FOOTER.pack(ARCHIVE_MAGIC, index_offset, sections_offset, line_count))
+    file.flush()
+    return file.tell()
+
+
+async def _track_archive_size(size: int, keep: str):
+    """
+    Count a new archive into the size of the archive directory, and only scan the directory to enforce
+    the retention once it is over `log_archive_max_bytes` or the count is due for a rescan.
+
+    :param size: Bytes of the new archive.
+    :param keep: Path of the new archive.
+    """
+    global _archive_bytes, _archive_bytes_ts
+    if _archive_bytes is not None and time.monotonic() - _archive_bytes_ts < RETENTION_RESCAN_INTERVAL:
+        _archive_bytes += size
+        if _archive_bytes <= config['log_archive_max_bytes']:
+            return
+
+    _archive_bytes = await asyncio.to_thread(enforce_retention, keep)
+    _archive_bytes_ts = time.monotonic()
+
+
+def enforce_retention(keep: str = None) -> int:
+    """
+    Remove the least recently read archives until the archive directory fits `log_archive_max_bytes`.
+
+    :param keep: Path of an archive never removed, like the one just written.
+    :return: Bytes of the archives left.
+    """
+    try:
+        entries = [entry for entry in os.scandir(config['log_archive_path'])
+                   if entry.name.endswith(ARCHIVE_SUFFIX) and entry.is_file()]
+    except FileNotFoundError:
+        return 0
+
+    archives = []
+    for entry in entries:
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        archives.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in archives)
+    for _, size, path in sorted(archives):
+        if total <= config['log_archive_max_bytes']:
+            break
+        if path == keep:
+            continue
+        _remove(path)
+        total -= size
+    return total
+
+
+def _remove(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
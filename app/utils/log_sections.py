@@ -0,0 +1,133 @@
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional, Dict
+
+# GitLab section markers, left behind once ANSI escape sequences are removed, like
+# `section_start:1560896352:step_script[collapsed=true]\r`
+GITLAB_SECTION_MARKER = re.compile(r'section_(start|end):(\d+):([^\[\r\s]+)(?:\[([^\]]*)\])?\r?')
+# GitHub prefixes every line with its timestamp and opens and closes groups with commands
+GITHUB_TIMESTAMP = re.compile(r'^(\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(?:\.\d+)?Z) ')
+GITHUB_GROUP_COMMAND = re.compile(r'##\[(group|endgroup)\]')
+
+
+@dataclass
+class LogSection:
+    name: str
+    # Header text shown for the folded section
+    title: str
+    start_line: int
+    # Last line of the section, None while it is still open
+    end_line: Optional[int] = None
+    # Unix time the section started at and its length in seconds, when the log records them
+    started_at: Optional[float] = None
+    duration: Optional[float] = None
+    collapsed: bool = False
+    children: List["LogSection"] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "LogSection":
+        return cls(**{**data, 'children': [cls.from_dict(child) for child in data['children']]})
+
+
+@dataclass
+class LogSections:
+    sections: List[LogSection]
+    total_lines: int
+
+
+def strip_section_markers(line: str) -> str:
+    """Remove GitLab section markers and GitHub group commands from a log line."""
+    if 'section_' in line:
+        line = GITLAB_SECTION_MARKER.sub('', line)
+    if '##[' in line:
+        line = GITHUB_GROUP_COMMAND.sub('', line)
+    return line
+
+
+class SectionParser:
+    """
+    Streaming stage folding the lines of a log into a tree of sections.
+
+    GitLab sections are delimited by `section_start` and `section_end` markers carrying a unix
+    timestamp, GitHub groups by `##[group]` and `##[endgroup]` commands on timestamped lines. Lines
+    are fed in order and returned with their markers removed, so the tree is built while the log is
+    streamed without keeping its lines.
+    """
+
+    def __init__(self):
+        self._roots: List[LogSection] = []
+        self._open: List[LogSection] = []
+        self._last_line = 0
+
+    def feed(self, number: int, line: str) -> str:
+        """
+        Parse a line of the log.
+
+        :param number: 1-based line number.
+        :param line: Line text with ANSI escape sequences removed.
+        :return: The line text without section markers.
+        """
+        self._last_line = number
+        if 'section_' in line:
+            line = self._feed_gitlab(number, line)
+        if '##[' in line:
+            line = self._feed_github(number, line)
+        return line
+
+    def _feed_gitlab(self, number: int, line: str) -> str:
+        for marker in GITLAB_SECTION_MARKER.finditer(line):
+            kind, timestamp, name, options = marker.groups()
+            if kind == 'start':
+                self._start(LogSection(name=name, title=name, start_line=number, started_at=float(timestamp),
+                                       collapsed='collapsed=true' in (options or '')))
+            else:
+                self._end(number, float(timestamp), name)
+
+        text = GITLAB_SECTION_MARKER.sub('', line)
+        if text.strip() and self._open and self._open[-1].start_line == number:
+            self._open[-1].title = text.strip()
+        return text
+
+    def _feed_github(self, number: int, line: str) -> str:
+        command = GITHUB_GROUP_COMMAND.search(line)
+        if command is None:
+            return line
+
+        timestamp = GITHUB_TIMESTAMP.match(line)
+        at = datetime.fromisoformat(timestamp.group(1)).timestamp() if timestamp else None
+        title = line[command.end():].strip()
+        if command.group(1) == 'group':
+            self._start(LogSection(name=title, title=title, start_line=number, started_at=at))
+        else:
+            self._end(number, at)
+        return line[:command.start()] + line[command.end():]
+
+    def _start(self, section: LogSection):
+        (self._open[-1].children if self._open else self._roots).append(section)
+        self._open.append(section)
+
+    def _end(self, number: int, at: Optional[float], name: str = None):
+        # A GitLab marker closes the innermost open section of its name along with any unclosed within it
+        if name is not None and all(section.name != name for section in self._open):
+            return
+        while self._open:
+            section = self._open.pop()
+            section.end_line = number
+            if section.name == name or name is None:
+                if at is not None and section.started_at is not None:
+                    section.duration = round(at - section.started_at, 3)
+                return
+
+    def finish(self, complete: bool = True) -> LogSections:
+        """
+        Get the parsed tree.
+
+        :param complete: Whether the log has been fully written, which closes sections left open at its end.
+        :return: The top level sections of the log.
+        """
+        if complete:
+            for section in self._open:
+                section.end_line = self._last_line
+            self._open = []
+        return LogSections(sections=self._roots, total_lines=self._last_line)
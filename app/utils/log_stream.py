@@ -0,0 +1,403 @@
+import asyncio
+import multiprocessing
+import re
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import AsyncIterator, AsyncIterable, List, Tuple, Optional
+
+import httpx
+
+from app.utils.log_sections import SectionParser, LogSections, strip_section_markers
+
+ANSI_ESCAPE = re.compile(r'(\x9B|\x1B\[)[0-?]*[ -/]*[@-~]')
+# Default and largest number of log bytes returned by a single tail request
+TAIL_MAX_BYTES = 1024 * 1024
+TAIL_MAX_BYTES_LIMIT = 16 * 1024 * 1024
+# Most lines returned by a window or as search context
+WINDOW_MAX_LINES = 10000
+SEARCH_MAX_CONTEXT = 50
+SEARCH_MAX_MATCHES = 1000
+SEARCH_MAX_PATTERN_LENGTH = 500
+# Lines matched at once, and seconds a regular expression may search a whole log for
+SEARCH_BATCH_LINES = 1000
+SEARCH_REGEX_TIMEOUT = 10
+# Longest line held in memory, longer lines are split
+LINE_MAX_BYTES = 1024 * 1024
+
+
+@dataclass
+class LogLine:
+    # 1-based line number
+    number: int
+    # Byte offset of the start of the line in the upstream log
+    offset: int
+    text: str
+
+
+@dataclass
+class LogWindow:
+    lines: List[LogLine]
+    # Number of lines of the log, known when it was read to its end
+    total_lines: Optional[int] = None
+
+
+@dataclass
+class LogMatch:
+    line: LogLine
+    # Start and end positions of the matches within the line
+    spans: List[Tuple[int, int]]
+    before: List[LogLine] = field(default_factory=list)
+    after: List[LogLine] = field(default_factory=list)
+
+
+@dataclass
+class LogSearch:
+    matches: List[LogMatch]
+    # Whether the search stopped at the match limit before the end of the log
+    truncated: bool
+    scanned_lines: int
+
+
+@dataclass
+class LogTail:
+    lines: List[str]
+    # Byte offset the next tail request continues from
+    offset: int
+    # Whether the log may still grow or more of it is left to read
+    more: bool
+
+
+def strip_ansi(line: str) -> str:
+    """Remove ANSI escape sequences, like colors, from a log line."""
+    return ANSI_ESCAPE.sub('', line)
+
+
+def clean_line(line: str) -> str:
+    """Remove ANSI escape sequences and section markers from a log line."""
+    return strip_section_markers(strip_ansi(line))
+
+
+def clean_log_text(text: str) -> List[str]:
+    """Split a whole log into cleaned lines."""
+    return [clean_line(line) for line in text.splitlines()]
+
+
+async def iter_raw_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[Tuple[int, bytes]]:
+    """
+    Split a stream of log bytes into lines without holding more than one line and one chunk in memory.
+
+    Lines are split on bytes, which is safe for UTF-8 since a newline byte never occurs inside a
+    multibyte character. Lines longer than `LINE_MAX_BYTES` are split into several lines.
+
+    :param chunks: Raw log chunks.
+    :return: Async iterator of the byte offset and the bytes of every line, without its line terminator.
+    """
+    offset = 0
+    pending = bytearray()
+    async for chunk in chunks:
+        # Only the new bytes can hold a newline
+        scan = len(pending)
+        pending += chunk
+        start = 0
+        while True:
+            end = pending.find(b"\n", max(start, scan))
+            if end == -1 and len(pending) - start <= LINE_MAX_BYTES:
+                break
+            if end == -1 or end - start > LINE_MAX_BYTES:
+                end = _character_boundary(pending, start + LINE_MAX_BYTES)
+                yield offset + start, pending[start:end]
+                start = end
+            else:
+                line = pending[start:end]
+                yield offset + start, line[:-1] if line.endswith(b"\r") else line
+                start = end + 1
+        offset += start
+        del pending[:start]
+
+    if pending:
+        yield offset, pending[:-1] if pending.endswith(b"\r") else pending
+
+
+def _character_boundary(data: bytearray, index: int) -> int:
+    """Move an index into UTF-8 bytes back to the start of the character it falls into."""
+    for boundary in range(index, index - 4, -1):
+        # Continuation bytes of a multibyte character look like 0b10xxxxxx
+        if data[boundary] & 0xC0 != 0x80:
+            return boundary
+    return index
+
+
+async def iter_log_lines(chunks: AsyncIterable[bytes], parser: SectionParser = None) -> AsyncIterator[LogLine]:
+    """
+    Iterate over the numbered lines of a stream of log bytes with ANSI escape sequences and section markers
+    removed.
+
+    :param chunks: Raw log chunks.
+    :param parser: Parser the lines are fed to, to fold the log into sections while it is streamed.
+    :return: Async iterator of lines.
+    """
+    number = 0
+    async for offset, line in iter_raw_lines(chunks):
+        number += 1
+        text = strip_ansi(line.decode("utf-8", errors="replace"))
+        text = parser.feed(number, text) if parser else strip_section_markers(text)
+        yield LogLine(number=number, offset=offset, text=text)
+
+
+async def iter_clean_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Iterate over the lines of a stream of log bytes with ANSI escape sequences and section markers removed."""
+    async for line in iter_log_lines(chunks):
+        yield line.text
+
+
+async def iter_response_lines(response: httpx.Response) -> AsyncIterator[str]:
+    """
+    Iterate over the cleaned lines of a streamed upstream log response and close it afterwards.
+
+    :param response: Upstream response opened with `stream=True`.
+    :return: Async iterator of lines.
+    """
+    try:
+        async for line in iter_clean_lines(response.aiter_bytes()):
+            yield line
+    finally:
+        await response.aclose()
+
+
+async def iter_chunks(data: bytes) -> AsyncIterator[bytes]:
+    """Feed bytes read at once to the functions reading a stream of log chunks."""
+    yield data
+
+
+async def skip_bytes(chunks: AsyncIterable[bytes], count: int) -> AsyncIterator[bytes]:
+    """Drop the first bytes of a stream, for servers ignoring the `Range` header of a request."""
+    async for chunk in chunks:
+        if count >= len(chunk):
+            count -= len(chunk)
+            continue
+        yield chunk[count:]
+        count = 0
+
+
+async def read_log_tail(chunks: AsyncIterable[bytes], offset: int, max_bytes: Optional[int],
+                        complete: bool) -> LogTail:
+    """
+    Read the lines a log gained since an offset.
+
+    Only complete lines are returned while the log is still growing or more than `max_bytes` are left,
+    so the next request resumes at the start of a line.
+
+    :param chunks: Log bytes starting at the offset.
+    :param offset: Byte offset of the first chunk in the log.
+    :param max_bytes: Most bytes read, or None to read all of them.
+    :param complete: Whether the log has been fully written upstream.
+    :return: The new lines with the offset to continue from.
+    """
+    data = bytearray()
+    truncated = False
+    async for chunk in chunks:
+        if max_bytes is None:
+            data += chunk
+            continue
+        data += chunk[:max_bytes - len(data)]
+        if len(data) >= max_bytes:
+            truncated = True
+            break
+
+    end = len(data)
+    if truncated or not complete:
+        # A single line longer than max_bytes is split rather than never returned
+        end = data.rfind(b"\n") + 1 or (len(data) if truncated else 0)
+
+    text = data[:end].decode("utf-8", errors="replace")
+    lines = text.split("\n")
+    if text.endswith("\n") or not text:
+        lines.pop()
+
+    return LogTail(lines=[clean_line(line[:-1] if line.endswith("\r") else line) for line in lines],
+                   offset=offset + end, more=truncated or not complete or end < len(data))
+
+
+async def read_log_window(lines: AsyncIterator[LogLine], head: int = None, tail: int = None,
+                          start: int = None, end: int = None) -> LogWindow:
+    """
+    Read a window of lines of a log, stopping as soon as the window is complete.
+
+    :param lines: Numbered log lines.
+    :param head: Number of lines from the start of the log.
+    :param tail: Number of lines from the end of the log, which requires reading the whole log.
+    :param start: First line number of a range, inclusive.
+    :param end: Last line number of a range, inclusive.
+    :return: The lines of the window.
+    """
+    if tail is not None:
+        window = deque(maxlen=tail)
+        total = 0
+        async for line in lines:
+            window.append(line)
+            total = line.number
+        return LogWindow(lines=list(window), total_lines=total)
+
+    if head is not None:
+        start, end = 1, head
+
+    window = []
+    total = 0
+    async for line in lines:
+        total = line.number
+        if line.number > end:
+            # The rest of the log is never downloaded
+            return LogWindow(lines=window)
+        if line.number >= start:
+            window.append(line)
+
+    return LogWindow(lines=window, total_lines=total)
+
+
+class LogMatcher:
+    """
+    Finds a search pattern in the lines of a log, a batch of lines at a time.
+
+    Patterns are searched literally unless they are regular expressions. Those are matched in a child
+    process, killed once the search runs longer than `SEARCH_REGEX_TIMEOUT`: a backtracking expression
+    holds the GIL for as long as it runs, so it could not be interrupted by the event loop or a thread.
+    The child process is started by the first regular expression match and stopped by `close`.
+    """
+
+    def __init__(self, pattern: str, ignore_case: bool = False, regex: bool = False):
+        """
+        :param pattern: Searched text, or regular expression if `regex` is set.
+        :param ignore_case: Whether the case of letters is ignored.
+        :param regex: Whether the pattern is a regular expression.
+        :raises re.error: If the pattern is not a valid regular expression.
+        """
+        self.pattern = re.compile(pattern if regex else re.escape(pattern), re.IGNORECASE if ignore_case else 0)
+        self.regex = regex
+        self._process = None
+        self._connection = None
+        self._deadline = None
+
+    def __enter__(self) -> "LogMatcher":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    async def match(self, texts: List[str]) -> List[List[Tuple[int, int]]]:
+        """
+        Find the pattern in lines.
+
+        :param texts: Text of the lines.
+        :return: Start and end positions of the matches within every line.
+        :raises TimeoutError: If the regular expression search has run out of time.
+        """
+        if not self.regex:
+            return _match_lines(self.pattern, texts)
+
+        loop = asyncio.get_running_loop()
+        if self._process is None:
+            self._start()
+        try:
+            await loop.run_in_executor(None, self._connection.send, texts)
+            remaining = self._deadline - time.monotonic()
+            if remaining <= 0 or not await loop.run_in_executor(None, self._connection.poll, remaining):
+                raise TimeoutError(f"The search has not finished within {SEARCH_REGEX_TIMEOUT} seconds.")
+            return self._connection.recv()
+        except BaseException:
+            self.close()
+            raise
+
+    def _start(self):
+        # Forked, so the child neither imports the application again nor needs the pattern pickled
+        context = multiprocessing.get_context("fork")
+        self._connection, child_connection = context.Pipe()
+        self._process = context.Process(target=_match_worker, args=(child_connection, self.pattern), daemon=True)
+        self._process.start()
+        child_connection.close()
+        self._deadline = time.monotonic() + SEARCH_REGEX_TIMEOUT
+
+    def close(self):
+        if self._process is None:
+            return
+        self._process.kill()
+        self._process.join()
+        self._connection.close()
+        self._process = self._connection = None
+
+
+def _match_lines(pattern: re.Pattern, texts: List[str]) -> List[List[Tuple[int, int]]]:
+    return [[found.span() for found in pattern.finditer(text)] for text in texts]
+
+
+def _match_worker(connection, pattern: re.Pattern):
+    """Match batches of lines received from the parent process until it closes the connection."""
+    while True:
+        try:
+            texts = connection.recv()
+        except EOFError:
+            return
+        connection.send(_match_lines(pattern, texts))
+
+
+async def _iter_line_batches(lines: AsyncIterator[LogLine], size: int) -> AsyncIterator[List[LogLine]]:
+    batch = []
+    async for line in lines:
+        batch.append(line)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def search_log(lines: AsyncIterator[LogLine], matcher: LogMatcher, context: int = 0,
+                     max_matches: int = 100) -> LogSearch:
+    """
+    Search the lines of a log for a pattern while they are streamed.
+
+    :param lines: Numbered log lines.
+    :param matcher: Matcher of the pattern searched in every line.
+    :param context: Number of lines returned before and after every match.
+    :param max_matches: Number of matches after which the search stops.
+    :return: The matches with their context lines.
+    :raises TimeoutError: If a regular expression search has run out of time.
+    """
+    before = deque(maxlen=context)
+    # Matches still collecting lines after them
+    pending: List[LogMatch] = []
+    matches: List[LogMatch] = []
+    scanned = 0
+    async for batch in _iter_line_batches(lines, SEARCH_BATCH_LINES):
+        for line, spans in zip(batch, await matcher.match([line.text for line in batch])):
+            scanned = line.number
+            for match in pending:
+                match.after.append(line)
+            pending = [match for match in pending if len(match.after) < context]
+
+            if spans:
+                if len(matches) == max_matches:
+                    return LogSearch(matches=matches, truncated=True, scanned_lines=scanned - 1)
+
+                match = LogMatch(line=line, spans=spans, before=list(before))
+                matches.append(match)
+                if context:
+                    pending.append(match)
+
+            before.append(line)
+
+    return LogSearch(matches=matches, truncated=False, scanned_lines=scanned)
+
+
+async def parse_log_sections(chunks: AsyncIterable[bytes], complete: bool = True) -> LogSections:
+    """
+    Fold a streamed log into its sections without keeping its lines.
+
+    :param chunks: Raw log chunks.
+    :param complete: Whether the log has been fully written upstream.
+    :return: The top level sections of the log.
+    """
+    parser = SectionParser()
+    async for _ in iter_log_lines(chunks, parser):
+        pass
+    return parser.finish(complete)
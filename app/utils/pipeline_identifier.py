@@ -1,91 +1,320 @@
-from typing import List, Dict, Set
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import List, Dict, AsyncIterator, Tuple, Optional, Set
 
+from app.config.config import Settings
+from app.daos.applications_dao import ApplicationDAO
+from app.daos.pipelines_dao import PipelineDAO, SYNC_COLUMNS
+from app.daos.sync_states_dao import SyncStatesDAO
+from app.utils.catalog_fingerprint import CatalogFingerprint
+from app.utils.clients.base import BaseClient
 from app.utils.clients.client_manager import ClientManager
+from app.utils.clients.rate_limiter import request_priority
+from app.utils.enums import SyncStatus, RequestPriority
+from app.utils.leader_election import LeaderElection
 from app.utils.logger import Logger
+from app.utils.sync_telemetry import ApplicationSyncStats, current_sync_stats
 from app.models import db_models as model
 
 LOGGER = Logger().start_logger()
+config = Settings().app
+
+# Advisory lock keys of single applications are offset by their ID, well away from other lock keys
+APPLICATION_SYNC_LOCK_BASE = 7_420_222_000_000
+# How often a sync running in another process is checked for having finished
+REMOTE_SYNC_POLL_INTERVAL = 2
 
 
 class PipelineIdentifier:
+    # Syncs currently running in this process, shared by scheduled runs and on-demand triggers
+    _in_flight_syncs: Dict[int, asyncio.Task] = {}
+    _full_syncs: Set[asyncio.Task] = set()
+    _running_sync_stats: Dict[int, ApplicationSyncStats] = {}
+    # Stats of the syncs this process runs while holding their application lock
+    _leading_sync_stats: Dict[int, ApplicationSyncStats] = {}
+    _background_syncs: Set[asyncio.Task] = set()
+
     @classmethod
-    async def identify_old_pipelines(cls, existing_pipelines: List[model.Pipelines],
-                                     fetched_pipelines: List[Dict]) -> List[model.Pipelines]:
+    async def sync_applications(cls, applications: List[model.Applications],
+                                concurrency: int = 10, timeout: int = None) -> Dict[int, ApplicationSyncStats]:
         """
-        Find old pipelines by comparing existing and fetched pipelines.
+        Synchronize pipelines of multiple applications concurrently.
 
-        :param existing_pipelines: List of existing pipeline objects.
-        :param fetched_pipelines: List of fetched pipeline dictionaries.
-        :return: List of old pipeline objects.
+        Every application is fetched and reconciled on its own, so it is reconciled as soon as its
+        fetch finishes. Applications that fail or exceed the timeout are logged and skipped, so one
+        slow or broken server does not hold up or break the others. A sync already running in this
+        process is joined, and one running in another process is skipped.
+
+        :param applications: List of application objects.
+        :param concurrency: Maximum number of applications synchronized at the same time.
+        :param timeout: Timeout in seconds for a single application.
+        :return: Mapping of application ID to the stats of its sync.
         """
-        fetched_pipeline_names = {f"{pipeline['name']}-{pipeline['app']}" for pipeline in fetched_pipelines}
+        semaphore = asyncio.Semaphore(max(concurrency, 1))
 
-        old_pipelines = [
-            existing_pipeline for existing_pipeline in existing_pipelines
-            if f"{existing_pipeline.name}-{existing_pipeline.application_id}" not in fetched_pipeline_names
-        ]
+        async def sync(application: model.Applications) -> ApplicationSyncStats:
+            async with semaphore:
+                return await asyncio.shield(cls.trigger_sync(application, timeout))
 
-        return old_pipelines
+        return {stats.application_id: stats
+                for stats in await asyncio.gather(*(sync(application) for application in applications))}
 
     @classmethod
-    async def fetch_pipelines_from_applications(cls, applications: List[model.Applications]) -> List[Dict]:
+    def trigger_sync_applications(cls, applications: List[model.Applications], concurrency: int = 10,
+                                  timeout: int = None) -> asyncio.Task:
         """
-        Fetch pipelines from multiple applications.
+        Start synchronizing multiple applications in the background.
 
         :param applications: List of application objects.
-        :return: List of fetched pipeline dictionaries.
+        :param concurrency: Maximum number of applications synchronized at the same time.
+        :param timeout: Timeout in seconds for a single application.
+        :return: Task resolving to the mapping of application ID to the stats of its sync.
+        """
+        task = asyncio.create_task(cls.sync_applications(applications, concurrency, timeout))
+        # The event loop only keeps weak references to tasks, so running ones are kept here
+        cls._background_syncs.add(task)
+        task.add_done_callback(cls._background_syncs.discard)
+        return task
+
+    @classmethod
+    def trigger_sync(cls, application: model.Applications, timeout: int = None,
+                     full: bool = False) -> asyncio.Task:
+        """
+        Start a sync of an application, or join the one already running in this or another process.
+
+        A forced full sync only joins a running full sync. A running incremental sync may use outdated
+        settings of the application, so the full sync is queued to start once it is over. A sync running
+        in another process is waited for, and its stats are read from the database once it is over.
+
+        :param application: Application object.
+        :param timeout: Timeout in seconds of a newly started sync.
+        :param full: Force a full sync.
+        :return: Task resolving to the stats of the sync.
+        """
+        running = cls._in_flight_syncs.get(application.id)
+        if running is not None and (not full or running in cls._full_syncs):
+            LOGGER.debug(f"Joining the running pipelines sync of application `{application.name}`.")
+            return running
+
+        stats = ApplicationSyncStats(application.id)
+        task = asyncio.create_task(cls._sync_application_tracked(application, stats, timeout, full, after=running))
+        cls._in_flight_syncs[application.id] = task
+        cls._running_sync_stats[application.id] = stats
+        if full:
+            cls._full_syncs.add(task)
+
+        def forget(finished_task: asyncio.Task):
+            cls._full_syncs.discard(finished_task)
+            # A queued full sync may have taken the place of this one already
+            if cls._in_flight_syncs.get(application.id) is finished_task:
+                del cls._in_flight_syncs[application.id]
+                cls._running_sync_stats.pop(application.id, None)
+
+        task.add_done_callback(forget)
+        return task
+
+    @classmethod
+    def get_sync_stats(cls, application_id: int) -> Optional[ApplicationSyncStats]:
         """
-        fetched_pipelines = []
-        for application in applications:
-            pipelines = await cls.fetch_pipelines_from_application(application)
-            fetched_pipelines.extend(pipelines)
+        Get the stats of the sync of an application last triggered in this process, while it runs.
 
-        return fetched_pipelines
+        :param application_id: Application ID.
+        :return: Stats of the sync, or None if no sync of the application was triggered by this process.
+        """
+        return cls._running_sync_stats.get(application_id)
 
     @classmethod
-    async def fetch_pipelines_from_application(cls, application: model.Applications) -> List[Dict]:
+    async def get_sync_state(cls, application_id: int) -> Optional[ApplicationSyncStats]:
+        """
+        Get the stats of the running or last sync of an application, whichever process runs or ran it.
+
+        :param application_id: Application ID.
+        :return: Stats of the sync, or None if the application has never been synchronized.
         """
-        Fetch pipelines for a single application.
+        leading = cls._leading_sync_stats.get(application_id)
+        if leading is not None:
+            # Live counters of a sync this process runs
+            return leading
+        return await cls._read_sync_state(application_id, LeaderElection(APPLICATION_SYNC_LOCK_BASE + application_id))
+
+    @classmethod
+    async def _read_sync_state(cls, application_id: int,
+                               application_lock: LeaderElection) -> Optional[ApplicationSyncStats]:
+        state = await SyncStatesDAO().get_by_application_id(application_id)
+        if state is None:
+            return None
+
+        stats = ApplicationSyncStats(application_id, started_ts=state.started_ts, duration_ms=state.duration_ms or 0,
+                                     status=state.status, mode=state.mode, pages=state.pages or 0,
+                                     requests=state.requests or 0, upserted=state.upserted or 0,
+                                     deleted=state.deleted or 0, error=state.error)
+        # Finished syncs are recorded before their lock is released, so a running one without it has died
+        if stats.status == SyncStatus.RUNNING.value and not await application_lock.is_held():
+            stats.status, stats.error = SyncStatus.FAILED.value, "The process running the sync has stopped."
+        return stats
+
+    @classmethod
+    async def _sync_application_tracked(cls, application: model.Applications, stats: ApplicationSyncStats,
+                                        timeout: int = None, full: bool = False,
+                                        after: asyncio.Task = None) -> ApplicationSyncStats:
+        if after is not None:
+            await asyncio.wait([after])
+        current_sync_stats.set(stats)
+        request_priority.set(RequestPriority.BACKGROUND)
+        started = time.monotonic()
+        # Keeps other processes from fetching the same application at the same time
+        application_lock = LeaderElection(APPLICATION_SYNC_LOCK_BASE + application.id)
+        try:
+            await asyncio.wait_for(cls._run_or_join_sync(application, stats, application_lock, full), timeout)
+        except asyncio.TimeoutError:
+            LOGGER.error(f"Pipelines sync for application `{application.name}` "
+                         f"timed out after {timeout} seconds.")
+            stats.status, stats.error = SyncStatus.TIMEOUT.value, f"Timed out after {timeout} seconds."
+        except Exception as e:
+            LOGGER.error(f"Pipelines sync for application `{application.name}` has failed: {e}")
+            stats.status, stats.error = SyncStatus.FAILED.value, str(e) or type(e).__name__
+        finally:
+            stats.duration_ms = int((time.monotonic() - started) * 1000)
+            if application_lock.is_held_here:
+                cls._leading_sync_stats.pop(application.id, None)
+                await cls._save_sync_state(stats, full)
+            await application_lock.resign()
+        return stats
+
+    @classmethod
+    async def _run_or_join_sync(cls, application: model.Applications, stats: ApplicationSyncStats,
+                                application_lock: LeaderElection, full: bool):
+        """Run the sync while holding the application lock, or take over the stats of the one holding it."""
+        while not await application_lock.is_leader():
+            state = await SyncStatesDAO().get_by_application_id(application.id)
+            if state is not None and state.status == SyncStatus.RUNNING.value and (not full or state.full):
+                LOGGER.debug(f"Joining the pipelines sync of application `{application.name}` "
+                             f"running in another process.")
+                while await application_lock.is_held():
+                    await asyncio.sleep(REMOTE_SYNC_POLL_INTERVAL)
+                remote = await cls._read_sync_state(application.id, application_lock)
+                if remote is not None:
+                    stats.status, stats.mode, stats.error = remote.status, remote.mode, remote.error
+                    stats.pages, stats.requests = remote.pages, remote.requests
+                    stats.upserted, stats.deleted = remote.upserted, remote.deleted
+                    return
+                continue
+
+            # The sync holding the lock has not been recorded yet, or can not stand in for a forced full sync
+            await asyncio.sleep(REMOTE_SYNC_POLL_INTERVAL)
+
+        cls._leading_sync_stats[application.id] = stats
+        await cls._save_sync_state(stats, full)
+        await cls.sync_application(application, full=full)
+        stats.status = SyncStatus.SUCCESS.value
+
+    @classmethod
+    async def _save_sync_state(cls, stats: ApplicationSyncStats, full: bool):
+        try:
+            await SyncStatesDAO().save(stats, full)
+        except Exception as e:
+            LOGGER.error(f"Recording the pipelines sync state of application with ID {stats.application_id} "
+                         f"has failed: {e}")
+
+    @classmethod
+    async def sync_application(cls, application: model.Applications, pipeline_dao: PipelineDAO = None,
+                               full: bool = False) -> Tuple[int, int]:
+        """
+        Stream the pipelines of an application into the database and reconcile them.
+
+        Clients that support it only discover pipelines changed since the last sync, in which case
+        nothing is deleted; a full sync runs every `pipelines_full_sync_interval` seconds. A full sync
+        whose catalog fingerprint matches the stored one skips the reconciliation entirely.
 
         :param application: Application object.
-        :return: List of fetched pipeline dictionaries.
+        :param pipeline_dao: Optional pipeline DAO to use.
+        :param full: Force a full sync.
+        :return: Tuple with the number of upserted and deleted pipelines.
         """
-        LOGGER.debug(f"Fetching pipelines for application: {application.name}")
+        LOGGER.debug(f"Synchronizing pipelines for application: {application.name}")
 
+        started_ts = datetime.utcnow()
         client = await ClientManager().create_client(application)
+        incremental = not full and cls._can_sync_incrementally(application, client, started_ts)
+        fingerprint = CatalogFingerprint()
+
+        pages = cls.iter_pipelines_data_from_application(
+            application, client, fingerprint, changed_since=application.last_synced_ts if incremental else None)
+        result = await (pipeline_dao or PipelineDAO()).sync_application_pipelines(
+            application.id, pages,
+            delete_stale=not incremental,
+            skip_if=None if incremental else lambda: fingerprint.hexdigest() == application.catalog_fingerprint)
 
-        if application.regex_pattern:
-            pipelines = await client.get_pipelines_list_by_pattern(application.regex_pattern)
-        else:
-            pipelines = await client.get_pipelines_list()
+        sync_state = {"last_synced_ts": started_ts}
+        if not incremental:
+            sync_state.update({"last_full_sync_ts": started_ts, "catalog_fingerprint": fingerprint.hexdigest()})
+        elif result and result[0]:
+            # The stored pipelines no longer match the last full catalog, so the next full sync must reconcile
+            sync_state["catalog_fingerprint"] = None
+        await ApplicationDAO().update_sync_state(application.id, sync_state)
 
-        LOGGER.debug(f"Fetched {len(pipelines)} pipelines for application: {application.name}")
+        stats = current_sync_stats.get()
+        if result is None:
+            LOGGER.debug(f"Catalog of application `{application.name}` has not changed since the last sync.")
+            if stats is not None:
+                stats.mode = "unchanged"
+            return 0, 0
 
-        return pipelines
+        upserted, deleted = result
+        if stats is not None:
+            stats.mode = "incremental" if incremental else "full"
+            stats.upserted, stats.deleted = upserted, deleted
+        LOGGER.debug(f"Synchronized pipelines for application `{application.name}` "
+                     f"({'incremental' if incremental else 'full'}): "
+                     f"{upserted} added or updated, {deleted} deleted.")
+
+        return upserted, deleted
 
     @classmethod
-    async def identify_new_pipelines(cls, fetched_pipelines: List[Dict],
-                                     existing_pipeline_names: Set[str]) -> List[Dict]:
-        """
-        Find new pipelines from fetched pipelines.
-
-        :param fetched_pipelines: List of fetched pipeline dictionaries.
-        :param existing_pipeline_names: Set of existing pipeline names.
-        :return: List of new pipeline dictionaries.
-        """
-        new_pipelines = []
-        unique_names = set()
-
-        for fetched_pipeline in fetched_pipelines:
-            unique_name = f"{fetched_pipeline['name']}-{fetched_pipeline['app']}"
-            if unique_name not in existing_pipeline_names and unique_name not in unique_names:
-                new_pipeline = {
-                    "name": fetched_pipeline['name'],
-                    "application_id": fetched_pipeline['app'],
-                    "project_id": str(fetched_pipeline['id'])
-                }
-                new_pipelines.append(new_pipeline)
-                unique_names.add(unique_name)
-                LOGGER.debug(f"Identified new pipeline: {unique_name}")
-
-        return new_pipelines
+    def _can_sync_incrementally(cls, application: model.Applications, client: BaseClient,
+                                now: datetime) -> bool:
+        if not client.supports_changed_since or not application.last_synced_ts or not application.last_full_sync_ts:
+            return False
+
+        return now - application.last_full_sync_ts < timedelta(seconds=config['pipelines_full_sync_interval'])
+
+    @classmethod
+    async def iter_pipelines_from_application(cls, application: model.Applications, client: BaseClient,
+                                              changed_since: datetime = None) -> AsyncIterator[List[Dict]]:
+        """
+        Iterate over pages of pipelines fetched for a single application.
+
+        :param application: Application object.
+        :param client: Client of the application.
+        :param changed_since: Only fetch pipelines changed since this UTC time, if the client supports it.
+        :return: Async iterator of fetched pipeline dictionary lists.
+        """
+        fetched = 0
+        stats = current_sync_stats.get()
+        async for pipelines in client.iter_pipeline_pages(application.regex_pattern or None, changed_since):
+            fetched += len(pipelines)
+            if stats is not None:
+                stats.pages += 1
+            yield pipelines
+
+        LOGGER.debug(f"Fetched {fetched} pipelines for application: {application.name}")
+
+    @classmethod
+    async def iter_pipelines_data_from_application(cls, application: model.Applications, client: BaseClient,
+                                                   fingerprint: CatalogFingerprint,
+                                                   changed_since: datetime = None) -> AsyncIterator[List[Dict]]:
+        """
+        Iterate over pages of fetched pipelines converted to the columns stored in the database.
+
+        :param application: Application object.
+        :param client: Client of the application.
+        :param fingerprint: Fingerprint updated with every page.
+        :param changed_since: Only fetch pipelines changed since this UTC time, if the client supports it.
+        :return: Async iterator of pipeline data dictionary lists.
+        """
+        async for pipelines in cls.iter_pipelines_from_application(application, client, changed_since):
+            pipelines_data = [{"name": pipeline['name'], **{name: pipeline.get(name) for name in SYNC_COLUMNS},
+                               "project_id": str(pipeline['id'])} for pipeline in pipelines]
+            fingerprint.update(pipelines_data)
+            yield pipelines_data
@@ -1,10 +1,14 @@
+from typing import AsyncIterator
+
 from fastapi import status as Status
 from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from app.utils.logger import Logger
 
 LOGGER = Logger().start_logger()
+# Lines are sent in batches of about this many characters, a write per line dominates the cost of large logs
+STREAM_CHUNK_SIZE = 64 * 1024
 
 
 def ok(status="success", message="", data=None):
@@ -54,3 +58,22 @@ def error(status="error", message="Oops!!! Something went wrong. Contact your su
 def custom_response(resp, status_code):
     return JSONResponse(status_code=status_code, content=jsonable_encoder(resp))
 
+
+def stream_lines(lines: AsyncIterator[str], media_type: str = "text/plain; charset=utf-8"):
+    """HTTP Response 200 streamed line by line"""
+    return StreamingResponse(_encode_lines(lines), media_type=media_type)
+
+
+async def _encode_lines(lines: AsyncIterator[str]) -> AsyncIterator[bytes]:
+    batch = []
+    size = 0
+    async for line in lines:
+        batch.append(line)
+        size += len(line) + 1
+        if size >= STREAM_CHUNK_SIZE:
+            yield ("\n".join(batch) + "\n").encode()
+            batch = []
+            size = 0
+
+    if batch:
+        yield ("\n".join(batch) + "\n").encode()
@@ -0,0 +1,63 @@
+import asyncio
+import os
+import socket
+import uuid
+from typing import List
+
+from app.daos.sync_nodes_dao import SyncNodesDAO
+from app.models import db_models as model
+from app.utils.consistent_hash import HashRing
+from app.utils.logger import Logger
+
+LOGGER = Logger().start_logger()
+
+HEARTBEAT_INTERVAL = 15
+# A node missing this many heartbeats is considered gone and its applications move to other nodes
+HEARTBEAT_TTL = HEARTBEAT_INTERVAL * 3
+
+
+class SyncCluster:
+    """Splits the pipelines sync across all live processes using heartbeats and a consistent hash ring."""
+
+    def __init__(self, sync_nodes_dao_factory=SyncNodesDAO):
+        self.node_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._sync_nodes_dao_factory = sync_nodes_dao_factory
+        self._live_node_ids: List[str] = []
+
+    async def heartbeat(self):
+        """Register this node or refresh its heartbeat."""
+        await self._sync_nodes_dao_factory().heartbeat(self.node_id)
+
+    async def run_heartbeat(self):
+        """Keep refreshing the heartbeat of this node and expire nodes that stopped sending theirs."""
+        while True:
+            try:
+                await self.heartbeat()
+                await self._sync_nodes_dao_factory().delete_expired(HEARTBEAT_TTL * 2)
+            except Exception as e:
+                LOGGER.error(f"Sync node `{self.node_id}` has failed to send its heartbeat: {e}")
+
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+    async def leave(self):
+        """Deregister this node so its applications are rebalanced right away."""
+        try:
+            await self._sync_nodes_dao_factory().delete(self.node_id)
+        except Exception as e:
+            LOGGER.warning(f"Sync node `{self.node_id}` has failed to deregister: {e}")
+
+    async def get_owned_applications(self, applications: List[model.Applications]) -> List[model.Applications]:
+        """
+        Filter the applications assigned to this node.
+
+        :param applications: All applications to be synchronized.
+        :return: Applications owned by this node.
+        """
+        await self.heartbeat()
+        node_ids = await self._sync_nodes_dao_factory().get_live_node_ids(HEARTBEAT_TTL)
+        if node_ids != self._live_node_ids:
+            LOGGER.info(f"Sync nodes have changed, rebalancing applications across {len(node_ids)} nodes.")
+            self._live_node_ids = node_ids
+
+        ring = HashRing(node_ids or [self.node_id])
+        return [application for application in applications if ring.get_node(str(application.id)) == self.node_id]
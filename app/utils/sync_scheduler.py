@@ -0,0 +1,137 @@
+import heapq
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Dict, Tuple, Optional
+
+from app.models import db_models as model
+
+
+@dataclass
+class ApplicationSchedule:
+    base_interval: float
+    interval: float
+    next_run: float
+    failures: int = 0
+
+
+class SyncScheduler:
+    """
+    Priority queue of the next pipelines sync of every application.
+
+    Every application is polled at its own interval, which is its `sync_interval` or the default one.
+    Applications whose catalog has just changed are re-polled faster, down to `min_interval`, and drift
+    back to their own interval while nothing changes. Failed applications back off exponentially up to
+    `max_backoff`. Every run is shifted by a random `jitter` fraction, so applications added together
+    do not keep hitting the CI servers at the same time.
+    """
+
+    def __init__(self, default_interval: int, min_interval: int, max_backoff: int, jitter: float = 0.1):
+        self.default_interval = default_interval
+        self.min_interval = min_interval
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self._queue: List[Tuple[float, int]] = []
+        self._schedules: Dict[int, ApplicationSchedule] = {}
+        self._applications: Dict[int, model.Applications] = {}
+
+    def refresh(self, applications: List[model.Applications]):
+        """
+        Replace the scheduled applications, keeping the schedule of the ones already known.
+
+        New applications are scheduled one interval after their last sync, or right away if they were
+        never synchronized.
+
+        :param applications: Applications to be synchronized.
+        """
+        now = time.monotonic()
+        self._applications = {application.id: application for application in applications}
+        for application_id in self._schedules.keys() - self._applications.keys():
+            del self._schedules[application_id]
+
+        for application in applications:
+            base_interval = application.sync_interval or self.default_interval
+            schedule = self._schedules.get(application.id)
+            if schedule is not None:
+                if schedule.base_interval != base_interval:
+                    schedule.base_interval = schedule.interval = base_interval
+                continue
+
+            delay = 0
+            if application.last_synced_ts:
+                elapsed = (datetime.utcnow() - application.last_synced_ts).total_seconds()
+                delay = max(base_interval - elapsed, 0)
+            self._schedule(application.id, ApplicationSchedule(base_interval, base_interval, 0), now + delay,
+                           spread=delay == 0)
+
+    def clear(self):
+        """Drop all scheduled applications."""
+        self._queue.clear()
+        self._schedules.clear()
+        self._applications.clear()
+
+    def pop_due(self) -> List[model.Applications]:
+        """
+        Take all applications whose next sync is due.
+
+        :return: Applications to be synchronized now.
+        """
+        now = time.monotonic()
+        due = []
+        while self._queue and self._queue[0][0] <= now:
+            next_run, application_id = heapq.heappop(self._queue)
+            schedule = self._schedules.get(application_id)
+            # Entries of removed or rescheduled applications are left in the queue and skipped here
+            if schedule is not None and schedule.next_run == next_run:
+                due.append(self._applications[application_id])
+
+        return due
+
+    def seconds_until_next(self) -> Optional[float]:
+        """
+        Get the number of seconds until the next sync is due.
+
+        :return: Number of seconds, or None if no application is scheduled.
+        """
+        while self._queue:
+            next_run, application_id = self._queue[0]
+            schedule = self._schedules.get(application_id)
+            if schedule is not None and schedule.next_run == next_run:
+                return max(next_run - time.monotonic(), 0)
+            heapq.heappop(self._queue)
+
+        return None
+
+    def record_result(self, application_id: int, result: Optional[Tuple[int, int]]):
+        """
+        Schedule the next sync of an application based on the result of its last one.
+
+        :param application_id: Application ID.
+        :param result: Tuple with the number of upserted and deleted pipelines, or None if the sync failed.
+        """
+        schedule = self._schedules.get(application_id)
+        if schedule is None:
+            return
+
+        if result is None:
+            schedule.failures += 1
+            delay = min(schedule.base_interval * 2 ** schedule.failures, max(self.max_backoff, schedule.base_interval))
+        else:
+            schedule.failures = 0
+            if any(result):
+                schedule.interval = max(schedule.interval / 2, min(self.min_interval, schedule.base_interval))
+            else:
+                schedule.interval = min(schedule.interval * 1.5, schedule.base_interval)
+            delay = schedule.interval
+
+        self._schedule(application_id, schedule, time.monotonic() + delay)
+
+    def _schedule(self, application_id: int, schedule: ApplicationSchedule, next_run: float, spread: bool = False):
+        if spread:
+            next_run += random.uniform(0, self.jitter * schedule.base_interval)
+        else:
+            next_run += (next_run - time.monotonic()) * random.uniform(-self.jitter, self.jitter)
+        schedule.next_run = next_run
+        self._schedules[application_id] = schedule
+        heapq.heappush(self._queue, (next_run, application_id))
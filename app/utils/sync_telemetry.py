@@ -0,0 +1,56 @@
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional, Tuple
+
+import httpx
+
+from app.utils.enums import SyncStatus
+
+
+@dataclass
+class ApplicationSyncStats:
+    """Counters of a single application sync, filled in while the sync runs."""
+    application_id: int
+    started_ts: datetime = field(default_factory=datetime.utcnow)
+    duration_ms: int = 0
+    status: str = SyncStatus.RUNNING.value
+    mode: Optional[str] = None
+    pages: int = 0
+    requests: int = 0
+    upserted: int = 0
+    deleted: int = 0
+    error: Optional[str] = None
+
+    @property
+    def result(self) -> Optional[Tuple[int, int]]:
+        """Tuple with the number of upserted and deleted pipelines, or None if the sync did not succeed."""
+        if self.status not in (SyncStatus.SUCCESS.value, SyncStatus.SKIPPED.value):
+            return None
+        return self.upserted, self.deleted
+
+    def as_dict(self):
+        return {
+            'application_id': self.application_id,
+            'started_ts': self.started_ts,
+            'duration_ms': self.duration_ms,
+            'status': self.status,
+            'mode': self.mode,
+            'pages': self.pages,
+            'requests': self.requests,
+            'upserted': self.upserted,
+            'deleted': self.deleted,
+            'error': self.error
+        }
+
+
+# Stats of the application sync running in the current task. Tasks spawned by the sync inherit it, so
+# concurrent page fetches are counted as well, while requests served to users are not.
+current_sync_stats: ContextVar[Optional[ApplicationSyncStats]] = ContextVar("current_sync_stats", default=None)
+
+
+async def count_upstream_request(request: httpx.Request):
+    """HTTP client event hook counting the upstream requests made by the current application sync."""
+    stats = current_sync_stats.get()
+    if stats is not None:
+        stats.requests += 1
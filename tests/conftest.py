@@ -0,0 +1,12 @@
+import os
+
+# Settings are read from the environment when the app modules are imported
+for name, value in {
+    "app_name": "ci-cd-fusion-hub", "app_version": "test", "app_secret_key": "secret", "app_access_tokens": "[]",
+    "app_auth_header_name": "X-Auth-Token", "app_root_path": "", "app_metrics_path": "/metrics",
+    "app_metrics_excluded_paths": "[]", "app_host": "127.0.0.1", "app_port": "8000", "app_session_lifetime": "60",
+    "app_disable_auth": "true", "app_pipelines_sync_interval": "300", "app_env": "test", "app_ssl_key": "",
+    "app_ssl_cert": "", "app_admin_email": "admin@example.com", "app_admin_pass": "admin",
+    "db_host": "localhost", "db_user": "user", "db_password": "password", "db_name": "test",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,94 @@
+import asyncio
+
+import httpx
+
+from app.utils.clients import github
+from app.utils.clients.github import GithubClient
+
+
+def parse(text, truncated=False):
+    return GithubClient._parse_workflow_name(".github/workflows/ci.yml", {'text': text, 'isTruncated': truncated})
+
+
+def test_workflow_name_is_read_from_quoted_scalar_with_comment():
+    assert parse("name: 'Build ''n'' test'  # main\non: push") == "Build 'n' test"
+
+
+def test_workflow_name_keeps_hash_without_leading_space():
+    assert parse("name: C#-build # comment\non: push") == "C#-build"
+
+
+def test_workflow_name_is_read_from_multi_line_scalar():
+    assert parse("name: Build\n  and test\non: push") == "Build and test"
+
+
+def test_workflow_name_is_read_from_flow_mapping():
+    assert parse("{name: Release, on: push}") == "Release"
+
+
+def test_workflow_without_name_is_named_after_path():
+    assert parse("on: push") == ".github/workflows/ci.yml"
+
+
+def test_invalid_workflow_is_named_after_path():
+    assert parse("name: [Build\non: push") == ".github/workflows/ci.yml"
+
+
+def test_workflow_name_that_is_not_a_string_is_unknown():
+    assert parse("name: 1.10\non: push") is None
+
+
+def test_truncated_or_missing_workflow_file_is_unknown():
+    assert parse("name: Build", truncated=True) is None
+    assert GithubClient._parse_workflow_name(".github/workflows/ci.yml", None) is None
+
+
+def test_graphql_workflows_are_only_read_from_workflow_files():
+    client = GithubClient("https://api.github.com", "token", application_id=1)
+
+    async def iter_repository_nodes(repositories, query):
+        assert 'HEAD:.github/workflows' in query
+        yield {'databaseId': 1, 'object': {'entries': [
+            {'name': "ci.yml", 'path': ".github/workflows/ci.yml", 'object': {'text': "name: CI"}},
+            {'name': "README.md", 'path': ".github/workflows/README.md", 'object': {'text': "# Workflows"}}
+        ]}}
+
+    client._iter_repository_nodes = iter_repository_nodes
+    workflows = asyncio.run(client._get_repositories_workflows_by_graphql([{'id': 1}], asyncio.Semaphore(1)))
+
+    # Dynamic workflows like CodeQL default setup have no file, and are only listed through the REST API
+    assert workflows == [[{'id': "ci.yml", 'path': ".github/workflows/ci.yml", 'name': "CI"}]]
+
+
+def test_revalidated_pages_are_shared_per_credential_and_bounded_by_bytes(monkeypatch):
+    monkeypatch.setattr(GithubClient, "_revalidated_pages", type(GithubClient._revalidated_pages)())
+    monkeypatch.setattr(GithubClient, "_revalidated_pages_size", 0)
+    monkeypatch.setattr(github, "REVALIDATED_PAGES_MAX_BYTES", 40)
+    requests = []
+
+    def get_page(client, url):
+        async def get(url, params=None, headers=None):
+            requests.append((url, headers))
+            if headers:
+                return httpx.Response(304)
+            return httpx.Response(200, headers={'ETag': f'"{url}"'}, json=[{'id': len(requests)}],
+                                  request=httpx.Request("GET", url))
+
+        client._client.get = get
+        return asyncio.run(client._get_revalidated_page(url, None))[0]
+
+    first, second = GithubClient("https://api.github.com", "token"), GithubClient("https://api.github.com", "token")
+    assert get_page(first, "https://api.github.com/user/repos?page=1") == [{'id': 1}]
+    assert get_page(second, "https://api.github.com/user/repos?page=1") == [{'id': 1}]
+    assert requests[-1][1] == {'If-None-Match': '"https://api.github.com/user/repos?page=1"'}
+
+    other = GithubClient("https://api.github.com", "other token")
+    assert get_page(other, "https://api.github.com/user/repos?page=1") == [{'id': 3}]
+
+    # Three pages of 11 serialized bytes do not fit, the least recently used one is evicted
+    get_page(first, "https://api.github.com/user/repos?page=2")
+    assert len(GithubClient._revalidated_pages) == 3
+    assert GithubClient._revalidated_pages_size == 33
+    get_page(first, "https://api.github.com/user/repos?page=3")
+    assert (first._credential_key, "https://api.github.com/user/repos?page=1") not in GithubClient._revalidated_pages
+    assert GithubClient._revalidated_pages_size == 33
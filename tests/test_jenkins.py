@@ -0,0 +1,26 @@
+import asyncio
+
+import httpx
+
+from app.utils.clients.jenkins import JenkinsClient
+
+
+def _tail(text, headers, offset=10, max_bytes=8):
+    client = JenkinsClient("https://jenkins.example.com", "user", "token")
+
+    async def open_stream(url):
+        assert url.endswith(f"/job/app/7/logText/progressiveText?start={offset}")
+        return httpx.Response(200, headers=headers, content=text.encode())
+
+    client.open_stream = open_stream
+    return asyncio.run(client.get_build_log_tail("app", "7", offset, max_bytes))
+
+
+def test_log_tail_without_console_notes_is_trimmed_at_last_newline():
+    tail = _tail("one\ntwo\nthree\n", {'X-Text-Size': "24", 'X-More-Data': "true"})
+    assert (tail.lines, tail.offset, tail.more) == (["one", "two"], 18, True)
+
+
+def test_log_tail_with_console_notes_continues_from_text_size():
+    tail = _tail("one\ntwo\nthree\n", {'X-Text-Size': "124"})
+    assert (tail.lines, tail.offset, tail.more) == (["one", "two", "three"], 124, False)
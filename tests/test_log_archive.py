@@ -0,0 +1,44 @@
+import asyncio
+import os
+
+from app.utils import log_archive
+
+
+async def _chunks(data):
+    yield data
+
+
+def _write(key, lines):
+    archive = asyncio.run(log_archive.write_archive(key, _chunks("".join(f"{line}\n" for line in lines).encode())))
+    archive.close()
+    return log_archive._archive_path(key)
+
+
+def test_archive_keeps_lines_and_offsets(monkeypatch, tmp_path):
+    monkeypatch.setitem(log_archive.config, 'log_archive_path', str(tmp_path))
+    monkeypatch.setattr(log_archive, "BLOCK_LINES", 2)
+
+    _write("job", ["one", "two", "three"])
+    with log_archive.open_archive("job") as archive:
+        window = archive.read_window(start=2, end=3)
+    assert [(line.number, line.offset, line.text) for line in window.lines] == [(2, 4, "two"), (3, 8, "three")]
+    assert window.total_lines == 3
+
+
+def test_retention_scans_only_once_over_the_limit(monkeypatch, tmp_path):
+    monkeypatch.setitem(log_archive.config, 'log_archive_path', str(tmp_path))
+    monkeypatch.setattr(log_archive, "_archive_bytes", None)
+    scans = []
+    enforce_retention = log_archive.enforce_retention
+    monkeypatch.setattr(log_archive, "enforce_retention", lambda keep: scans.append(keep) or enforce_retention(keep))
+
+    first = _write("first", ["line"] * 100)
+    os.utime(first, (0, 0))
+    monkeypatch.setitem(log_archive.config, 'log_archive_max_bytes', os.path.getsize(first) * 2)
+    _write("second", ["line"] * 100)
+    assert scans == [first]
+
+    third = _write("third", ["line"] * 100)
+    assert scans == [first, third]
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(log_archive._archive_path(key))
+                                                  for key in ("second", "third"))
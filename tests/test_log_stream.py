@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from app.utils import log_stream
+from app.utils.log_stream import LogLine, LogMatcher, search_log, iter_raw_lines
+
+
+async def _lines(texts):
+    for number, text in enumerate(texts, 1):
+        yield LogLine(number=number, offset=0, text=text)
+
+
+def _search(texts, matcher, **kwargs):
+    async def search():
+        with matcher:
+            return await search_log(_lines(texts), matcher, **kwargs)
+    return asyncio.run(search())
+
+
+def test_patterns_are_searched_literally_by_default():
+    result = _search(["(a+)+$", "aaaa"], LogMatcher("(a+)+$"))
+    assert [(match.line.number, match.spans) for match in result.matches] == [(1, [(0, 6)])]
+
+
+def test_regex_search_keeps_context_across_batches(monkeypatch):
+    monkeypatch.setattr(log_stream, "SEARCH_BATCH_LINES", 2)
+    result = _search(["one", "Error two", "three", "error four"], LogMatcher(r"err\w+", True, regex=True),
+                     context=1)
+    assert [(match.line.number, [line.text for line in match.before], [line.text for line in match.after])
+            for match in result.matches] == [(2, ["one"], ["three"]), (4, ["three"], [])]
+
+
+def test_backtracking_regex_times_out(monkeypatch):
+    monkeypatch.setattr(log_stream, "SEARCH_REGEX_TIMEOUT", 1)
+    with pytest.raises(TimeoutError):
+        _search(["a" * 40 + "b"], LogMatcher(r"(a+)+$", regex=True))
+
+
+def _raw_lines(chunks):
+    async def chunks_iterator():
+        for chunk in chunks:
+            yield chunk
+
+    async def read():
+        return [(offset, bytes(line)) async for offset, line in iter_raw_lines(chunks_iterator())]
+    return asyncio.run(read())
+
+
+def test_long_lines_are_split_at_characters_however_chunked(monkeypatch):
+    monkeypatch.setattr(log_stream, "LINE_MAX_BYTES", 4)
+    data = "abcdefghij\r\nxyzé€\nk".encode()
+    expected = [(0, b"abcd"), (4, b"efgh"), (8, b"ij"), (12, b"xyz"), (15, "é".encode()), (17, "€".encode()),
+                (21, b"k")]
+    assert _raw_lines([data]) == expected
+    assert _raw_lines([data[index:index + 1] for index in range(len(data))]) == expected
@@ -0,0 +1,25 @@
+from app.utils.clients.response_cache import is_terminal
+
+JENKINS_BUILD = "org.jenkinsci.plugins.workflow.job.WorkflowRun"
+
+
+def test_jenkins_build_without_building_is_not_terminal():
+    assert not is_terminal({'_class': JENKINS_BUILD, 'result': "SUCCESS", 'duration': 0})
+
+
+def test_jenkins_build_with_result_while_building_is_not_terminal():
+    assert not is_terminal({'_class': JENKINS_BUILD, 'building': True, 'result': "FAILURE"})
+
+
+def test_finished_jenkins_build_is_terminal():
+    assert is_terminal({'_class': JENKINS_BUILD, 'building': False, 'result': "SUCCESS"})
+
+
+def test_jenkins_build_without_result_is_not_terminal():
+    assert not is_terminal({'_class': JENKINS_BUILD, 'building': False, 'result': None})
+
+
+def test_gitlab_and_github_statuses():
+    assert is_terminal([{'status': "success"}, {'status': "completed"}])
+    assert not is_terminal([{'status': "success"}, {'status': "running"}])
+    assert not is_terminal([])